@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Rebuild tables into the InnoDB row format the schema expects (schema_mysql.ROW_FORMATS).
+
+ensure_schema only warns about a mismatch: converting an existing
+raw_messages to ROW_FORMAT=COMPRESSED is a full table rebuild, which takes
+minutes to hours on a production-size table. It runs online
+(ALGORITHM=INPLACE, LOCK=NONE), so the bot can keep serving meanwhile, but it
+needs free disk for a second copy of the table.
+
+Connects with the same MYSQL_* environment variables as signal-bot:
+    python3 scripts/apply_row_formats.py            # show what would change
+    python3 scripts/apply_row_formats.py --apply    # rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "signal-bot"))
+
+import mysql.connector  # noqa: E402
+
+from app.db.schema_mysql import ROW_FORMATS, apply_row_formats, pending_row_formats  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--apply", action="store_true", help="run the ALTER TABLEs (default: dry run)")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    conn = mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST", "db"),
+        port=int(os.getenv("MYSQL_PORT", "3306")),
+        user=os.getenv("MYSQL_USER", "supportbot"),
+        password=os.getenv("MYSQL_PASSWORD", "supportbot"),
+        database=os.getenv("MYSQL_DATABASE", "supportbot"),
+        charset="utf8mb4",
+        collation="utf8mb4_unicode_ci",
+    )
+    cur = conn.cursor(buffered=True)
+    pending = pending_row_formats(cur)
+    if not pending:
+        print("All tables already use their expected row format.")
+        return
+    for table, was in pending.items():
+        print(f"{table}: ROW_FORMAT={was} -> {ROW_FORMATS[table]}")
+    if not args.apply:
+        print("Dry run; pass --apply to rebuild.")
+        return
+    t0 = time.monotonic()
+    apply_row_formats(cur)
+    conn.close()
+    print(f"Done in {time.monotonic() - t0:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
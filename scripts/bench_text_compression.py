@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Benchmark compressed storage of raw_messages.content_text and buffers.
+
+Compares, on SupportBench message bodies (datasets/*.json, 10K messages each),
+the storage layouts before and after compression:
+
+  raw_messages   ROW_FORMAT=DYNAMIC      vs  ROW_FORMAT=COMPRESSED
+  buffers        LONGTEXT buffer_text    vs  zstd LONGBLOB buffer_z (app.db.compression)
+
+and reports for each layout:
+  - bytes InnoDB wrote (Innodb_data_written delta) per logical byte stored,
+    i.e. write amplification;
+  - on-disk size (data_length after ANALYZE);
+  - read latency (p50/p95 ms): PK lookups for messages, get_buffer round trips
+    (SELECT + decompress) for buffers, and one LIKE scan over content_text.
+
+The buffer workload replays each dataset as a rolling 150-message window
+rewritten on every message, like BUFFER_UPDATE does.
+
+Runs against a scratch database (dropped afterwards); needs CREATE privileges:
+    MYSQL_HOST=127.0.0.1 MYSQL_USER=root MYSQL_PASSWORD=rootpassword \\
+        python3 scripts/bench_text_compression.py [--messages 10000] [--datasets ua_ardupilot,tasmota]
+
+If no SupportBench files are present, synthetic messages of a similar length
+distribution are used (pass --synthetic to force).
+
+--codec-only needs no MySQL: it replays the same workloads through the codecs
+alone and reports stored bytes and encode/decode latency. buffers use the real
+app.db.compression codec; raw_messages is estimated with zlib over 16 KB
+pages, the way ROW_FORMAT=COMPRESSED (KEY_BLOCK_SIZE=8) compresses them, so
+it is an upper bound on the on-disk saving and says nothing about write
+amplification.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import zlib
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "signal-bot"))
+
+from app.db.compression import compress_text, decompress_text  # noqa: E402
+
+DATASETS_DIR = ROOT / "datasets"
+SCRATCH_DB = os.getenv("BENCH_MYSQL_DATABASE", "supportbot_bench")
+BUFFER_WINDOW = 150
+
+
+# ── Data ──────────────────────────────────────────────────────────────────────
+
+def load_messages(names: list[str], limit: int, synthetic: bool) -> list[tuple[str, str]]:
+    """Return (group_id, body) pairs."""
+    out: list[tuple[str, str]] = []
+    if not synthetic:
+        for name in names:
+            path = DATASETS_DIR / f"{name}.json"
+            if not path.exists():
+                continue
+            data = json.loads(path.read_text(encoding="utf-8"))
+            out += [(name, m.get("body") or "") for m in data["messages"][:limit]]
+    if out:
+        return out
+    print("SupportBench files not found — using synthetic messages")
+    rnd = random.Random(42)
+    words = ("контролер", "прошивка", "ardupilot", "gps", "compass", "failsafe", "battery",
+             "telemetry", "mavlink", "calibration", "помилка", "налаштування", "не", "працює")
+    for i in range(limit):
+        # Mostly short chat lines, with a tail of long OCR/transcript blobs
+        n = rnd.choice([6, 10, 15, 25, 40]) if rnd.random() > 0.08 else rnd.randint(300, 1500)
+        out.append(("synthetic", " ".join(rnd.choice(words) for _ in range(n))))
+    return out
+
+
+# ── MySQL helpers ─────────────────────────────────────────────────────────────
+
+def connect(database: str | None = None):
+    import mysql.connector
+
+    return mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST", "127.0.0.1"),
+        port=int(os.getenv("MYSQL_PORT", "3306")),
+        user=os.getenv("MYSQL_USER", "root"),
+        password=os.getenv("MYSQL_PASSWORD", os.getenv("MYSQL_ROOT_PASSWORD", "rootpassword")),
+        database=database,
+        charset="utf8mb4",
+        collation="utf8mb4_unicode_ci",
+        autocommit=False,
+        buffered=True,
+    )
+
+
+def data_written(cur) -> int:
+    cur.execute("SHOW GLOBAL STATUS LIKE 'Innodb_data_written'")
+    return int(cur.fetchone()[1])
+
+
+def table_size(cur, table: str) -> int:
+    cur.execute(f"ANALYZE TABLE {table}")
+    cur.fetchall()
+    cur.execute(
+        "SELECT data_length + index_length FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    return int(cur.fetchone()[0])
+
+
+def pct(samples: list[float], p: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * p))] * 1000
+
+
+# ── Workloads ─────────────────────────────────────────────────────────────────
+
+def bench_messages(conn, msgs: list[tuple[str, str]], row_format: str) -> dict:
+    cur = conn.cursor()
+    table = f"raw_messages_{row_format.lower()}"
+    cur.execute(f"""
+        CREATE TABLE {table} (
+          message_id VARCHAR(128) PRIMARY KEY,
+          group_id VARCHAR(128) NOT NULL,
+          ts BIGINT NOT NULL,
+          content_text LONGTEXT,
+          INDEX idx_group_ts (group_id, ts DESC)
+        ) ENGINE=InnoDB ROW_FORMAT={row_format} DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+    logical = sum(len(b.encode("utf-8")) for _, b in msgs)
+    before = data_written(cur)
+    for i, (gid, body) in enumerate(msgs):
+        cur.execute(
+            f"INSERT INTO {table}(message_id, group_id, ts, content_text) VALUES(%s, %s, %s, %s)",
+            (f"m{i}", gid, 1_700_000_000_000 + i, body),
+        )
+        if i % 100 == 99:
+            conn.commit()
+    conn.commit()
+    written = data_written(cur) - before
+
+    rnd = random.Random(7)
+    lat = []
+    for _ in range(2000):
+        t0 = time.perf_counter()
+        cur.execute(f"SELECT content_text FROM {table} WHERE message_id = %s", (f"m{rnd.randrange(len(msgs))}",))
+        cur.fetchone()
+        lat.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    cur.execute(f"SELECT COUNT(*) FROM {table} WHERE content_text LIKE %s", ("%failsafe%",))
+    cur.fetchone()
+    like_ms = (time.perf_counter() - t0) * 1000
+
+    return {
+        "layout": f"raw_messages {row_format}",
+        "write_amp": written / max(logical, 1),
+        "size_mb": table_size(cur, table) / 1e6,
+        "read_p50_ms": pct(lat, 0.5),
+        "read_p95_ms": pct(lat, 0.95),
+        "like_scan_ms": like_ms,
+    }
+
+
+def bench_buffers(conn, msgs: list[tuple[str, str]], compressed: bool) -> dict:
+    cur = conn.cursor()
+    table = "buffers_z" if compressed else "buffers_text"
+    col = "buffer_z LONGBLOB" if compressed else "buffer_text LONGTEXT"
+    cur.execute(f"CREATE TABLE {table} (group_id VARCHAR(128) PRIMARY KEY, {col}) ENGINE=InnoDB")
+    window: dict[str, list[str]] = {}
+    logical = 0
+    before = data_written(cur)
+    for i, (gid, body) in enumerate(msgs):
+        lines = window.setdefault(gid, [])
+        lines.append(f"[ts={1_700_000_000_000 + i}] user: {body}")
+        del lines[:-BUFFER_WINDOW]
+        text = "\n\n".join(lines)
+        logical += len(text.encode("utf-8"))
+        value = compress_text(text) if compressed else text
+        column = "buffer_z" if compressed else "buffer_text"
+        cur.execute(
+            f"INSERT INTO {table}(group_id, {column}) VALUES(%s, %s) "
+            f"ON DUPLICATE KEY UPDATE {column} = VALUES({column})",
+            (gid, value),
+        )
+        conn.commit()
+    written = data_written(cur) - before
+
+    gids = list(window)
+    lat = []
+    for i in range(2000):
+        t0 = time.perf_counter()
+        cur.execute(f"SELECT * FROM {table} WHERE group_id = %s", (gids[i % len(gids)],))
+        row = cur.fetchone()
+        if compressed:
+            decompress_text(row[1])
+        lat.append(time.perf_counter() - t0)
+
+    return {
+        "layout": "buffers zstd" if compressed else "buffers text",
+        "write_amp": written / max(logical, 1),
+        "size_mb": table_size(cur, table) / 1e6,
+        "read_p50_ms": pct(lat, 0.5),
+        "read_p95_ms": pct(lat, 0.95),
+        "like_scan_ms": None,
+    }
+
+
+def codec_only(msgs: list[tuple[str, str]]) -> None:
+    """Stored size and codec latency without MySQL (see module docstring)."""
+    # raw_messages: rows packed into 16 KB pages, each page zlib-compressed
+    page, pages, logical, stored = [], [], 0, 0
+    for _, body in msgs:
+        b = body.encode("utf-8")
+        logical += len(b)
+        page.append(b)
+        if sum(map(len, page)) >= 16384:
+            pages.append(b"".join(page))
+            page = []
+    if page:
+        pages.append(b"".join(page))
+    stored = sum(len(zlib.compress(p, 6)) for p in pages)
+    print(f"\nraw_messages content_text: {logical / 1e6:.2f} MB logical, "
+          f"~{stored / 1e6:.2f} MB as zlib pages ({logical / max(stored, 1):.2f}x)")
+
+    # buffers: rolling window rewritten per message, as BUFFER_UPDATE does
+    window: dict[str, list[str]] = {}
+    logical = stored = 0
+    enc, dec = [], []
+    for i, (gid, body) in enumerate(msgs):
+        lines = window.setdefault(gid, [])
+        lines.append(f"[ts={1_700_000_000_000 + i}] user: {body}")
+        del lines[:-BUFFER_WINDOW]
+        text = "\n\n".join(lines)
+        logical += len(text.encode("utf-8"))
+        t0 = time.perf_counter()
+        blob = compress_text(text)
+        enc.append(time.perf_counter() - t0)
+        stored += len(blob)
+        t0 = time.perf_counter()
+        decompress_text(blob)
+        dec.append(time.perf_counter() - t0)
+    print(f"buffers (per rewrite): {logical / len(msgs) / 1e3:.1f} KB text -> "
+          f"{stored / len(msgs) / 1e3:.1f} KB zstd ({logical / max(stored, 1):.2f}x); "
+          f"encode p50/p95 {pct(enc, 0.5):.3f}/{pct(enc, 0.95):.3f} ms, "
+          f"decode p50/p95 {pct(dec, 0.5):.3f}/{pct(dec, 0.95):.3f} ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--datasets", default="ua_ardupilot,domotica_es,tasmota")
+    ap.add_argument("--messages", type=int, default=10_000, help="messages per dataset")
+    ap.add_argument("--synthetic", action="store_true")
+    ap.add_argument("--codec-only", action="store_true", help="no MySQL: codec sizes and latency only")
+    args = ap.parse_args()
+
+    msgs = load_messages(args.datasets.split(","), args.messages, args.synthetic)
+    sizes = [len(b.encode("utf-8")) for _, b in msgs]
+    print(f"{len(msgs)} messages, body bytes: mean={statistics.mean(sizes):.0f} "
+          f"p95={sorted(sizes)[int(len(sizes) * 0.95)]} max={max(sizes)}")
+    if args.codec_only:
+        codec_only(msgs)
+        return
+
+    admin = connect()
+    admin.cursor().execute(f"DROP DATABASE IF EXISTS `{SCRATCH_DB}`")
+    admin.cursor().execute(f"CREATE DATABASE `{SCRATCH_DB}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    conn = connect(SCRATCH_DB)
+    try:
+        results = [
+            bench_messages(conn, msgs, "DYNAMIC"),
+            bench_messages(conn, msgs, "COMPRESSED"),
+            bench_buffers(conn, msgs, compressed=False),
+            bench_buffers(conn, msgs, compressed=True),
+        ]
+    finally:
+        conn.close()
+        admin.cursor().execute(f"DROP DATABASE IF EXISTS `{SCRATCH_DB}`")
+        admin.close()
+
+    print(f"\n{'layout':<28}{'write amp':>10}{'size MB':>10}{'p50 ms':>9}{'p95 ms':>9}{'LIKE ms':>10}")
+    for r in results:
+        like = f"{r['like_scan_ms']:.1f}" if r["like_scan_ms"] is not None else "-"
+        print(f"{r['layout']:<28}{r['write_amp']:>10.2f}{r['size_mb']:>10.2f}"
+              f"{r['read_p50_ms']:>9.3f}{r['read_p95_ms']:>9.3f}{like:>10}")
+
+
+if __name__ == "__main__":
+    main()
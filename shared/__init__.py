@@ -0,0 +1 @@
+"""Code shared by signal-bot and signal-ingest (copied to /app/shared in both images)."""
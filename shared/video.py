@@ -0,0 +1,229 @@
+"""Single-pass video processing with ffmpeg.
+
+One ffprobe call reads duration and stream layout, then one ffmpeg run emits
+everything the pipeline needs as separate outputs:
+
+  - a JPEG thumbnail (frame at ~1s, or the first frame of very short clips);
+  - the audio track (stream copy to ADTS when it is already AAC, otherwise a
+    16 kHz mono mp3 — small and good enough for transcription);
+  - the first clip_seconds of the video (first video + audio stream copied
+    into a fragmented mp4), only when the video is longer than that.
+
+If the combined run fails (e.g. a stream the mp4 muxer rejects), each output
+is retried on its own run, with the audio re-encoded to mp3 when the ADTS
+copy is what failed, so one bad output never costs the others.
+
+Outputs are read from pipes (fds 3..5) rather than temp files. Input is a file
+path when the caller has one, otherwise the bytes are streamed over stdin.
+MP4s with the moov atom at the end cannot be demuxed from a pipe; for those
+the bytes are spilled to one temp file and processed from there.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# Audio smaller than this is silence or a container header only
+MIN_AUDIO_BYTES = 1000
+_THUMB_AT_SECONDS = 1.0
+
+_ADTS_COPY = ["-map", "0:a:0", "-c:a", "copy", "-f", "adts"]
+# 16 kHz mono mp3: small and good enough for transcription
+_MP3_ENCODE = ["-map", "0:a:0", "-c:a", "libmp3lame", "-ar", "16000", "-ac", "1", "-q:a", "9", "-f", "mp3"]
+
+
+@dataclass
+class VideoMedia:
+    duration: float               # seconds; 0.0 if unknown
+    thumbnail: bytes | None       # JPEG
+    audio: bytes | None
+    audio_mime: str
+    clip: bytes | None            # first clip_seconds; None if the video is not longer
+    clip_mime: str = "video/mp4"
+
+
+def _probe(args: list[str], stdin: bytes | None, timeout: float) -> dict | None:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", *args],
+        input=stdin,
+        capture_output=True,
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        log.debug("ffprobe failed (rc=%d): %s", result.returncode, result.stderr[-300:].decode(errors="replace"))
+        return None
+    info = json.loads(result.stdout or b"{}")
+    return info if info.get("streams") else None
+
+
+def _read_all(fd: int, out: dict, key: str) -> None:
+    with os.fdopen(fd, "rb") as f:
+        out[key] = f.read()
+
+
+def _run_ffmpeg(
+    input_args: list[str],
+    stdin: bytes | None,
+    outputs: list[tuple[str, list[str]]],
+    timeout: float,
+) -> tuple[int, dict[str, bytes], bytes]:
+    """Run ffmpeg with one pipe per output. Returns (rc, {name: bytes}, stderr)."""
+    cmd = ["ffmpeg", "-hide_banner", "-y", *(["-nostdin"] if stdin is None else []), *input_args]
+    pipes: list[tuple[str, int, int]] = []
+    try:
+        for name, opts in outputs:
+            r, w = os.pipe()
+            pipes.append((name, r, w))
+            cmd += [*opts, f"pipe:{w}"]
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            pass_fds=[w for _, _, w in pipes],
+        )
+    except Exception:
+        for _, r, w in pipes:
+            os.close(r)
+            os.close(w)
+        raise
+    for _, _, w in pipes:
+        os.close(w)
+
+    results: dict[str, bytes] = {}
+    readers = [
+        threading.Thread(target=_read_all, args=(r, results, name), daemon=True)
+        for name, r, _ in pipes
+    ]
+    for t in readers:
+        t.start()
+    try:
+        # communicate() feeds stdin and drains stderr concurrently
+        _, stderr = proc.communicate(input=stdin, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        _, stderr = proc.communicate()
+    for t in readers:
+        t.join()
+    return proc.returncode, results, stderr or b""
+
+
+def _process(
+    input_args: list[str],
+    stdin: bytes | None,
+    *,
+    clip_seconds: int | None,
+    want_thumbnail: bool,
+    want_audio: bool,
+    timeout: float,
+) -> VideoMedia | None:
+    info = _probe(input_args[1:], stdin, timeout)
+    if info is None:
+        return None
+    streams = info.get("streams") or []
+    v = next((s for s in streams if s.get("codec_type") == "video"), None)
+    a = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    try:
+        duration = float((info.get("format") or {}).get("duration") or 0.0)
+    except ValueError:
+        duration = 0.0
+
+    outputs: list[tuple[str, list[str]]] = []
+    if want_thumbnail and v is not None:
+        at = min(_THUMB_AT_SECONDS, max(duration - 0.1, 0.0)) if duration else 0.0
+        outputs.append(("thumbnail", [
+            "-map", "0:v:0", "-ss", f"{at:.2f}", "-frames:v", "1", "-q:v", "4", "-f", "mjpeg",
+        ]))
+    audio_copy = False
+    if want_audio and a is not None:
+        audio_copy = a.get("codec_name") == "aac"
+        outputs.append(("audio", _ADTS_COPY if audio_copy else _MP3_ENCODE))
+    if clip_seconds and duration > clip_seconds:
+        log.info("Video is %.0fs, trimming to first %ds", duration, clip_seconds)
+        # Only the first video/audio stream: data and timecode tracks (tmcd,
+        # mebx in phone .mov files) are rejected by the mp4 muxer
+        outputs.append(("clip", [
+            "-map", "0:v:0", "-map", "0:a:0?", "-t", str(clip_seconds), "-c", "copy",
+            "-movflags", "frag_keyframe+empty_moov", "-f", "mp4",
+        ]))
+
+    media = VideoMedia(duration=duration, thumbnail=None, audio=None, audio_mime="", clip=None)
+    if not outputs:
+        return media
+
+    rc, out, stderr = _run_ffmpeg(input_args, stdin, outputs, timeout)
+    if rc != 0:
+        log.warning("ffmpeg failed (rc=%d), retrying outputs separately: %s",
+                    rc, stderr[-500:].decode("utf-8", errors="replace"))
+        out = {}
+        for name, opts in outputs:
+            tries = [opts, _MP3_ENCODE] if name == "audio" and audio_copy else [opts]
+            for opts in tries:
+                rc, one, stderr = _run_ffmpeg(input_args, stdin, [(name, opts)], timeout)
+                if rc == 0:
+                    out[name] = one.get(name) or b""
+                    if name == "audio":
+                        audio_copy = opts is _ADTS_COPY
+                    break
+                log.warning("ffmpeg %s failed (rc=%d): %s",
+                            name, rc, stderr[-300:].decode("utf-8", errors="replace"))
+        if not out:
+            return None
+    media.thumbnail = out.get("thumbnail") or None
+    audio = out.get("audio") or b""
+    media.audio_mime = ("audio/aac" if audio_copy else "audio/mp3") if audio else ""
+    if audio and len(audio) < MIN_AUDIO_BYTES:
+        log.info("Audio too small (%d bytes), skipping", len(audio))
+    media.audio = audio if len(audio) >= MIN_AUDIO_BYTES else None
+    media.clip = out.get("clip") or None
+    return media
+
+
+def process_video(
+    source: bytes | str | Path,
+    *,
+    clip_seconds: int | None = None,
+    want_thumbnail: bool = True,
+    want_audio: bool = True,
+    timeout: float = 60,
+) -> VideoMedia | None:
+    """Probe once and extract thumbnail, audio and (optionally) a trimmed clip.
+
+    source is a file path or the video bytes. Returns None if the input is not
+    a readable video or ffmpeg fails.
+    """
+    try:
+        if not isinstance(source, (bytes, bytearray)):
+            return _process(["-i", str(source)], None, clip_seconds=clip_seconds,
+                            want_thumbnail=want_thumbnail, want_audio=want_audio, timeout=timeout)
+
+        data = bytes(source)
+        media = _process(["-i", "pipe:0"], data, clip_seconds=clip_seconds,
+                         want_thumbnail=want_thumbnail, want_audio=want_audio, timeout=timeout)
+        if media is not None:
+            return media
+        # Non-streamable container (moov at the end): fall back to a seekable file
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+                tmp.write(data)
+                tmp_path = tmp.name
+            return _process(["-i", tmp_path], None, clip_seconds=clip_seconds,
+                            want_thumbnail=want_thumbnail, want_audio=want_audio, timeout=timeout)
+        finally:
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except Exception:
+                    pass
+    except Exception as exc:
+        log.warning("Video processing failed: %s", exc)
+        return None
@@ -1,8 +1,9 @@
 """CaseSearchAgent — multi-buffer context retrieval.
 
 Answer pipeline:
-1. SCRAG   — semantic search in ChromaDB (solved cases, highest trust)
-2. RCRAG   — semantic search in ChromaDB (recommendation cases, unconfirmed advice)
+1. SCRAG   — hybrid search (solved cases, highest trust): vector hits from
+             ChromaDB fused with BM25 hits over the same cases via RRF
+2. RCRAG   — same, for recommendation cases (unconfirmed advice)
 3. B3      — recently solved cases still within the rolling B2 window (DB query)
 4. RCRAG-DB — recommendation cases for this group not yet in RAG (DB query)
 
@@ -16,124 +17,60 @@ Response logic:
 from __future__ import annotations
 
 import logging
-import re
 import sys
-import time
 from typing import Any, Dict, List, Optional
 
+from .retrieval_context import RetrievalContext
+from app.rag.indexing import case_fields, has_case_fields
+
 sys.stdout.reconfigure(encoding="utf-8")
 
 log = logging.getLogger(__name__)
 
 
-# Multi-char Ukrainian→Latin mappings for entity matching
-_UK_DIGRAPHS = [
-    ("щ", "shch"), ("ш", "sh"), ("ч", "ch"), ("ц", "ts"),
-    ("ю", "yu"), ("я", "ya"), ("є", "ye"), ("ї", "yi"),
-    ("ж", "zh"), ("х", "kh"),
-]
-
-
-def _translit_uk_to_lat(text: str) -> str:
-    """Rough Ukrainian→Latin transliteration for entity matching."""
-    result = text
-    for uk, lat in _UK_DIGRAPHS:
-        result = result.replace(uk, lat)
-    _SINGLE = {
-        "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g",
-        "д": "d", "е": "e", "з": "z", "и": "y", "і": "i",
-        "й": "y", "к": "k", "л": "l", "м": "m", "н": "n",
-        "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
-        "у": "u", "ф": "f", "ь": "",
-    }
-    out = []
-    for ch in result:
-        out.append(_SINGLE.get(ch, ch))
-    return "".join(out)
-
-
-def _translit_variants(token: str) -> list[str]:
-    """Generate transliteration variants for a Ukrainian token.
-
-    Returns multiple forms to handle ambiguous mappings (e.g. х → kh or h).
-    """
-    base = _translit_uk_to_lat(token)
-    variants = [base]
-    # х→kh is standard, but English often uses just h (Herelink, not Kherelink)
-    if base.startswith("kh"):
-        variants.append(base[1:])  # drop 'k', keep 'h...'
-    if "kh" in base:
-        variants.append(base.replace("kh", "h"))
-    return variants
-
-
-def _entity_rerank(query: str, results: list[dict], k: int) -> list[dict]:
-    """Rerank RAG results by combining cosine score with entity overlap.
-
-    Boosts cases that mention the same key entities as the query.  This catches
-    cases where embeddings confuse similar-sounding but different systems
-    (e.g. Starlink vs Herelink).
-
-    Focuses on substantive tokens (4+ chars) from the query, using both
-    exact matching and transliterated substring matching for cross-script
-    entity resolution (Ukrainian ↔ English).
+_RRF_K = 60  # standard RRF damping constant
+# A lexical-only hit (not among vector candidates under the distance threshold)
+# must contain at least this fraction of the query's terms to be admitted.
+_LEXICAL_MIN_COVERAGE = 0.5
+
+
+def _rrf_fuse(
+    vector_hits: List[Dict[str, Any]],
+    lexical_hits: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Reciprocal-rank fusion of the vector and BM25 rankings into one list.
+
+    Each input is already ranked best-first; a case scores sum(1 / (60 + rank))
+    over the lists it appears in. Cases found by both rank above cases found by
+    one, which is what separates e.g. a Herelink case from a Starlink case that
+    merely embeds nearby. Solved cases win ties.
     """
-    if not results:
-        return results
-
-    # Extract substantive query tokens (4+ chars, after stop-word removal)
-    q_tokens = re.findall(r"[a-zA-Zа-яіїєґА-ЯІЇЄҐ0-9]{4,}", query.lower())
-    _STOP = {
-        "будь", "ласка", "якщо", "хтось", "використовує", "разом", "досвідом",
-        "поділіться", "підкажіть", "скажіть", "можливо", "проблема", "питання",
-        "the", "and", "with", "for", "how", "can", "does", "what", "any",
-        "при", "для", "або", "які", "яка", "який", "також", "може", "через",
-        "тому", "після", "перед", "між", "іншого", "інше", "інших", "інші",
-    }
-    q_tokens = [t for t in q_tokens if t not in _STOP]
-    if not q_tokens:
-        return results[:k]
-
-    scored = []
-    for r in results:
-        case_text = (r.get("problem", "") + " " + r.get("solution", "")).lower()
-
-        # Count how many query tokens appear in the case text
-        matches = 0
-        for qt in q_tokens:
-            # Direct substring match (same script)
-            if qt in case_text:
-                matches += 1
-                continue
-            # Transliterated match (cross-script: Ukrainian query → Latin case text)
-            found = False
-            for variant in _translit_variants(qt):
-                stem = variant[:max(5, len(variant) - 3)] if len(variant) >= 5 else variant
-                if len(stem) >= 4 and stem in case_text:
-                    found = True
-                    break
-            if found:
-                matches += 1
-
-        total = max(len(q_tokens), 1)
-        ent_ratio = min(matches / total, 1.0)
-        # Combined score: cosine similarity (primary) + entity overlap (boost)
-        combined = r.get("score", 0) + 0.15 * ent_ratio
-        scored.append((combined, ent_ratio, r))
-
-    # Sort by combined score, but give solved a small bonus (not absolute priority).
-    # A recommendation that matches all query entities should outrank a solved case
-    # about a different product.
-    SOLVED_BONUS = 0.05
-    scored.sort(key=lambda x: -(x[0] + (SOLVED_BONUS if x[2].get("status") == "solved" else 0)))
-    return [r for _, _, r in scored[:k]]
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    for ranking in (vector_hits, lexical_hits):
+        for rank, item in enumerate(ranking, start=1):
+            cid = item["case_id"]
+            if cid not in fused:
+                fused[cid] = item
+            else:
+                # Keep the vector hit's score; fill in anything it lacks.
+                for key, val in item.items():
+                    fused[cid].setdefault(key, val)
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (_RRF_K + rank)
+    ordered = sorted(
+        fused.values(),
+        key=lambda it: (-scores[it["case_id"]], it.get("status") != "solved"),
+    )
+    for it in ordered:
+        it["rrf"] = scores[it["case_id"]]
+    return ordered
 
 
 SCRAG_TOP_K = 3
 # Cosine distance threshold: cases with distance > this are too dissimilar to use.
 # Lower = stricter. 0.75 keeps good matches while dropping unrelated queries (0.9+).
 SCRAG_DISTANCE_THRESHOLD = 0.75
-# Over-fetch factor for reranking: retrieve more candidates, then rerank and trim.
+# Over-fetch factor for fusion: retrieve more candidates from each ranking.
 _OVERFETCH_K = 3
 
 
@@ -145,23 +82,25 @@ class CaseSearchAgent:
 
     # ─── SCRAG search ────────────────────────────────────────────────────────
 
-    def _search_scrag(self, query: str, group_id: str, k: int = 3, db=None) -> List[Dict[str, Any]]:
-        """Search SCRAG (solved) and RCRAG (recommendation) as separate collections.
+    def _search_scrag(
+        self, query: str, group_id: str, k: int = 3, ctx: RetrievalContext | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Hybrid search: SCRAG + RCRAG vector hits fused with BM25 hits via RRF.
 
-        Queries both collections independently and merges results with solved first.
-        Only returns results with cosine distance <= SCRAG_DISTANCE_THRESHOLD.
-        Resolves union group_ids so all groups in a union are searched together.
-        Over-fetches by _OVERFETCH_K and reranks using entity overlap.
+        Vector side queries both collections independently and keeps results
+        with distance <= SCRAG_DISTANCE_THRESHOLD. Lexical side scores the
+        same cases with BM25 (see app.rag.lexical); lexical-only hits need
+        _LEXICAL_MIN_COVERAGE of the query terms. Resolves union group_ids so
+        all groups in a union are searched together.
         """
         if not self.rag or not self.llm:
             return []
         try:
             # Resolve union: search across all groups in the same union
             union_gids = None
-            if db is not None:
+            if ctx is not None:
                 try:
-                    from app.db import get_union_group_ids
-                    union_gids = get_union_group_ids(db, group_id)
+                    union_gids = ctx.union_group_ids()
                     if len(union_gids) <= 1:
                         union_gids = None  # No union, use default single-group search
                 except Exception:
@@ -170,8 +109,24 @@ class CaseSearchAgent:
             # Over-fetch to give reranker more candidates
             fetch_k = k + _OVERFETCH_K
             # Query each collection independently for proper ranking
-            scrag_results = self.rag.scrag.retrieve_cases(group_id=group_id, group_ids=union_gids, embedding=query_emb, k=fetch_k, status=None)
-            rcrag_results = self.rag.rcrag.retrieve_cases(group_id=group_id, group_ids=union_gids, embedding=query_emb, k=fetch_k, status=None)
+            scrag_results = self.rag.scrag.retrieve_cases(
+                group_id=group_id, group_ids=union_gids, embedding=query_emb, k=fetch_k, status=None,
+                include_documents=False,
+            )
+            rcrag_results = self.rag.rcrag.retrieve_cases(
+                group_id=group_id, group_ids=union_gids, embedding=query_emb, k=fetch_k, status=None,
+                include_documents=False,
+            )
+
+            # Structured fields come from metadata; only entries indexed
+            # before that existed need their documents fetched and parsed.
+            for coll, results in ((self.rag.scrag, scrag_results), (self.rag.rcrag, rcrag_results)):
+                legacy = [r["case_id"] for r in results if not has_case_fields(r)]
+                if legacy:
+                    docs = coll.get_documents(legacy)
+                    for r in results:
+                        if r["case_id"] in docs:
+                            r["document"] = docs[r["case_id"]]
 
             formatted = []
             for source_tag, results in [("scrag", scrag_results), ("rcrag", rcrag_results)]:
@@ -179,62 +134,67 @@ class CaseSearchAgent:
                     distance = r.get("distance") or 1.0
                     if distance > SCRAG_DISTANCE_THRESHOLD:
                         continue
-                    doc = r.get("document", "")
-                    problem, solution = "", ""
-                    for line in doc.splitlines():
-                        if line.startswith("Проблема:"):
-                            problem = line.replace("Проблема:", "").strip()
-                        elif line.startswith("Рішення:"):
-                            solution = line.replace("Рішення:", "").strip()
-                    if not problem:
-                        lines = [l for l in doc.splitlines() if l.strip()]
-                        problem = lines[1] if len(lines) > 1 else doc[:100]
-                    if not solution:
-                        lines = [l for l in doc.splitlines() if l.strip()]
-                        solution = lines[2] if len(lines) > 2 else ""
-                    if not solution:
+                    fields = case_fields(r)
+                    if not fields["solution"]:
                         continue
                     formatted.append({
                         "source": source_tag,
                         "status": "solved" if source_tag == "scrag" else "recommendation",
                         "case_id": r["case_id"],
                         "score": 1.0 - distance,
-                        "problem": problem,
-                        "solution": solution,
-                        "doc_text": doc,
+                        "problem": fields["problem"],
+                        "solution": fields["solution"],
                     })
-            # Deduplicate by case_id (promotion may have left stale RCRAG entry)
+            # Rank vector hits across both collections; deduplicate by case_id
+            # (promotion may have left stale RCRAG entry — solved sorts first on ties)
+            formatted.sort(key=lambda it: (-it["score"], it["status"] != "solved"))
             seen = set()
             deduped = []
             for item in formatted:
                 if item["case_id"] not in seen:
                     seen.add(item["case_id"])
                     deduped.append(item)
-            # Rerank by entity overlap to catch embedding confusion (e.g. Starlink vs Herelink)
-            deduped = _entity_rerank(query, deduped, k=k * 2 + len(deduped))
-            return deduped
+
+            lexical = self._search_lexical(query, fetch_k, ctx, vector_ids=seen)
+            return _rrf_fuse(deduped, lexical)
         except Exception:
             log.exception("SCRAG/RCRAG search failed")
             return []
 
+    def _search_lexical(
+        self, query: str, k: int, ctx: RetrievalContext | None, vector_ids: set,
+    ) -> List[Dict[str, Any]]:
+        """BM25 hits over the same cases as SCRAG/RCRAG, formatted like vector hits."""
+        if ctx is None:
+            return []
+        try:
+            hits = ctx.lexical_index().search(query, k=k)
+        except Exception:
+            log.exception("Lexical search failed")
+            return []
+        out: List[Dict[str, Any]] = []
+        for case, _bm25, coverage in hits:
+            if case["case_id"] not in vector_ids and coverage < _LEXICAL_MIN_COVERAGE:
+                continue
+            if not case["solution_summary"].strip():
+                continue
+            out.append({
+                "source": "scrag" if case["status"] == "solved" else "rcrag",
+                "status": case["status"],
+                "case_id": case["case_id"],
+                "problem": case["problem_summary"].strip() or case["problem_title"],
+                "solution": case["solution_summary"].strip(),
+            })
+        return out
+
     # ─── B3 context ──────────────────────────────────────────────────────────
 
-    def _get_b3_context(self, group_id: str, db) -> List[Dict[str, Any]]:
+    def _get_b3_context(self, ctx: RetrievalContext | None) -> List[Dict[str, Any]]:
         """Return recently solved cases still in the B2 rolling window (B3)."""
-        if db is None:
+        if ctx is None:
             return []
         try:
-            from app.db import get_buffer, get_recent_solved_cases
-            buf = get_buffer(db, group_id=group_id) or ""
-            if not buf.strip():
-                return []
-            # Find the oldest timestamp in the buffer
-            import re
-            ts_matches = re.findall(r"\bts=(\d+)\b", buf)
-            since_ts = min(int(t) for t in ts_matches) if ts_matches else 0
-            if since_ts == 0:
-                return []
-            cases = get_recent_solved_cases(db, group_id=group_id, since_ts_ms=since_ts)
+            cases = ctx.recent_solved_cases()
             return [
                 {
                     "source": "b3",
@@ -251,13 +211,12 @@ class CaseSearchAgent:
 
     # ─── RCRAG-DB context (recommendation cases not yet in RAG) ─────────────
 
-    def _get_b1_context(self, group_id: str, db) -> List[Dict[str, Any]]:
+    def _get_b1_context(self, ctx: RetrievalContext | None) -> List[Dict[str, Any]]:
         """Return recommendation cases for this group (unconfirmed advice, not yet in ChromaDB)."""
-        if db is None:
+        if ctx is None:
             return []
         try:
-            from app.db import get_recommendation_cases_for_group
-            cases = get_recommendation_cases_for_group(db, group_id=group_id)
+            cases = ctx.recommendation_cases()
             return [
                 {
                     "source": "b1",
@@ -275,26 +234,40 @@ class CaseSearchAgent:
 
     # ─── Public API ──────────────────────────────────────────────────────────
 
-    def search(self, query: str, group_id: Optional[str] = None, db=None, k: int = 3) -> Dict[str, Any]:
+    def search(
+        self, query: str, group_id: Optional[str] = None, db=None, k: int = 3,
+        retrieval_ctx: RetrievalContext | None = None,
+    ) -> Dict[str, Any]:
         """Return all context layers for this query.
 
+        Group-scoped lookups (union, B3, RCRAG-DB) go through retrieval_ctx so
+        that questions in the same batch share them; a private context is
+        created when none is passed.
+
         Returns a dict with keys: scrag, b3, b1.
         """
         if not group_id:
             log.info("CaseSearchAgent: no group_id, skipping search for security")
             return {"scrag": [], "b3": [], "b1": []}
 
+        ctx = retrieval_ctx
+        if ctx is None and db is not None:
+            ctx = RetrievalContext(db=db, group_id=group_id)
+
         log.info("CaseSearchAgent: searching for '%s' (group=%s)", query[:60], group_id[:20])
-        scrag = self._search_scrag(query, group_id=group_id, k=k, db=db)
-        b3 = self._get_b3_context(group_id=group_id, db=db)
-        b1 = self._get_b1_context(group_id=group_id, db=db)
+        scrag = self._search_scrag(query, group_id=group_id, k=k, ctx=ctx)
+        b3 = self._get_b3_context(ctx)
+        b1 = self._get_b1_context(ctx)
         log.info(
             "CaseSearchAgent results: scrag=%d b3=%d b1=%d",
             len(scrag), len(b3), len(b1),
         )
         return {"scrag": scrag, "b3": b3, "b1": b1}
 
-    def answer(self, question: str, group_id: Optional[str] = None, db=None) -> str:
+    def answer(
+        self, question: str, group_id: Optional[str] = None, db=None,
+        retrieval_ctx: RetrievalContext | None = None,
+    ) -> str:
         """Return a formatted context string for the synthesizer, or signal tags.
 
         Returns:
@@ -302,7 +275,7 @@ class CaseSearchAgent:
           - "B1_ONLY:<context>"         → synthesizer should mention recommendation case + TAG_ADMIN
           - Formatted solved context    → synthesizer should answer directly
         """
-        ctx = self.search(question, group_id=group_id, db=db)
+        ctx = self.search(question, group_id=group_id, db=db, retrieval_ctx=retrieval_ctx)
         scrag = ctx["scrag"]
         b3 = ctx["b3"]
         b1 = ctx["b1"]
@@ -18,7 +18,7 @@ import time
 from typing import Any
 
 from app.agent.gemini_agent import fetch_doc_recursive
-from app.db.queries_mysql import get_group_docs
+from app.agent.retrieval_context import RetrievalContext
 from app.llm.client import LLMClient, SUBAGENT_CASCADE
 
 log = logging.getLogger(__name__)
@@ -127,24 +127,15 @@ class DocsAgent:
         return prompt, images
 
     def answer(self, question: str, group_id: str, db: Any, context: str = "",
-               images: list[tuple[bytes, str]] | None = None) -> str:
+               images: list[tuple[bytes, str]] | None = None,
+               retrieval_ctx: RetrievalContext | None = None) -> str:
         """Answer a question using the group's documentation.
 
         Returns the answer text, "INSUFFICIENT_INFO", "SKIP", or "NO_DOCS".
         """
         # Gather docs from all groups in the union
-        try:
-            from app.db import get_union_group_ids
-            union_gids = get_union_group_ids(db, group_id)
-        except Exception:
-            union_gids = [group_id]
-        seen: set[str] = set()
-        urls: list[str] = []
-        for gid in union_gids:
-            for u in get_group_docs(db, gid):
-                if u not in seen:
-                    seen.add(u)
-                    urls.append(u)
+        ctx = retrieval_ctx or RetrievalContext(db=db, group_id=group_id)
+        urls = ctx.docs_urls()
         if not urls:
             return "NO_DOCS"
 
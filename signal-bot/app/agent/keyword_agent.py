@@ -2,9 +2,13 @@
 
 Pipeline:
 1. LLM #1 (fast) extracts search keywords from the user's question
+   (skipped when the gate already emitted keywords for this question)
 2. LIKE search on raw_messages → message_ids
 3. JOIN case_evidence → find cases containing those messages
 4. LLM #2 (standard cascade) synthesizes a sub-answer from matched cases
+   (optional: with synthesize=False the formatted case list is returned as-is,
+   since CaseSearchAgent's hybrid BM25+vector stage already ranks cases
+   lexically)
 5. Negative evidence appended for keywords with 0 mentions
 """
 from __future__ import annotations
@@ -13,15 +17,18 @@ import logging
 import sys
 from typing import Any, Optional
 
+from .retrieval_context import RetrievalContext
+
 sys.stdout.reconfigure(encoding="utf-8")
 
 log = logging.getLogger(__name__)
 
 
 class KeywordAgent:
-    def __init__(self, llm, public_url: str = "https://supportbot.info"):
+    def __init__(self, llm, public_url: str = "https://supportbot.info", synthesize: bool = True):
         self.llm = llm
         self.public_url = public_url
+        self.synthesize = synthesize
 
     def answer(
         self,
@@ -30,18 +37,26 @@ class KeywordAgent:
         db=None,
         context: str = "",
         images: list[tuple[bytes, str]] | None = None,
+        retrieval_ctx: RetrievalContext | None = None,
+        keywords: list[str] | None = None,
     ) -> str:
+        """Search message history by keywords and summarize matching cases.
+
+        keywords: pre-extracted search terms (from batch_gate / decide_consider).
+            When None, keywords are extracted here with a separate LLM call.
+        """
         if not group_id or db is None:
             return "No keyword matches."
 
-        # Step 1: LLM extracts keywords
-        try:
-            kw = self.llm.extract_keywords(message=question)
-        except Exception:
-            log.exception("KeywordAgent: keyword extraction failed")
-            return "No keyword matches."
+        # Step 1: LLM extracts keywords (unless the gate already did)
+        if keywords is None:
+            try:
+                keywords = self.llm.extract_keywords(message=question).keywords
+            except Exception:
+                log.exception("KeywordAgent: keyword extraction failed")
+                return "No keyword matches."
 
-        all_terms = list(dict.fromkeys(kw.keywords))  # dedupe, preserve order
+        all_terms = list(dict.fromkeys(t.strip() for t in keywords if t and t.strip()))  # dedupe, preserve order
         if not all_terms:
             log.info("KeywordAgent: no keywords extracted")
             return "No keyword matches."
@@ -49,9 +64,9 @@ class KeywordAgent:
         log.info("KeywordAgent: keywords=%s", all_terms[:5])
 
         # Resolve union group_ids
+        ctx = retrieval_ctx or RetrievalContext(db=db, group_id=group_id)
         try:
-            from app.db import get_union_group_ids
-            union_gids = get_union_group_ids(db, group_id)
+            union_gids = ctx.union_group_ids()
         except Exception:
             union_gids = [group_id]
 
@@ -96,7 +111,9 @@ class KeywordAgent:
             return "No keyword matches."
 
         # Step 4: LLM #2 synthesizes sub-answer from cases + question + context
-        if cases:
+        if cases and not self.synthesize:
+            sub_answer = self._format_cases(cases)
+        elif cases:
             from app.llm.client import SUBAGENT_CASCADE
             from app.llm import prompts as P
 
@@ -0,0 +1,104 @@
+"""RetrievalContext — per-batch memo of group-scoped DB lookups.
+
+Every question in a batch targets the same group, so the sub-agents would
+otherwise repeat identical reads per question:
+- union group_ids          (CaseSearchAgent, KeywordAgent, DocsAgent)
+- B3 recent solved cases   (buffer read + ts regex + cases query)
+- recommendation cases     (RCRAG-DB layer)
+- docs URLs for the union  (DocsAgent)
+- BM25 lexical index       (CaseSearchAgent hybrid retrieval)
+
+One RetrievalContext is created per batch (or per single answer) and passed
+down through UltimateAgent. Each lookup runs at most once; concurrent callers
+for the same key wait for the first load instead of issuing their own query.
+Failed loads are not cached so the next caller retries.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, List
+
+log = logging.getLogger(__name__)
+
+_BUFFER_TS_RE = re.compile(r"\bts=(\d+)\b")
+
+_MISSING = object()
+
+
+class RetrievalContext:
+    def __init__(self, db: Any, group_id: str):
+        self.db = db
+        self.group_id = group_id
+        self._values: Dict[str, Any] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _memo(self, key: str, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            value = self._values.get(key, _MISSING)
+            if value is _MISSING:
+                value = loader()
+                self._values[key] = value
+            return value
+
+    def union_group_ids(self) -> List[str]:
+        """All group_ids in this group's union (just [group_id] if not in a union)."""
+        def _load() -> List[str]:
+            from app.db import get_union_group_ids
+            return get_union_group_ids(self.db, self.group_id)
+        return self._memo("union_group_ids", _load)
+
+    def recent_solved_cases(self) -> List[Dict[str, Any]]:
+        """Solved cases created since the oldest message still in the B2 buffer (B3)."""
+        def _load() -> List[Dict[str, Any]]:
+            from app.db import get_buffer, get_recent_solved_cases
+            buf = get_buffer(self.db, group_id=self.group_id) or ""
+            if not buf.strip():
+                return []
+            ts_matches = _BUFFER_TS_RE.findall(buf)
+            since_ts = min(int(t) for t in ts_matches) if ts_matches else 0
+            if since_ts == 0:
+                return []
+            return get_recent_solved_cases(self.db, group_id=self.group_id, since_ts_ms=since_ts)
+        return self._memo("recent_solved_cases", _load)
+
+    def recommendation_cases(self) -> List[Dict[str, Any]]:
+        """Recommendation cases for this group (RCRAG-DB layer)."""
+        def _load() -> List[Dict[str, Any]]:
+            from app.db import get_recommendation_cases_for_group
+            return get_recommendation_cases_for_group(self.db, group_id=self.group_id)
+        return self._memo("recommendation_cases", _load)
+
+    def docs_urls(self) -> List[str]:
+        """Deduplicated docs URLs configured across all groups in the union."""
+        def _load() -> List[str]:
+            from app.db.queries_mysql import get_group_docs
+            try:
+                union_gids = self.union_group_ids()
+            except Exception:
+                union_gids = [self.group_id]
+            seen: set[str] = set()
+            urls: List[str] = []
+            for gid in union_gids:
+                for u in get_group_docs(self.db, gid):
+                    if u not in seen:
+                        seen.add(u)
+                        urls.append(u)
+            return urls
+        return self._memo("docs_urls", _load)
+
+    def lexical_index(self) -> Any:
+        """BM25 index over RAG cases of the union (shared, version-checked once per context)."""
+        def _load() -> Any:
+            from app.db import get_case_change_version_for_groups
+            from app.rag.lexical import get_lexical_index
+            try:
+                gids = self.union_group_ids()
+            except Exception:
+                gids = [self.group_id]
+            return get_lexical_index(self.db, gids, get_case_change_version_for_groups(self.db, gids))
+        return self._memo("lexical_index", _load)
@@ -11,16 +11,16 @@ from __future__ import annotations
 import logging
 import re
 import sys
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 
 from .case_search_agent import CaseSearchAgent
 from .docs_agent import DocsAgent
 from .keyword_agent import KeywordAgent
+from .retrieval_context import RetrievalContext
 from app.config import load_settings
 from app.llm.client import LLMClient, SUBAGENT_CASCADE
-from app.rag.chroma import create_chroma
+from app.rag import create_rag
 
 sys.stdout.reconfigure(encoding="utf-8")
 
@@ -47,39 +47,40 @@ class AgentResponse:
 
 
 class UltimateAgent:
-    def __init__(self):
+    def __init__(self, rag=None):
+        """rag: the process-wide DualRag (shares its client and cached
+        collection handles); built from settings if omitted."""
         log.info("Initializing Ultimate Agent...")
         self.settings = load_settings()
         self.public_url = self.settings.public_url.rstrip("/")
-        self.rag = create_chroma(self.settings)
+        self.rag = rag if rag is not None else create_rag(self.settings)
         self.llm = LLMClient(self.settings)
         self.case_agent = CaseSearchAgent(rag=self.rag, llm=self.llm, public_url=self.public_url)
         self.docs_agent = DocsAgent(llm=self.llm)
-        self.keyword_agent = KeywordAgent(llm=self.llm, public_url=self.public_url)
-        self.last_load_time = time.time()
+        self.keyword_agent = KeywordAgent(
+            llm=self.llm, public_url=self.public_url,
+            synthesize=self.settings.keyword_synthesis_enabled,
+        )
         log.info("Agents loaded.")
 
-    def load_agents(self):
-        """Reload agents on refresh interval.
+    def answer(self, question, group_id=None, db=None, lang="uk", context: str = "", images: list[tuple[bytes, str]] | None = None, gate_tag: str = "",
+               retrieval_ctx: RetrievalContext | None = None, keywords: list[str] | None = None) -> AgentResponse:
+        """Answer one question.
 
-        Only Chroma is refreshed; LLMClient keeps its warm connection pool.
+        retrieval_ctx: shared memo of group-scoped DB lookups. Pass the same
+            instance for every question of a batch; if omitted, one is created
+            here so the three sub-agents still share it.
+        keywords: search keywords already emitted by the gate; saves
+            KeywordAgent its own extraction call. None = let it extract.
         """
-        self.rag = create_chroma(self.settings)
-        self.case_agent = CaseSearchAgent(rag=self.rag, llm=self.llm, public_url=self.public_url)
-        self.last_load_time = time.time()
-
-    def answer(self, question, group_id=None, db=None, lang="uk", context: str = "", images: list[tuple[bytes, str]] | None = None, gate_tag: str = "") -> AgentResponse:
-        if time.time() - self.last_load_time > 600:
-            try:
-                self.load_agents()
-            except Exception as exc:
-                log.warning("Error refreshing agents: %s", exc)
-
         lang = detect_lang(question)
         lang_instruction = "Ukrainian (українська)" if lang == "uk" else "English"
 
         log.info("UltimateAgent: '%s' (group=%s, lang=%s)", question[:80], group_id, lang)
 
+        if retrieval_ctx is None and group_id and db is not None:
+            retrieval_ctx = RetrievalContext(db=db, group_id=group_id)
+
         # Run all three agents in parallel
         case_ans = "No relevant cases found."
         docs_ans = "NO_DOCS"
@@ -88,15 +89,17 @@ class UltimateAgent:
         pool = ThreadPoolExecutor(max_workers=3)
         try:
             case_future = pool.submit(
-                self.case_agent.answer, question, group_id=group_id, db=db
+                self.case_agent.answer, question, group_id=group_id, db=db,
+                retrieval_ctx=retrieval_ctx,
             )
             docs_future = pool.submit(
                 self.docs_agent.answer, question, group_id=group_id, db=db, context=context,
-                images=images,
+                images=images, retrieval_ctx=retrieval_ctx,
             )
             keyword_future = pool.submit(
                 self.keyword_agent.answer, question, group_id=group_id, db=db,
-                context=context, images=images,
+                context=context, images=images, retrieval_ctx=retrieval_ctx,
+                keywords=keywords,
             )
 
             futures = [case_future, docs_future, keyword_future]
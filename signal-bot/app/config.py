@@ -41,6 +41,15 @@ class Settings:
     mysql_user: str
     mysql_password: str
     mysql_database: str
+    mysql_pool_size: int
+    mysql_pool_timeout_seconds: int
+    mysql_pool_ping_idle_seconds: int
+    # Read pool (replica if MYSQL_READ_HOST is set, else primary)
+    mysql_read_host: str
+    mysql_read_port: int
+    mysql_read_user: str
+    mysql_read_password: str
+    mysql_read_pool_size: int
     
     # Oracle DB (legacy, for backwards compatibility)
     oracle_user: str
@@ -63,12 +72,17 @@ class Settings:
     # Chroma
     chroma_url: str
     chroma_collection: str
+    rag_backend: str  # "chroma" or "local"
+    rag_local_dir: str
 
     # Signal
     signal_bot_e164: str
     signal_bot_storage: str
     signal_ingest_storage: str
     signal_cli: str
+    signal_cli_mode: str  # "subprocess" or "daemon"
+    signal_send_workers: int
+    signal_send_max_attempts: int
     bot_mention_strings: List[str]
     signal_listener_enabled: bool
     signal_link_timeout_seconds: int
@@ -76,6 +90,7 @@ class Settings:
     # Signal Desktop (alternative to signal-cli)
     use_signal_desktop: bool
     signal_desktop_url: str
+    signal_desktop_long_poll_seconds: int  # 0 = plain 1s polling
 
     # Behavior
     log_level: str
@@ -83,6 +98,10 @@ class Settings:
     retrieve_top_k: int
     worker_poll_seconds: float
     worker_enabled: bool
+    llm_max_concurrency: int
+    media_enrich_workers: int
+    media_step_concurrency: int
+    keyword_synthesis_enabled: bool
     history_token_ttl_minutes: int
     admin_session_stale_minutes: int
     
@@ -92,6 +111,13 @@ class Settings:
     # Buffer limits
     buffer_max_age_hours: int
     buffer_max_messages: int
+
+    # Retention (0 = keep forever)
+    retention_jobs_days: int
+    retention_messages_days: int
+    retention_reactions_days: int
+    retention_batch_size: int
+    retention_interval_minutes: int
     
     # Multimodal limits
     max_images_per_gate: int
@@ -119,6 +145,14 @@ def load_settings() -> Settings:
     
     db_backend = _env("DB_BACKEND", default="mysql").lower()
 
+    signal_cli_mode = _env("SIGNAL_CLI_MODE", default="subprocess").strip().lower()
+    if signal_cli_mode not in {"subprocess", "daemon"}:
+        raise ValueError(f"SIGNAL_CLI_MODE must be 'subprocess' or 'daemon', got {signal_cli_mode!r}")
+
+    rag_backend = _env("RAG_BACKEND", default="chroma").strip().lower()
+    if rag_backend not in {"chroma", "local"}:
+        raise ValueError(f"RAG_BACKEND must be 'chroma' or 'local', got {rag_backend!r}")
+
     return Settings(
         db_backend=db_backend,
         # MySQL settings (default)
@@ -127,6 +161,14 @@ def load_settings() -> Settings:
         mysql_user=_env("MYSQL_USER", default="supportbot"),
         mysql_password=_env("MYSQL_PASSWORD", default="supportbot"),
         mysql_database=_env("MYSQL_DATABASE", default="supportbot"),
+        mysql_pool_size=_env_int("MYSQL_POOL_SIZE", default=16, min_value=1),
+        mysql_pool_timeout_seconds=_env_int("MYSQL_POOL_TIMEOUT_SECONDS", default=30, min_value=1),
+        mysql_pool_ping_idle_seconds=_env_int("MYSQL_POOL_PING_IDLE_SECONDS", default=30, min_value=0),
+        mysql_read_host=_env("MYSQL_READ_HOST", default=""),
+        mysql_read_port=_env_int("MYSQL_READ_PORT", default=0, min_value=0),
+        mysql_read_user=_env("MYSQL_READ_USER", default=""),
+        mysql_read_password=_env("MYSQL_READ_PASSWORD", default=""),
+        mysql_read_pool_size=_env_int("MYSQL_READ_POOL_SIZE", default=8, min_value=1),
         # Oracle settings (legacy)
         oracle_user=_env("ORACLE_USER", default=""),
         oracle_password=_env("ORACLE_PASSWORD", default=""),
@@ -143,25 +185,40 @@ def load_settings() -> Settings:
         embedding_model=_env("EMBEDDING_MODEL", default="text-embedding-004"),
         chroma_url=_env("CHROMA_URL", default="http://rag:8000"),
         chroma_collection=_env("CHROMA_COLLECTION", default="cases"),
+        rag_backend=rag_backend,
+        rag_local_dir=_env("RAG_LOCAL_DIR", default="/var/lib/signal/bot/rag_index"),
         signal_bot_e164=_env("SIGNAL_BOT_E164", required=True),
         signal_bot_storage=_env("SIGNAL_BOT_STORAGE", default="/var/lib/signal/bot"),
         signal_ingest_storage=_env("SIGNAL_INGEST_STORAGE", default="/var/lib/signal/ingest"),
         signal_cli=_env("SIGNAL_CLI", default="signal-cli"),
+        signal_cli_mode=signal_cli_mode,
+        signal_send_workers=_env_int("SIGNAL_SEND_WORKERS", default=4, min_value=1),
+        signal_send_max_attempts=_env_int("SIGNAL_SEND_MAX_ATTEMPTS", default=3, min_value=1),
         bot_mention_strings=mentions,
         signal_listener_enabled=_env_bool("SIGNAL_LISTENER_ENABLED", default=True),
         signal_link_timeout_seconds=_env_int("SIGNAL_LINK_TIMEOUT_SECONDS", default=600, min_value=60),
         use_signal_desktop=_env_bool("USE_SIGNAL_DESKTOP", default=False),
         signal_desktop_url=_env("SIGNAL_DESKTOP_URL", default="http://signal-desktop-arm64:8001"),
+        signal_desktop_long_poll_seconds=_env_int("SIGNAL_DESKTOP_LONG_POLL_SECONDS", default=25, min_value=0),
         log_level=_env("LOG_LEVEL", default="INFO"),
         context_last_n=_env_int("CONTEXT_LAST_N", default=40, min_value=1),
         retrieve_top_k=_env_int("RETRIEVE_TOP_K", default=5, min_value=1),
         worker_poll_seconds=float(os.getenv("WORKER_POLL_SECONDS", "1")),
         worker_enabled=_env_bool("WORKER_ENABLED", default=True),
+        llm_max_concurrency=_env_int("LLM_MAX_CONCURRENCY", default=8, min_value=1),
+        media_enrich_workers=_env_int("MEDIA_ENRICH_WORKERS", default=2, min_value=1),
+        media_step_concurrency=_env_int("MEDIA_STEP_CONCURRENCY", default=4, min_value=1),
+        keyword_synthesis_enabled=_env_bool("KEYWORD_SYNTHESIS_ENABLED", default=True),
         history_token_ttl_minutes=_env_int("HISTORY_TOKEN_TTL_MINUTES", default=240, min_value=1),
         admin_session_stale_minutes=_env_int("ADMIN_SESSION_STALE_MINUTES", default=30, min_value=1),
         http_debug_endpoints_enabled=_env_bool("HTTP_DEBUG_ENDPOINTS_ENABLED", default=False),
         buffer_max_age_hours=_env_int("BUFFER_MAX_AGE_HOURS", default=168, min_value=1),  # 7 days
         buffer_max_messages=_env_int("BUFFER_MAX_MESSAGES", default=150, min_value=10),
+        retention_jobs_days=_env_int("RETENTION_JOBS_DAYS", default=7, min_value=0),
+        retention_messages_days=_env_int("RETENTION_MESSAGES_DAYS", default=0, min_value=0),
+        retention_reactions_days=_env_int("RETENTION_REACTIONS_DAYS", default=0, min_value=0),
+        retention_batch_size=_env_int("RETENTION_BATCH_SIZE", default=500, min_value=1),
+        retention_interval_minutes=_env_int("RETENTION_INTERVAL_MINUTES", default=60, min_value=1),
         max_images_per_gate=_env_int("MAX_IMAGES_PER_GATE", default=3, min_value=0),
         max_images_per_respond=_env_int("MAX_IMAGES_PER_RESPOND", default=5, min_value=0),
         max_kb_images_per_case=_env_int("MAX_KB_IMAGES_PER_CASE", default=2, min_value=0),
@@ -37,6 +37,7 @@ if DB_BACKEND == "mysql":
         AdminSession,
         POSITIVE_EMOJI,
         insert_raw_message,
+        update_raw_message_media,
         enqueue_job,
         get_raw_message,
         get_last_messages_text,
@@ -56,6 +57,7 @@ if DB_BACKEND == "mysql":
         claim_next_job,
         complete_job,
         fail_job,
+        requeue_in_progress_jobs,
         get_admin_session,
         upsert_admin_session,
         set_admin_awaiting_group_name,
@@ -68,11 +70,13 @@ if DB_BACKEND == "mysql":
         get_positive_reactions_for_message,
         get_message_by_ts,
         get_case,
+        get_case_evidence_ids,
         get_case_evidence,
         get_open_cases_for_group,
         get_recent_solved_cases,
         update_case_to_solved,
         mark_case_in_rag,
+        mark_cases_in_rag,
         get_recommendation_cases_not_in_rag,
         get_recommendation_cases_for_group,
         upsert_group_docs,
@@ -81,6 +85,22 @@ if DB_BACKEND == "mysql":
         delete_all_group_data,
         clear_group_runtime_data,
         get_all_active_case_ids,
+        get_in_rag_case_ids,
+        get_case_changes_since,
+        get_latest_case_changes,
+        get_case_change_version_for_groups,
+        get_case_sync_states,
+        prune_case_changes,
+        delete_finished_jobs,
+        delete_old_reactions,
+        archive_cold_messages,
+        enqueue_rag_index,
+        admit_recommendations_to_rag,
+        claim_rag_outbox,
+        complete_rag_outbox,
+        fail_rag_outbox,
+        get_cases_for_indexing,
+        get_indexed_cases_for_groups,
         get_cases_for_group,
         get_union_group_ids,
         set_union,
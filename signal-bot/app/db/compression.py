@@ -0,0 +1,58 @@
+"""Versioned zstd encoding for large text blobs stored in MySQL.
+
+Format: one version byte followed by the payload.
+  0x00  raw UTF-8 (short values, where compression does not pay off)
+  0x01  zstd frame of UTF-8 text
+New codecs get a new version byte; old rows stay readable.
+
+Used for columns that are only ever read whole by the app (buffers). Columns
+that SQL searches with LIKE (raw_messages.content_text) rely on InnoDB
+ROW_FORMAT=COMPRESSED instead, which keeps them queryable.
+"""
+from __future__ import annotations
+
+import threading
+
+import zstandard
+
+_RAW = 0x00
+_ZSTD = 0x01
+
+# Below this many bytes zstd framing overhead eats the savings
+MIN_COMPRESS_BYTES = 256
+_LEVEL = 3
+
+# zstandard (de)compressor objects are not safe to share between threads
+_local = threading.local()
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    c = getattr(_local, "cctx", None)
+    if c is None:
+        c = _local.cctx = zstandard.ZstdCompressor(level=_LEVEL)
+    return c
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    d = getattr(_local, "dctx", None)
+    if d is None:
+        d = _local.dctx = zstandard.ZstdDecompressor()
+    return d
+
+
+def compress_text(text: str) -> bytes:
+    raw = (text or "").encode("utf-8")
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return bytes([_RAW]) + raw
+    return bytes([_ZSTD]) + _compressor().compress(raw)
+
+
+def decompress_text(blob: bytes | bytearray | None) -> str:
+    if not blob:
+        return ""
+    version, payload = blob[0], bytes(blob[1:])
+    if version == _RAW:
+        return payload.decode("utf-8")
+    if version == _ZSTD:
+        return _decompressor().decompress(payload).decode("utf-8")
+    raise ValueError(f"Unknown text blob version: {version:#x}")
@@ -1,36 +1,199 @@
 from __future__ import annotations
 
 import logging
-import os
+import threading
+import time
 from contextlib import contextmanager
-from typing import Iterator, Optional
+from typing import Any, Dict, Iterator, List, Tuple
 
 import mysql.connector
-from mysql.connector import pooling
+from mysql.connector.errors import PoolError
 
 from app.config import Settings
 
 log = logging.getLogger(__name__)
 
 
-class MySQL:
-    def __init__(self, pool: pooling.MySQLConnectionPool):
-        self.pool = pool
+class ConnectionPool:
+    """Bounded MySQL connection pool.
+
+    Replaces mysql.connector's MySQLConnectionPool, which raises PoolError as
+    soon as all connections are checked out and resets the session with a
+    server round trip on every return. Here:
+
+    - acquire blocks up to ``timeout`` seconds for a free connection (PoolError
+      only after that), opening new connections lazily up to ``size``;
+    - return is a rollback, and only if a transaction is open — it ends the
+      snapshot and releases locks without COM_RESET_CONNECTION;
+    - a connection idle for more than ``ping_after`` seconds is pinged before
+      it is handed out and replaced if the server dropped it;
+    - stats() exposes wait time, in-use and exhausted counters for sizing.
+    """
+
+    def __init__(self, name: str, connect_kwargs: Dict[str, Any], *, size: int, timeout: float, ping_after: float):
+        self.name = name
+        self._connect_kwargs = connect_kwargs
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[Any, float]] = []  # (conn, returned_at), LIFO
+        self._open = 0
+        self._waiting = 0
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "exhausted": 0,
+            "created": 0,
+            "discarded": 0,
+            "stale_replaced": 0,
+        }
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self._connect_kwargs)
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _acquire(self):
+        t0 = time.monotonic()
+        deadline = t0 + self.timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._open < self.size:
+                        self._open += 1
+                        conn, returned_at = None, 0.0
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["exhausted"] += 1
+                        raise PoolError(
+                            f"MySQL {self.name} pool exhausted: {self.size} connections in use, "
+                            f"waited {self.timeout:.1f}s"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - t0
+            self._stats["acquired"] += 1
+            if waited > 0.001:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+
+        try:
+            if conn is None:
+                return self._connect()
+            if time.monotonic() - returned_at > self.ping_after:
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    log.info("MySQL %s pool: idle connection went stale, reconnecting", self.name)
+                    self._close_quietly(conn)
+                    with self._cond:
+                        self._stats["stale_replaced"] += 1
+                    return self._connect()
+            return conn
+        except Exception:
+            self._forget()
+            raise
+
+    def _release(self, conn, *, broken: bool) -> None:
+        if not broken:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self._close_quietly(conn)
+            with self._cond:
+                self._stats["discarded"] += 1
+            self._forget()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _forget(self) -> None:
+        """Give back a slot whose connection was closed or never opened."""
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
 
     @contextmanager
     def connection(self) -> Iterator[mysql.connector.MySQLConnection]:
-        conn = self.pool.get_connection()
+        conn = self._acquire()
+        broken = False
         try:
             yield conn
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+            broken = True
+            raise
         finally:
-            conn.close()
+            self._release(conn, broken=broken)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters (cumulative since start) plus current occupancy."""
+        with self._cond:
+            out: Dict[str, Any] = dict(self._stats)
+            out.update(
+                size=self.size,
+                open=self._open,
+                idle=len(self._idle),
+                in_use=self._open - len(self._idle),
+                waiting=self._waiting,
+            )
+        out["wait_seconds_total"] = round(out["wait_seconds_total"], 3)
+        out["wait_seconds_max"] = round(out["wait_seconds_max"], 3)
+        return out
+
+
+class MySQL:
+    """Primary (write) pool plus a read pool for lag-tolerant read-only queries.
+
+    connection() always goes to the primary. read_connection() goes to the
+    replica configured by MYSQL_READ_HOST, or to a separate pool on the
+    primary when no replica is set, so web views and search never queue
+    behind job-queue writers for a connection. Helpers in queries_mysql only
+    use read_connection() where a few seconds of replication lag is harmless
+    (no read-after-write).
+    """
+
+    def __init__(self, write: ConnectionPool, read: ConnectionPool):
+        self.write = write
+        self.read = read
+
+    @contextmanager
+    def connection(self) -> Iterator[mysql.connector.MySQLConnection]:
+        with self.write.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def read_connection(self) -> Iterator[mysql.connector.MySQLConnection]:
+        with self.read.connection() as conn:
+            yield conn
+
+    def stats(self) -> Dict[str, Any]:
+        return {"write": self.write.stats(), "read": self.read.stats()}
 
 
 def create_mysql(settings: Settings) -> MySQL:
-    pool_config = {
-        "pool_name": "supportbot_pool",
-        "pool_size": 4,
-        "pool_reset_session": True,
+    connect_kwargs = {
         "host": settings.mysql_host,
         "port": settings.mysql_port,
         "user": settings.mysql_user,
@@ -40,12 +203,40 @@ def create_mysql(settings: Settings) -> MySQL:
         "collation": "utf8mb4_unicode_ci",
         "autocommit": False,
     }
+    # Reads run in autocommit: no snapshot is held between statements and
+    # returning the connection never needs a rollback.
+    read_kwargs = dict(
+        connect_kwargs,
+        host=settings.mysql_read_host or settings.mysql_host,
+        port=settings.mysql_read_port or settings.mysql_port,
+        user=settings.mysql_read_user or settings.mysql_user,
+        password=settings.mysql_read_password or settings.mysql_password,
+        autocommit=True,
+    )
+
+    log.info("Creating MySQL connection pool to %s:%d/%s (size=%d, timeout=%ds)",
+             settings.mysql_host, settings.mysql_port, settings.mysql_database,
+             settings.mysql_pool_size, settings.mysql_pool_timeout_seconds)
+    log.info("Creating MySQL read pool to %s:%d (%s, size=%d)",
+             read_kwargs["host"], read_kwargs["port"],
+             "replica" if settings.mysql_read_host else "primary",
+             settings.mysql_read_pool_size)
 
-    log.info("Creating MySQL connection pool to %s:%d/%s", 
-             settings.mysql_host, settings.mysql_port, settings.mysql_database)
-    
-    pool = pooling.MySQLConnectionPool(**pool_config)
-    return MySQL(pool=pool)
+    write = ConnectionPool(
+        "write",
+        connect_kwargs,
+        size=settings.mysql_pool_size,
+        timeout=settings.mysql_pool_timeout_seconds,
+        ping_after=settings.mysql_pool_ping_idle_seconds,
+    )
+    read = ConnectionPool(
+        "read",
+        read_kwargs,
+        size=settings.mysql_read_pool_size,
+        timeout=settings.mysql_pool_timeout_seconds,
+        ping_after=settings.mysql_pool_ping_idle_seconds,
+    )
+    return MySQL(write=write, read=read)
 
 
 def is_mysql_error(exc: Exception, code: int) -> bool:
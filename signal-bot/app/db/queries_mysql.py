@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import json
 import math
+import time
 import uuid
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from app.db.compression import compress_text, decompress_text
 from app.db.mysql import MySQL, is_mysql_error, MYSQL_ERR_DUP_ENTRY
 
 
@@ -89,6 +91,22 @@ def enqueue_job(db: MySQL, job_type: str, payload: Dict[str, Any], *, delay_seco
         conn.commit()
 
 
+def update_raw_message_media(db: MySQL, *, message_id: str, content_text: str, image_paths: List[str]) -> bool:
+    """Replace placeholder content / attachment paths once media is enriched. False if the message is gone."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE raw_messages SET content_text = %s, image_paths_json = %s WHERE message_id = %s",
+            (content_text, json.dumps(image_paths, ensure_ascii=False), message_id),
+        )
+        conn.commit()
+        # rowcount is 0 both for a missing row and an unchanged one
+        if cur.rowcount:
+            return True
+        cur.execute("SELECT 1 FROM raw_messages WHERE message_id = %s", (message_id,))
+        return cur.fetchone() is not None
+
+
 def get_raw_message(db: MySQL, message_id: str) -> Optional[RawMessage]:
     with db.connection() as conn:
         cur = conn.cursor()
@@ -211,17 +229,20 @@ def get_last_messages_text(db: MySQL, group_id: str, n: int, bot_sender_hash: st
 
 
 def has_newer_respond_job(db: MySQL, group_id: str, ts: int) -> bool:
-    """Check if there's a pending/in_progress MAYBE_RESPOND job for this group with a newer ts."""
+    """Check if there's a pending/in_progress MAYBE_RESPOND job for this group with a newer ts.
+
+    jobs.group_id / jobs.ts are generated from payload_json (see schema_mysql).
+    """
     with db.connection() as conn:
         cur = conn.cursor()
         cur.execute(
             """SELECT 1 FROM jobs
-               WHERE type = 'MAYBE_RESPOND'
+               WHERE group_id = %s
+                 AND type = 'MAYBE_RESPOND'
                  AND status IN ('pending', 'in_progress')
-                 AND payload_json LIKE %s
-                 AND CAST(JSON_EXTRACT(payload_json, '$.ts') AS UNSIGNED) > %s
+                 AND ts > %s
                LIMIT 1""",
-            (f'%{group_id}%', ts),
+            (group_id, ts),
         )
         return cur.fetchone() is not None
 
@@ -263,23 +284,29 @@ def get_buffer(db: MySQL, group_id: str) -> str:
     with db.connection() as conn:
         cur = conn.cursor()
         cur.execute(
-            "SELECT buffer_text FROM buffers WHERE group_id = %s",
+            "SELECT buffer_z, buffer_text FROM buffers WHERE group_id = %s",
             (group_id,),
         )
         row = cur.fetchone()
-        return (row[0] or "") if row else ""
+        if not row:
+            return ""
+        # Rows written before compression only have buffer_text
+        if row[0] is not None:
+            return decompress_text(row[0])
+        return row[1] or ""
 
 
 def set_buffer(db: MySQL, group_id: str, buffer_text: str) -> None:
+    """Store the buffer zstd-compressed in buffer_z (see app.db.compression)."""
     with db.connection() as conn:
         cur = conn.cursor()
         cur.execute(
             """
-            INSERT INTO buffers (group_id, buffer_text)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE buffer_text = VALUES(buffer_text)
+            INSERT INTO buffers (group_id, buffer_text, buffer_z)
+            VALUES (%s, NULL, %s)
+            ON DUPLICATE KEY UPDATE buffer_text = NULL, buffer_z = VALUES(buffer_z)
             """,
-            (group_id, buffer_text),
+            (group_id, compress_text(buffer_text)),
         )
         conn.commit()
 
@@ -289,6 +316,409 @@ def new_case_id(db: MySQL) -> str:
     return uuid.uuid4().hex
 
 
+# ── Case change log ──────────────────────────────────────────────────────────
+# Every write that can change a case's RAG membership or content appends a
+# row to case_changes in the same transaction. SYNC_RAG consumes the log by
+# version instead of diffing the whole corpus on every run.
+
+CASE_OP_INSERT = "insert"
+CASE_OP_UPDATE = "update"
+CASE_OP_MERGE = "merge"
+CASE_OP_ARCHIVE = "archive"
+CASE_OP_DELETE = "delete"
+CASE_OP_INDEXED = "indexed"  # in_rag flipped to 1 (lexical index must pick it up)
+
+
+def _log_case_changes(cur: Any, case_ids: Iterable[str], op: str, *, group_id: str | None = None) -> None:
+    """Append change-log rows using the caller's cursor (same transaction).
+
+    The row's group_id is looked up from cases unless given (pass it when the
+    case row is already gone, e.g. after a delete).
+    """
+    if group_id is not None:
+        rows = [(cid, op, group_id) for cid in case_ids]
+        if rows:
+            cur.executemany("INSERT INTO case_changes(case_id, op, group_id) VALUES(%s, %s, %s)", rows)
+        return
+    rows = [(cid, op, cid) for cid in case_ids]
+    if rows:
+        cur.executemany(
+            "INSERT INTO case_changes(case_id, op, group_id) "
+            "VALUES(%s, %s, (SELECT group_id FROM cases WHERE case_id = %s))",
+            rows,
+        )
+
+
+def get_case_changes_since(db: MySQL, after_version: int, limit: int = 1000) -> List[Tuple[int, str, str, int]]:
+    """Return (version, case_id, op, age_seconds) rows with version > after_version, oldest first.
+
+    age_seconds is measured by MySQL so callers can judge version gaps
+    without trusting the app host's clock.
+    """
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT version, case_id, op, TIMESTAMPDIFF(SECOND, ts, NOW()) "
+            "FROM case_changes WHERE version > %s ORDER BY version LIMIT %s",
+            (after_version, limit),
+        )
+        return [(int(r[0]), r[1], r[2], int(r[3] or 0)) for r in cur.fetchall()]
+
+
+def get_latest_case_changes(db: MySQL, after_version: int, limit: int = 1000) -> List[Tuple[int, str, str, int]]:
+    """Return the newest (version, case_id, op, age_seconds) rows with version > after_version, oldest first.
+
+    Primary, not the read pool: the full SYNC_RAG pass resumes from these
+    rows and must see the same version gaps as get_case_changes_since.
+    """
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT version, case_id, op, TIMESTAMPDIFF(SECOND, ts, NOW()) "
+            "FROM case_changes WHERE version > %s ORDER BY version DESC LIMIT %s",
+            (after_version, limit),
+        )
+        rows = [(int(r[0]), r[1], r[2], int(r[3] or 0)) for r in cur.fetchall()]
+        rows.reverse()
+        return rows
+
+
+def get_case_change_version_for_groups(db: MySQL, group_ids: List[str]) -> int:
+    """Latest case_changes version touching any of group_ids.
+
+    Rows without a group (logged before case_changes.group_id existed) count
+    for every group set; they never change, so they cost no rebuilds. Read
+    pool: the lexical index pairs this with get_indexed_cases_for_groups, so
+    both must see the same (possibly lagging) replica.
+    """
+    if not group_ids:
+        return 0
+    placeholders = ",".join(["%s"] * len(group_ids))
+    with db.read_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT COALESCE(MAX(v), 0) FROM (
+              SELECT MAX(version) AS v FROM case_changes WHERE group_id IN ({placeholders})
+              UNION ALL
+              SELECT MAX(version) FROM case_changes WHERE group_id IS NULL
+            ) t
+            """,
+            tuple(group_ids),
+        )
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+
+def get_case_sync_states(db: MySQL, case_ids: List[str]) -> Dict[str, Tuple[str, bool]]:
+    """Return {case_id: (status, in_rag)} for the given ids; missing ids are absent."""
+    if not case_ids:
+        return {}
+    placeholders = ",".join(["%s"] * len(case_ids))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT case_id, status, in_rag FROM cases WHERE case_id IN ({placeholders})",
+            tuple(case_ids),
+        )
+        return {r[0]: (r[1], bool(r[2])) for r in cur.fetchall()}
+
+
+def prune_case_changes(db: MySQL, *, max_version: int, older_than_days: int = 7, batch: int = 10000) -> int:
+    """Delete consumed change-log rows older than older_than_days. Returns rows removed."""
+    removed = 0
+    with db.connection() as conn:
+        cur = conn.cursor()
+        while True:
+            cur.execute(
+                "DELETE FROM case_changes WHERE version <= %s AND ts < NOW() - INTERVAL %s DAY LIMIT %s",
+                (max_version, older_than_days, batch),
+            )
+            n = cur.rowcount
+            conn.commit()
+            removed += n
+            if n < batch:
+                return removed
+
+
+# ── Retention ────────────────────────────────────────────────────────────────
+# Each helper handles one chunk in its own short transaction and returns the
+# number of rows affected; app.jobs.retention loops until a chunk comes back
+# short. Chunks are bounded by LIMIT so no statement holds locks for long.
+
+def delete_finished_jobs(db: MySQL, *, older_than_days: int, limit: int) -> int:
+    """Delete one chunk of done/failed/cancelled jobs untouched for older_than_days."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            DELETE FROM jobs
+            WHERE status IN ('done', 'failed', 'cancelled')
+              AND updated_at < NOW() - INTERVAL %s DAY
+            LIMIT %s
+            """,
+            (older_than_days, limit),
+        )
+        n = cur.rowcount
+        conn.commit()
+        return n
+
+
+def delete_old_reactions(db: MySQL, *, older_than_days: int, limit: int) -> int:
+    """Delete one chunk of reactions older than older_than_days."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM reactions WHERE created_at < NOW() - INTERVAL %s DAY LIMIT %s",
+            (older_than_days, limit),
+        )
+        n = cur.rowcount
+        conn.commit()
+        return n
+
+
+def archive_cold_messages(db: MySQL, *, older_than_days: int, limit: int) -> int:
+    """Move one chunk of raw messages older than older_than_days to raw_messages_archive.
+
+    A message must be old both by its Signal timestamp and by when it was
+    stored: history ingest stores months-old messages first and links their
+    case_evidence only after the case loop, so ts alone would archive them
+    mid-ingest. Groups with the ingesting flag set are skipped as well.
+    Messages referenced by case_evidence stay in raw_messages (case pages and
+    evidence images need them). Reactions on moved messages are dropped.
+    """
+    before_ts = int((time.time() - older_than_days * 86400) * 1000)
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT rm.message_id, rm.group_id, rm.ts
+            FROM raw_messages rm
+            WHERE rm.ts < %s
+              AND rm.created_at < NOW() - INTERVAL %s DAY
+              AND NOT EXISTS (SELECT 1 FROM case_evidence ce WHERE ce.message_id = rm.message_id)
+              AND NOT EXISTS (
+                SELECT 1 FROM chat_groups g WHERE g.group_id = rm.group_id AND g.ingesting = 1
+              )
+            ORDER BY rm.ts
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (before_ts, older_than_days, limit),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+        ids = [r[0] for r in rows]
+        placeholders = ",".join(["%s"] * len(ids))
+        cur.execute(
+            f"""
+            INSERT IGNORE INTO raw_messages_archive(
+                message_id, group_id, ts, sender_hash, sender_name, sender_uuid,
+                content_text, image_paths_json, reply_to_id, created_at
+            )
+            SELECT message_id, group_id, ts, sender_hash, sender_name, sender_uuid,
+                   content_text, image_paths_json, reply_to_id, created_at
+            FROM raw_messages
+            WHERE message_id IN ({placeholders})
+            """,
+            ids,
+        )
+        cur.execute(f"DELETE FROM raw_messages WHERE message_id IN ({placeholders})", ids)
+        n = cur.rowcount
+        targets = list({(r[1], int(r[2])) for r in rows})
+        cur.executemany(
+            "DELETE FROM reactions WHERE group_id = %s AND target_ts = %s",
+            targets,
+        )
+        conn.commit()
+        return n
+
+
+# ── RAG indexing outbox ──────────────────────────────────────────────────────
+# Case writes that need (re)indexing enqueue the case_id in rag_outbox inside
+# the same transaction. The background RAG indexer (app.jobs.rag_indexer)
+# drains it in batches, reading the case's current state at drain time, so
+# replays and duplicate rows are harmless.
+
+def _enqueue_rag_index(cur: Any, case_ids: Iterable[str]) -> None:
+    """Queue cases for RAG indexing using the caller's cursor (same transaction)."""
+    rows = [(cid,) for cid in case_ids]
+    if rows:
+        cur.executemany("INSERT INTO rag_outbox(case_id) VALUES(%s)", rows)
+
+
+def enqueue_rag_index(db: MySQL, case_ids: List[str]) -> None:
+    """Queue cases for RAG indexing when no other case write is involved."""
+    if not case_ids:
+        return
+    with db.connection() as conn:
+        cur = conn.cursor()
+        _enqueue_rag_index(cur, case_ids)
+        conn.commit()
+
+
+def admit_recommendations_to_rag(db: MySQL, case_ids: List[str]) -> None:
+    """Admit aged-out recommendation cases to RCRAG and queue them for indexing.
+
+    The indexer only indexes recommendation cases already flagged in_rag, so
+    the flag is set here, in the same transaction as the outbox rows.
+    """
+    if not case_ids:
+        return
+    placeholders = ",".join(["%s"] * len(case_ids))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            UPDATE cases SET in_rag = 1, updated_at = NOW()
+            WHERE case_id IN ({placeholders}) AND status = 'recommendation'
+            """,
+            tuple(case_ids),
+        )
+        _log_case_changes(cur, case_ids, CASE_OP_INDEXED)
+        _enqueue_rag_index(cur, case_ids)
+        conn.commit()
+
+
+def claim_rag_outbox(db: MySQL, *, limit: int, lease_seconds: int = 300) -> List[Tuple[int, str, int]]:
+    """Claim up to `limit` due outbox rows. Returns (id, case_id, attempts).
+
+    Claimed rows are leased by pushing next_attempt_at forward, so rows left
+    behind by a crashed indexer become due again after lease_seconds.
+    """
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id, case_id, attempts
+            FROM rag_outbox
+            WHERE status = 'pending' AND next_attempt_at <= NOW()
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (limit,),
+        )
+        rows = [(int(r[0]), r[1], int(r[2])) for r in cur.fetchall()]
+        if not rows:
+            conn.rollback()
+            return []
+        placeholders = ",".join(["%s"] * len(rows))
+        cur.execute(
+            f"UPDATE rag_outbox SET next_attempt_at = NOW() + INTERVAL %s SECOND WHERE id IN ({placeholders})",
+            (lease_seconds, *[r[0] for r in rows]),
+        )
+        conn.commit()
+        return rows
+
+
+def complete_rag_outbox(db: MySQL, ids: List[int]) -> None:
+    if not ids:
+        return
+    placeholders = ",".join(["%s"] * len(ids))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM rag_outbox WHERE id IN ({placeholders})", tuple(ids))
+        conn.commit()
+
+
+def fail_rag_outbox(db: MySQL, ids: List[int], *, error: str, max_attempts: int = 8) -> None:
+    """Reschedule rows with exponential backoff; park them as 'failed' after max_attempts."""
+    if not ids:
+        return
+    placeholders = ",".join(["%s"] * len(ids))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        # Single-table UPDATE assigns left to right, so status and
+        # next_attempt_at below already see the incremented attempts
+        cur.execute(
+            f"""
+            UPDATE rag_outbox
+            SET attempts = attempts + 1,
+                status = IF(attempts >= %s, 'failed', 'pending'),
+                next_attempt_at = NOW() + INTERVAL LEAST(POW(2, attempts) * 5, 3600) SECOND,
+                last_error = %s
+            WHERE id IN ({placeholders})
+            """,
+            (max_attempts, error[:512], *ids),
+        )
+        conn.commit()
+
+
+def get_indexed_cases_for_groups(db: MySQL, group_ids: List[str]) -> List[Dict[str, Any]]:
+    """Cases currently in SCRAG/RCRAG (in_rag = 1) for the given groups.
+
+    Source for the BM25 lexical index used alongside vector search.
+    """
+    if not group_ids:
+        return []
+    placeholders = ",".join(["%s"] * len(group_ids))
+    with db.read_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT case_id, group_id, status, problem_title, problem_summary, solution_summary, tags_json
+            FROM cases
+            WHERE group_id IN ({placeholders}) AND in_rag = 1 AND status IN ('solved', 'recommendation')
+            """,
+            tuple(group_ids),
+        )
+        return [
+            {
+                "case_id": r[0],
+                "group_id": r[1],
+                "status": r[2],
+                "problem_title": r[3] or "",
+                "problem_summary": r[4] or "",
+                "solution_summary": r[5] or "",
+                "tags": _parse_json_list(r[6]),
+            }
+            for r in cur.fetchall()
+        ]
+
+
+def get_cases_for_indexing(db: MySQL, case_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Load the fields index_cases() needs for several cases, incl. evidence_ids."""
+    if not case_ids:
+        return {}
+    placeholders = ",".join(["%s"] * len(case_ids))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT case_id, group_id, status, problem_title, problem_summary,
+                   solution_summary, tags_json, evidence_image_paths_json, in_rag
+            FROM cases WHERE case_id IN ({placeholders})
+            """,
+            tuple(case_ids),
+        )
+        out: Dict[str, Dict[str, Any]] = {}
+        for row in cur.fetchall():
+            out[row[0]] = {
+                "case_id": row[0],
+                "group_id": row[1],
+                "status": row[2],
+                "problem_title": row[3] or "",
+                "problem_summary": row[4] or "",
+                "solution_summary": row[5] or "",
+                "tags": _parse_json_list(row[6]),
+                "evidence_image_paths": _parse_json_list(row[7]),
+                "in_rag": bool(row[8]),
+                "evidence_ids": [],
+            }
+        if out:
+            cur.execute(
+                f"SELECT case_id, message_id FROM case_evidence WHERE case_id IN ({placeholders})",
+                tuple(case_ids),
+            )
+            for cid, mid in cur.fetchall():
+                if cid in out:
+                    out[cid]["evidence_ids"].append(mid)
+        return out
+
+
 def insert_case(
     db: MySQL,
     *,
@@ -301,7 +731,9 @@ def insert_case(
     tags: List[str],
     evidence_ids: List[str],
     evidence_image_paths: List[str],
+    index_in_rag: bool = False,
 ) -> None:
+    """Insert a case. index_in_rag=True queues it in rag_outbox atomically."""
     with db.connection() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -327,6 +759,9 @@ def insert_case(
                 "INSERT IGNORE INTO case_evidence(case_id, message_id) VALUES(%s, %s)",
                 (case_id, mid),
             )
+        _log_case_changes(cur, [case_id], CASE_OP_INSERT)
+        if index_in_rag:
+            _enqueue_rag_index(cur, [case_id])
         conn.commit()
 
 
@@ -434,6 +869,19 @@ def complete_job(db: MySQL, *, job_id: int) -> None:
         conn.commit()
 
 
+def requeue_in_progress_jobs(db: MySQL, *, job_type: str) -> int:
+    """Put jobs of job_type left in_progress by a previous process back to pending."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE jobs SET status = 'pending' WHERE status = 'in_progress' AND type = %s",
+            (job_type,),
+        )
+        n = cur.rowcount
+        conn.commit()
+        return n
+
+
 def fail_job(db: MySQL, *, job_id: int, attempts: int, max_attempts: int = 3) -> None:
     status = "pending" if attempts + 1 < max_attempts else "failed"
     with db.connection() as conn:
@@ -788,12 +1236,23 @@ def archive_cases_for_group(db: MySQL, group_id: str, exclude_case_ids: Optional
         cur = conn.cursor()
         if exclude_case_ids:
             placeholders = ", ".join(["%s"] * len(exclude_case_ids))
+            cur.execute(
+                f"INSERT INTO case_changes(case_id, op, group_id) "
+                f"SELECT case_id, %s, group_id FROM cases "
+                f"WHERE group_id = %s AND status != 'archived' AND case_id NOT IN ({placeholders})",
+                (CASE_OP_ARCHIVE, group_id, *exclude_case_ids),
+            )
             cur.execute(
                 f"UPDATE cases SET status = 'archived', in_rag = 0 "
                 f"WHERE group_id = %s AND status != 'archived' AND case_id NOT IN ({placeholders})",
                 (group_id, *exclude_case_ids),
             )
         else:
+            cur.execute(
+                "INSERT INTO case_changes(case_id, op, group_id) "
+                "SELECT case_id, %s, group_id FROM cases WHERE group_id = %s AND status != 'archived'",
+                (CASE_OP_ARCHIVE, group_id),
+            )
             cur.execute(
                 "UPDATE cases SET status = 'archived', in_rag = 0 "
                 "WHERE group_id = %s AND status != 'archived'",
@@ -807,8 +1266,9 @@ def archive_cases_for_group(db: MySQL, group_id: str, exclude_case_ids: Optional
 def clear_group_runtime_data(db: MySQL, group_id: str) -> None:
     """Delete transient per-group data before re-ingest.
 
-    Removes raw messages (except those referenced by case_evidence), the
-    conversation buffer, and reactions so re-ingest starts from a clean slate.
+    Removes raw messages (except those referenced by case_evidence) including
+    archived ones, the conversation buffer, and reactions so re-ingest starts
+    from a clean slate.
     Does NOT touch cases (use archive_cases_for_group for that) or admin/group
     config.
     """
@@ -826,6 +1286,7 @@ def clear_group_runtime_data(db: MySQL, group_id: str) -> None:
                )""",
             (group_id, group_id),
         )
+        cur.execute("DELETE FROM raw_messages_archive WHERE group_id = %s", (group_id,))
         cur.execute("DELETE FROM buffers WHERE group_id = %s", (group_id,))
         cur.execute("DELETE FROM reactions WHERE group_id = %s", (group_id,))
         conn.commit()
@@ -843,6 +1304,7 @@ def delete_all_group_data(db: MySQL, group_id: str) -> dict:
         "cases": 0,
         "case_evidence": 0,
         "raw_messages": 0,
+        "raw_messages_archive": 0,
         "buffer": 0,
         "group_docs": 0,
         "reactions": 0,
@@ -865,10 +1327,13 @@ def delete_all_group_data(db: MySQL, group_id: str) -> dict:
         # 3. Delete cases
         cur.execute("DELETE FROM cases WHERE group_id = %s", (group_id,))
         stats["cases"] = cur.rowcount
+        _log_case_changes(cur, case_ids, CASE_OP_DELETE, group_id=group_id)
         
         # 4. Delete raw_messages
         cur.execute("DELETE FROM raw_messages WHERE group_id = %s", (group_id,))
         stats["raw_messages"] = cur.rowcount
+        cur.execute("DELETE FROM raw_messages_archive WHERE group_id = %s", (group_id,))
+        stats["raw_messages_archive"] = cur.rowcount
         
         # 5. Delete buffer
         cur.execute("DELETE FROM buffers WHERE group_id = %s", (group_id,))
@@ -1077,7 +1542,7 @@ def get_cases_for_group(
     include_archived: bool = False,
 ) -> List[dict]:
     """Return all cases for a group, excluding archived by default."""
-    with db.connection() as conn:
+    with db.read_connection() as conn:
         cur = conn.cursor()
         if include_archived:
             cur.execute(
@@ -1123,7 +1588,7 @@ def get_cases_for_group(
 
 def get_case_evidence(db: MySQL, case_id: str) -> List[RawMessage]:
     """Get all messages associated with a case."""
-    with db.connection() as conn:
+    with db.read_connection() as conn:
         cur = conn.cursor()
         cur.execute(
             """
@@ -1237,7 +1702,7 @@ def get_overlapping_solved_cases(
 
 
 def update_case_to_solved(db: MySQL, case_id: str, solution_summary: str) -> None:
-    """Promote a recommendation case to solved. Caller is responsible for RAG indexing."""
+    """Promote a recommendation case to solved and queue it for SCRAG indexing."""
     with db.connection() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -1247,19 +1712,31 @@ def update_case_to_solved(db: MySQL, case_id: str, solution_summary: str) -> Non
             """,
             (solution_summary, case_id),
         )
+        _log_case_changes(cur, [case_id], CASE_OP_UPDATE)
+        _enqueue_rag_index(cur, [case_id])
         conn.commit()
 
 
 def update_case_solution(
     db: MySQL, case_id: str, solution_summary: str, new_evidence_ids: List[str] | None = None,
+    evidence_image_paths: List[str] | None = None, index_in_rag: bool = False,
 ) -> None:
-    """Update solution_summary without changing case status. Optionally append new evidence_ids."""
+    """Update solution_summary without changing case status. Optionally append new evidence_ids.
+
+    evidence_image_paths, if given, replaces the stored list.
+    index_in_rag=True queues the case for re-indexing in the same transaction.
+    """
     with db.connection() as conn:
         cur = conn.cursor()
         cur.execute(
             "UPDATE cases SET solution_summary = %s, updated_at = NOW() WHERE case_id = %s",
             (solution_summary, case_id),
         )
+        if evidence_image_paths is not None:
+            cur.execute(
+                "UPDATE cases SET evidence_image_paths_json = %s WHERE case_id = %s",
+                (json.dumps(evidence_image_paths, ensure_ascii=False), case_id),
+            )
         if new_evidence_ids:
             # Get existing evidence_ids to avoid duplicates
             cur.execute("SELECT message_id FROM case_evidence WHERE case_id = %s", (case_id,))
@@ -1270,6 +1747,9 @@ def update_case_solution(
                         "INSERT IGNORE INTO case_evidence(case_id, message_id) VALUES(%s, %s)",
                         (case_id, mid),
                     )
+        _log_case_changes(cur, [case_id], CASE_OP_UPDATE)
+        if index_in_rag:
+            _enqueue_rag_index(cur, [case_id])
         conn.commit()
 
 
@@ -1281,6 +1761,22 @@ def mark_case_in_rag(db: MySQL, case_id: str) -> None:
             "UPDATE cases SET in_rag = 1, updated_at = NOW() WHERE case_id = %s",
             (case_id,),
         )
+        _log_case_changes(cur, [case_id], CASE_OP_INDEXED)
+        conn.commit()
+
+
+def mark_cases_in_rag(db: MySQL, case_ids: List[str]) -> None:
+    """Bulk mark_case_in_rag — one UPDATE for a batch of indexed cases."""
+    if not case_ids:
+        return
+    placeholders = ",".join(["%s"] * len(case_ids))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"UPDATE cases SET in_rag = 1, updated_at = NOW() WHERE case_id IN ({placeholders})",
+            tuple(case_ids),
+        )
+        _log_case_changes(cur, case_ids, CASE_OP_INDEXED)
         conn.commit()
 
 
@@ -1396,6 +1892,18 @@ def get_all_active_case_ids(db: MySQL) -> List[str]:
         return [r[0] for r in cur.fetchall()]
 
 
+def get_in_rag_case_ids(db: MySQL) -> List[str]:
+    """Return non-archived case_ids flagged as indexed (in_rag = 1).
+
+    Used by SYNC_RAG with the local RAG backend to re-index cases that MySQL
+    says are indexed but the on-disk index is missing.
+    """
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT case_id FROM cases WHERE status != 'archived' AND in_rag = 1")
+        return [r[0] for r in cur.fetchall()]
+
+
 def wipe_all_data(db: MySQL) -> dict:
     """
     Wipe ALL persistent bot data for a clean slate.
@@ -1406,6 +1914,7 @@ def wipe_all_data(db: MySQL) -> dict:
         "case_evidence",
         "cases",
         "raw_messages",
+        "raw_messages_archive",
         "buffers",
         "reactions",
         "admins_groups",
@@ -1413,6 +1922,8 @@ def wipe_all_data(db: MySQL) -> dict:
         "admin_sessions",
         "chat_groups",
         "jobs",
+        "case_changes",
+        "rag_outbox",
     ]
     stats: dict = {}
     with db.connection() as conn:
@@ -1512,6 +2023,7 @@ def upsert_case(
                     )
                 except Exception:
                     pass
+            _log_case_changes(cur, [existing_id], CASE_OP_UPDATE)
             conn.commit()
             return existing_id, False
         else:
@@ -1539,6 +2051,7 @@ def upsert_case(
                     "INSERT IGNORE INTO case_evidence(case_id, message_id) VALUES(%s, %s)",
                     (case_id, mid),
                 )
+            _log_case_changes(cur, [case_id], CASE_OP_INSERT)
             conn.commit()
             return case_id, True
 
@@ -1686,7 +2199,12 @@ def merge_case(
     evidence_ids: List[str],
     evidence_image_paths: List[str],
 ) -> None:
-    """Overwrite an existing case's content (semantic merge), including title."""
+    """Overwrite an existing case's content (semantic merge), including title.
+
+    Solved cases, and recommendation cases already in RCRAG, are queued in
+    rag_outbox in the same transaction so their vectors match the merged
+    content. Other recommendations wait for buffer age-out as usual.
+    """
     with db.connection() as conn:
         cur = conn.cursor()
         if problem_title:
@@ -1699,7 +2217,7 @@ def merge_case(
                     solution_summary = %s,
                     tags_json = %s,
                     evidence_image_paths_json = %s,
-                    in_rag = 0,
+                    in_rag = IF(%s = 'recommendation', in_rag, 0),
                     updated_at = NOW()
                 WHERE case_id = %s
                 """,
@@ -1710,6 +2228,7 @@ def merge_case(
                     solution_summary,
                     json.dumps(tags, ensure_ascii=False),
                     json.dumps(evidence_image_paths, ensure_ascii=False),
+                    status,
                     target_case_id,
                 ),
             )
@@ -1722,7 +2241,7 @@ def merge_case(
                     solution_summary = %s,
                     tags_json = %s,
                     evidence_image_paths_json = %s,
-                    in_rag = 0,
+                    in_rag = IF(%s = 'recommendation', in_rag, 0),
                     updated_at = NOW()
                 WHERE case_id = %s
                 """,
@@ -1732,6 +2251,7 @@ def merge_case(
                     solution_summary,
                     json.dumps(tags, ensure_ascii=False),
                     json.dumps(evidence_image_paths, ensure_ascii=False),
+                    status,
                     target_case_id,
                 ),
             )
@@ -1744,6 +2264,11 @@ def merge_case(
                 )
             except Exception:
                 pass
+        _log_case_changes(cur, [target_case_id], CASE_OP_MERGE)
+        cur.execute("SELECT in_rag FROM cases WHERE case_id = %s", (target_case_id,))
+        row = cur.fetchone()
+        if status == "solved" or (row and row[0]):
+            _enqueue_rag_index(cur, [target_case_id])
         conn.commit()
 
 
@@ -1755,6 +2280,7 @@ def archive_case(db: MySQL, case_id: str) -> None:
             "UPDATE cases SET status = 'archived', updated_at = NOW() WHERE case_id = %s",
             (case_id,),
         )
+        _log_case_changes(cur, [case_id], CASE_OP_ARCHIVE)
         conn.commit()
 
 
@@ -1902,7 +2428,7 @@ def search_messages_by_terms(
     """
     if not terms or not group_ids:
         return []
-    with db.connection() as conn:
+    with db.read_connection() as conn:
         cur = conn.cursor()
         like_clauses = []
         params: list = []
@@ -1935,7 +2461,7 @@ def find_cases_by_message_ids(
     """
     if not message_ids:
         return []
-    with db.connection() as conn:
+    with db.read_connection() as conn:
         cur = conn.cursor()
         placeholders = ",".join(["%s"] * len(message_ids))
         cur.execute(
@@ -1961,7 +2487,7 @@ def count_term_in_messages(
     """Count raw_messages containing the term (for negative evidence)."""
     if not term or not group_ids:
         return 0
-    with db.connection() as conn:
+    with db.read_connection() as conn:
         cur = conn.cursor()
         gid_placeholders = ",".join(["%s"] * len(group_ids))
         cur.execute(
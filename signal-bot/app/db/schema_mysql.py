@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 from app.db.mysql import MySQL, is_mysql_error, MYSQL_ERR_TABLE_EXISTS
 
@@ -19,13 +20,31 @@ DDL_STATEMENTS = [
       image_paths_json LONGTEXT,
       reply_to_id   VARCHAR(128),
       created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-      INDEX idx_raw_messages_group_ts (group_id, ts DESC)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+      INDEX idx_raw_messages_group_ts (group_id, ts DESC),
+      INDEX idx_raw_messages_ts (ts)
+    ) ENGINE=InnoDB ROW_FORMAT=COMPRESSED DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE raw_messages_archive (
+      message_id    VARCHAR(128) PRIMARY KEY,
+      group_id      VARCHAR(128) NOT NULL,
+      ts            BIGINT NOT NULL,
+      sender_hash   VARCHAR(64) NOT NULL,
+      sender_name   VARCHAR(256),
+      sender_uuid   VARCHAR(128),
+      content_text  LONGTEXT,
+      image_paths_json LONGTEXT,
+      reply_to_id   VARCHAR(128),
+      created_at    TIMESTAMP NOT NULL,
+      archived_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+      INDEX idx_raw_messages_archive_group_ts (group_id, ts)
+    ) ENGINE=InnoDB ROW_FORMAT=COMPRESSED DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
     """,
     """
     CREATE TABLE buffers (
       group_id     VARCHAR(128) PRIMARY KEY,
       buffer_text  LONGTEXT,
+      buffer_z     LONGBLOB,
       updated_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
     """,
@@ -43,7 +62,7 @@ DDL_STATEMENTS = [
       created_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
       updated_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
       CONSTRAINT cases_status_chk CHECK (status IN ('solved', 'recommendation', 'archived')),
-      INDEX idx_cases_group (group_id),
+      INDEX idx_cases_group_status_created (group_id, status, created_at),
       INDEX idx_cases_status (status),
       INDEX idx_cases_in_rag (in_rag)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
@@ -81,9 +100,12 @@ DDL_STATEMENTS = [
       status       VARCHAR(16) NOT NULL,
       attempts     INT DEFAULT 0 NOT NULL,
       updated_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
+      group_id     VARCHAR(128) GENERATED ALWAYS AS (JSON_UNQUOTE(JSON_EXTRACT(payload_json, '$.group_id'))) VIRTUAL,
+      ts           BIGINT GENERATED ALWAYS AS (CAST(JSON_EXTRACT(payload_json, '$.ts') AS SIGNED)) VIRTUAL,
       CONSTRAINT jobs_status_chk CHECK (status IN ('pending', 'in_progress', 'done', 'failed', 'cancelled')),
       INDEX idx_jobs_status_type (status, type),
-      INDEX idx_jobs_updated (updated_at)
+      INDEX idx_jobs_updated (updated_at),
+      INDEX idx_jobs_group_type_status_ts (group_id, type, status, ts)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
     """,
     """
@@ -109,10 +131,35 @@ DDL_STATEMENTS = [
       emoji         VARCHAR(32) NOT NULL,
       created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
       INDEX idx_reactions_target (group_id, target_ts),
+      INDEX idx_reactions_created (created_at),
       UNIQUE KEY uk_reactions_unique (group_id, target_ts, sender_hash, emoji)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
     """,
     """
+    CREATE TABLE case_changes (
+      version    BIGINT AUTO_INCREMENT PRIMARY KEY,
+      case_id    VARCHAR(32) NOT NULL,
+      op         VARCHAR(16) NOT NULL,
+      group_id   VARCHAR(128),
+      ts         TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+      INDEX idx_case_changes_ts (ts),
+      INDEX idx_case_changes_group_version (group_id, version)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE rag_outbox (
+      id              BIGINT AUTO_INCREMENT PRIMARY KEY,
+      case_id         VARCHAR(32) NOT NULL,
+      status          VARCHAR(16) NOT NULL DEFAULT 'pending',
+      attempts        INT DEFAULT 0 NOT NULL,
+      next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+      last_error      VARCHAR(512),
+      created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+      CONSTRAINT rag_outbox_status_chk CHECK (status IN ('pending', 'failed')),
+      INDEX idx_rag_outbox_due (status, next_attempt_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+    """
     CREATE TABLE chat_groups (
       group_id      VARCHAR(128) PRIMARY KEY,
       group_name    VARCHAR(256),
@@ -154,8 +201,63 @@ MIGRATIONS = [
     "ALTER TABLE chat_groups ADD COLUMN ingesting TINYINT(1) NOT NULL DEFAULT 0",
     # Store original sender UUID for quote-replies
     "ALTER TABLE raw_messages ADD COLUMN sender_uuid VARCHAR(128)",
+    # Promote job payload fields so has_newer_respond_job can use an index
+    # instead of LIKE + JSON_EXTRACT over every pending job
+    "ALTER TABLE jobs ADD COLUMN group_id VARCHAR(128) GENERATED ALWAYS AS (JSON_UNQUOTE(JSON_EXTRACT(payload_json, '$.group_id'))) VIRTUAL",
+    "ALTER TABLE jobs ADD COLUMN ts BIGINT GENERATED ALWAYS AS (CAST(JSON_EXTRACT(payload_json, '$.ts') AS SIGNED)) VIRTUAL",
+    "ALTER TABLE jobs ADD INDEX idx_jobs_group_type_status_ts (group_id, type, status, ts)",
+    # Cases are filtered by group + status and ordered by created_at; the
+    # composite index supersedes the single-column group index
+    "ALTER TABLE cases ADD INDEX idx_cases_group_status_created (group_id, status, created_at)",
+    "ALTER TABLE cases DROP INDEX idx_cases_group",
+    # Retention: range scans by age for archiving messages / purging reactions
+    "ALTER TABLE raw_messages ADD INDEX idx_raw_messages_ts (ts)",
+    "ALTER TABLE reactions ADD INDEX idx_reactions_created (created_at)",
+    # Buffer text stored zstd-compressed with a version byte (app.db.compression);
+    # buffer_text is only read for rows written before this column existed
+    "ALTER TABLE buffers ADD COLUMN buffer_z LONGBLOB",
+    # Per-group change versions, so the lexical index of one group is not
+    # rebuilt by case activity in another (NULL on rows logged before this)
+    "ALTER TABLE case_changes ADD COLUMN group_id VARCHAR(128)",
+    "ALTER TABLE case_changes ADD INDEX idx_case_changes_group_version (group_id, version)",
 ]
 
+# Tables whose large text columns are compressed by InnoDB. raw_messages
+# content_text (OCR / transcript blobs) must stay LIKE-searchable, so it is
+# compressed at the page level instead of in the app. New installs get it from
+# CREATE TABLE; converting an existing table is a full rebuild, so it is left
+# to the operator (scripts/apply_row_formats.py) instead of startup.
+ROW_FORMATS = {
+    "raw_messages": "COMPRESSED",
+}
+
+
+def pending_row_formats(cur: Any) -> dict[str, str]:
+    """Return {table: current_row_format} for tables not yet in their ROW_FORMATS format."""
+    pending: dict[str, str] = {}
+    for table, row_format in ROW_FORMATS.items():
+        cur.execute(
+            "SELECT ROW_FORMAT FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
+        )
+        row = cur.fetchone()
+        if row and str(row[0]).upper() != row_format:
+            pending[table] = str(row[0])
+    return pending
+
+
+def apply_row_formats(cur: Any) -> None:
+    """Rebuild tables into their ROW_FORMATS format (online; writes are not blocked).
+
+    Takes minutes to hours on a large raw_messages; run it from
+    scripts/apply_row_formats.py, not on the startup path.
+    """
+    for table, was in pending_row_formats(cur).items():
+        row_format = ROW_FORMATS[table]
+        log.info("Rebuilding %s with ROW_FORMAT=%s (was %s)", table, row_format, was)
+        cur.execute(f"ALTER TABLE {table} ROW_FORMAT={row_format}, ALGORITHM=INPLACE, LOCK=NONE")
+
 
 def ensure_schema(db: MySQL) -> None:
     with db.connection() as conn:
@@ -180,3 +282,11 @@ def ensure_schema(db: MySQL) -> None:
             except Exception as exc:
                 conn.rollback()
                 log.warning("Migration skipped (may already be applied): %s — %s", migration[:60], exc)
+        try:
+            for table, was in pending_row_formats(cur).items():
+                log.warning(
+                    "%s is ROW_FORMAT=%s, expected %s; run scripts/apply_row_formats.py to rebuild it",
+                    table, was, ROW_FORMATS[table],
+                )
+        except Exception as exc:
+            log.warning("Row format check skipped: %s", exc)
@@ -4,112 +4,28 @@ import hashlib
 import logging
 import mimetypes
 import os
-import subprocess
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Iterable
+from typing import Callable, Iterable, TypeVar
 
 import app.r2 as _r2
 from app.config import Settings
-from app.db import insert_raw_message, enqueue_job, RawMessage
-from app.jobs.types import BUFFER_UPDATE, MAYBE_RESPOND
+from app.db import insert_raw_message, update_raw_message_media, enqueue_job, RawMessage
+from app.jobs.media_enrich import wake_media_enricher
+from app.jobs.types import BUFFER_UPDATE, MAYBE_RESPOND, MEDIA_ENRICH
 from app.llm.client import LLMClient
+from shared.video import process_video
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 def _is_video(content_type: str) -> bool:
     return content_type.startswith("video/")
 
 
-def _extract_video_thumbnail(video_path: str | Path) -> bytes | None:
-    """Extract a single thumbnail frame from a video file using OpenCV.
-
-    Picks a frame at ~1 second (or the first frame for very short videos).
-    Returns JPEG bytes or None on failure.
-    """
-    try:
-        import cv2
-
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
-            return None
-
-        fps = cap.get(cv2.CAP_PROP_FPS) or 25
-        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
-        target_frame = min(int(fps), max(total - 1, 0))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
-
-        ret, frame = cap.read()
-        cap.release()
-        if not ret or frame is None:
-            return None
-
-        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        return buf.tobytes() if ok else None
-    except Exception as exc:
-        log.debug("Video thumbnail extraction failed for %s: %s", video_path, exc)
-        return None
-
-
-def _extract_video_audio(video_path: str | Path) -> tuple[bytes, str] | None:
-    """Extract audio track from a video file using ffmpeg.
-
-    Uses stream copy (no re-encoding) for speed. Falls back to mp3 encoding
-    if copy fails. Returns (audio_bytes, mime_type) or None.
-    """
-    tmp_audio = None
-    try:
-        # First try: copy audio stream as-is (near-instant, no re-encoding)
-        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as tmp:
-            tmp_audio = tmp.name
-        result = subprocess.run(
-            [
-                "ffmpeg", "-i", str(video_path),
-                "-vn", "-acodec", "copy",
-                "-y", tmp_audio,
-            ],
-            capture_output=True,
-            timeout=30,
-        )
-        mime = "audio/mp4"
-        # Fallback: re-encode to mp3 if copy failed
-        if result.returncode != 0:
-            os.unlink(tmp_audio)
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-                tmp_audio = tmp.name
-            result = subprocess.run(
-                [
-                    "ffmpeg", "-i", str(video_path),
-                    "-vn", "-acodec", "libmp3lame",
-                    "-ar", "16000", "-ac", "1", "-q:a", "9",
-                    "-y", tmp_audio,
-                ],
-                capture_output=True,
-                timeout=60,
-            )
-            mime = "audio/mp3"
-        if result.returncode != 0:
-            stderr = result.stderr.decode("utf-8", errors="replace")[:500]
-            log.warning("ffmpeg audio extraction failed for %s (rc=%d): %s", video_path, result.returncode, stderr)
-            return None
-        audio_bytes = Path(tmp_audio).read_bytes()
-        if len(audio_bytes) < 1000:
-            log.warning("Audio too small (%d bytes) for %s, skipping transcription", len(audio_bytes), video_path)
-            return None
-        log.info("Extracted %d bytes of audio (%s) from %s", len(audio_bytes), mime, video_path)
-        return audio_bytes, mime
-    except Exception as exc:
-        log.warning("Video audio extraction failed for %s: %s", video_path, exc)
-        return None
-    finally:
-        if tmp_audio:
-            try:
-                os.unlink(tmp_audio)
-            except Exception:
-                pass
-
-
 def _transcribe_audio(audio_bytes: bytes, mime_type: str = "audio/mp4", context: str = "") -> str:
     """Transcribe audio bytes using Gemini. Returns transcript text or empty string."""
     try:
@@ -147,56 +63,11 @@ def _transcribe_audio(audio_bytes: bytes, mime_type: str = "audio/mp4", context:
 MAX_VIDEO_DURATION_SEC = 120  # Send at most first 2 minutes to Gemini
 
 
-def _trim_video(video_path: str | Path, max_seconds: int) -> str | None:
-    """Trim video to first max_seconds using ffmpeg stream copy (fast, no re-encode).
-
-    Returns path to trimmed temp file, or None if trimming fails.
-    If video is already shorter, returns None (caller should use original).
-    """
-    try:
-        import cv2
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
-            return None
-        fps = cap.get(cv2.CAP_PROP_FPS) or 25
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
-        duration = total_frames / fps if fps > 0 else 0
-        cap.release()
-
-        if duration <= max_seconds:
-            return None  # No trim needed
-
-        log.info("Video is %.0fs, trimming to first %ds", duration, max_seconds)
-        trimmed = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
-        result = subprocess.run(
-            [
-                "ffmpeg", "-i", str(video_path),
-                "-t", str(max_seconds),
-                "-c", "copy",  # stream copy, no re-encoding
-                "-y", trimmed,
-            ],
-            capture_output=True,
-            timeout=30,
-        )
-        if result.returncode != 0:
-            log.warning("ffmpeg trim failed (rc=%d)", result.returncode)
-            try:
-                os.unlink(trimmed)
-            except Exception:
-                pass
-            return None
-        return trimmed
-    except Exception as exc:
-        log.warning("Video trimming failed: %s", exc)
-        return None
-
-
-def _describe_video(video_path: str | Path, context: str = "") -> str:
+def _describe_video(video_bytes: bytes, mime_type: str, context: str = "") -> str:
     """Send video to Gemini for description. Returns description or empty string.
 
-    Trims to first MAX_VIDEO_DURATION_SEC if longer. Sends full video to Gemini.
+    Callers pass the first MAX_VIDEO_DURATION_SEC (VideoMedia.clip) for longer videos.
     """
-    trimmed_path = None
     try:
         import google.generativeai as genai
 
@@ -205,16 +76,9 @@ def _describe_video(video_path: str | Path, context: str = "") -> str:
             log.warning("GOOGLE_API_KEY not set, cannot describe video")
             return ""
 
-        # Trim if too long
-        trimmed_path = _trim_video(video_path, MAX_VIDEO_DURATION_SEC)
-        send_path = trimmed_path or video_path
-
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel("gemini-2.5-flash")
 
-        ct = _guess_mime(str(video_path))
-        video_bytes = Path(send_path).read_bytes()
-
         prompt = (
             "Describe this video in detail for a technical support context. "
             "Focus on: 1) What is shown (screens, devices, indicators, error messages), "
@@ -227,11 +91,10 @@ def _describe_video(video_path: str | Path, context: str = "") -> str:
         if context:
             prompt += f"\nUser's message context: {context}"
 
-        log.info("Sending %d bytes of video (%s, trimmed=%s) to Gemini for description",
-                 len(video_bytes), ct, trimmed_path is not None)
+        log.info("Sending %d bytes of video (%s) to Gemini for description", len(video_bytes), mime_type)
         response = model.generate_content([
             prompt,
-            {"mime_type": ct, "data": video_bytes},
+            {"mime_type": mime_type, "data": video_bytes},
         ])
         text = (response.text or "").strip()
         if text == "EMPTY" or not text:
@@ -242,32 +105,6 @@ def _describe_video(video_path: str | Path, context: str = "") -> str:
     except Exception as exc:
         log.warning("Video description failed: %s", exc)
         return ""
-    finally:
-        if trimmed_path:
-            try:
-                os.unlink(trimmed_path)
-            except Exception:
-                pass
-
-
-def _extract_video_thumbnail_from_bytes(data: bytes) -> bytes | None:
-    """Extract a thumbnail from in-memory video bytes via a temp file."""
-    import tempfile
-    import os
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
-            tmp.write(data)
-            tmp_path = tmp.name
-        result = _extract_video_thumbnail(tmp_path)
-        return result
-    except Exception as exc:
-        log.debug("Video thumbnail extraction from bytes failed: %s", exc)
-        return None
-    finally:
-        try:
-            os.unlink(tmp_path)
-        except Exception:
-            pass
 
 
 def _guess_mime(path: str) -> str:
@@ -288,6 +125,218 @@ def _sender_hash(sender: str) -> str:
 hash_sender = _sender_hash
 
 
+def _resolve_attachment(settings: Settings, p: str) -> Path | None:
+    """Absolute path of an attachment on disk (tries stem.* if the exact name is missing)."""
+    img_path = Path(p)
+    if not img_path.is_absolute():
+        img_path = Path(settings.signal_bot_storage) / img_path
+    try:
+        img_path = img_path.resolve()
+    except Exception:
+        img_path = img_path.absolute()
+    if not img_path.exists():
+        parent = img_path.parent
+        stem = img_path.stem
+        candidates = list(parent.glob(f"{stem}.*")) if parent.exists() else []
+        if candidates:
+            img_path = candidates[0]
+            log.info("Resolved attachment via glob: %s", img_path)
+        else:
+            log.warning("Attachment missing on disk: %s (also tried glob %s.*)", img_path, stem)
+            return None
+    return img_path
+
+
+def _placeholder_content(text: str, attachments: list[Path]) -> str:
+    """content_text stored before MEDIA_ENRICH fills in OCR / descriptions / transcripts."""
+    content_text = text or ""
+    for img_path in attachments:
+        ct = _guess_mime(str(img_path))
+        if _is_image(ct):
+            content_text = content_text + "\n\n[Зображення]"
+        elif _is_video(ct):
+            content_text = content_text + f"\n\n[Відео: {img_path.name}]"
+        else:
+            content_text = content_text + f"\n\n[attachment: {img_path.name} ({ct})]"
+    return content_text
+
+
+# Process-wide cap on concurrent media steps (uploads, OCR, ffmpeg, Gemini
+# video calls) across all messages being enriched; see _media_step().
+_media_slots: threading.BoundedSemaphore | None = None
+_media_slots_lock = threading.Lock()
+
+
+def _get_media_slots(limit: int) -> threading.BoundedSemaphore:
+    global _media_slots
+    with _media_slots_lock:
+        if _media_slots is None:
+            _media_slots = threading.BoundedSemaphore(max(1, limit))
+        return _media_slots
+
+
+def _media_step(slots: threading.BoundedSemaphore, fn: Callable[..., T], *args, **kwargs) -> T:
+    with slots:
+        return fn(*args, **kwargs)
+
+
+def _upload_attachment(group_id: str, name: str, data: bytes, ct: str, fallback: str | None) -> str | None:
+    if not _r2.is_enabled():
+        return fallback
+    try:
+        return _r2.upload_content(group_id, data, ct, ext=Path(name).suffix)
+    except Exception:
+        log.error("R2 upload failed for %s — storing %s", name, "local path as fallback" if fallback else "nothing")
+        return fallback
+
+
+def _describe_image(llm: LLMClient, file_bytes: bytes, context_text: str, img_path: Path) -> str:
+    try:
+        j = llm.image_to_text_json(image_bytes=file_bytes, context_text=context_text)
+        extracted_text = j.extracted_text or ""
+        observations = ", ".join(j.observations) if j.observations else ""
+
+        ocr_summary = []
+        if extracted_text:
+            ocr_summary.append(f"Текст на зображенні: {extracted_text}")
+        if observations:
+            ocr_summary.append(f"Елементи на зображенні: {observations}")
+
+        if ocr_summary:
+            return "\n\n[Зображення: " + " | ".join(ocr_summary) + "]"
+        return ""
+    except Exception:
+        log.exception("Image extraction failed (path=%s).", img_path)
+        return "\n\n[Зображення]"
+
+
+def _describe_video_thumbnail(llm: LLMClient, thumb_bytes: bytes, context_text: str, img_path: Path) -> str:
+    """Fallback when the full-video description fails: OCR the thumbnail."""
+    try:
+        j = llm.image_to_text_json(image_bytes=thumb_bytes, context_text=f"Video thumbnail from: {img_path.name}\n{context_text}")
+        extracted_text = j.extracted_text or ""
+        observations = ", ".join(j.observations) if j.observations else ""
+        summary_parts = []
+        if extracted_text:
+            summary_parts.append(f"Текст: {extracted_text}")
+        if observations:
+            summary_parts.append(f"Елементи: {observations}")
+        desc = " | ".join(summary_parts) if summary_parts else ""
+        return f"\n\n[Відео: {img_path.name}" + (f" — {desc}" if desc else "") + "]"
+    except Exception:
+        log.debug("Video thumbnail OCR failed for %s", img_path)
+        return f"\n\n[Відео: {img_path.name}]"
+
+
+def _process_attachment(
+    ex: ThreadPoolExecutor,
+    slots: threading.BoundedSemaphore,
+    llm: LLMClient,
+    group_id: str,
+    context_text: str,
+    img_path: Path,
+) -> tuple[str, list[str]]:
+    """Run one attachment's steps as a small DAG. Returns (content suffix, stored paths).
+
+    image:  upload ‖ OCR
+    video:  one ffmpeg pass (thumbnail, audio, trimmed clip) →
+            thumbnail upload ‖ description → thumbnail OCR fallback ‖ transcription
+    other:  upload
+    Independent steps run concurrently on ex; every step holds a media slot.
+    """
+    file_bytes = img_path.read_bytes()
+    ct = _guess_mime(str(img_path))
+
+    if _is_image(ct):
+        upload = ex.submit(_media_step, slots, _upload_attachment, group_id, img_path.name, file_bytes, ct, str(img_path))
+        desc = _media_step(slots, _describe_image, llm, file_bytes, context_text, img_path)
+        return desc, [upload.result()]
+
+    if not _is_video(ct):
+        stored = _media_step(slots, _upload_attachment, group_id, img_path.name, file_bytes, ct, str(img_path))
+        return f"\n\n[attachment: {img_path.name} ({ct})]", [stored]
+
+    # For videos, skip uploading the full file to R2 — only the thumbnail
+    # gets uploaded.
+    log.info("Processing video attachment: %s (%s)", img_path, ct)
+    media = _media_step(slots, process_video, img_path, clip_seconds=MAX_VIDEO_DURATION_SEC)
+    if media is None:
+        log.warning("Failed to process video %s", img_path)
+        return f"\n\n[Відео: {img_path.name}]", []
+
+    transcript = None
+    if media.audio:
+        log.info("Extracted %d bytes of audio (%s) from %s", len(media.audio), media.audio_mime, img_path)
+        transcript = ex.submit(
+            _media_step, slots, _transcribe_audio, media.audio, mime_type=media.audio_mime, context=context_text,
+        )
+    stored_paths: list[str] = []
+    thumb_bytes = media.thumbnail
+    if thumb_bytes:
+        log.info("Extracted thumbnail (%d bytes) from %s", len(thumb_bytes), img_path)
+        thumb_upload = ex.submit(
+            _media_step, slots, _upload_attachment, group_id, img_path.stem + "_thumb.jpg", thumb_bytes, "image/jpeg", None,
+        )
+        # Full video description via Gemini (falls back to thumbnail OCR)
+        if media.clip:
+            video_bytes, video_mime = media.clip, media.clip_mime
+        else:
+            video_bytes, video_mime = file_bytes, ct
+        video_desc = _media_step(slots, _describe_video, video_bytes, video_mime, context=context_text)
+        if video_desc:
+            suffix = f"\n\n[Відео: {img_path.name} — {video_desc}]"
+        else:
+            suffix = _media_step(slots, _describe_video_thumbnail, llm, thumb_bytes, context_text, img_path)
+        thumb_stored = thumb_upload.result()
+        if thumb_stored:
+            stored_paths.append(thumb_stored)
+    else:
+        log.warning("Failed to extract thumbnail from %s", img_path)
+        suffix = f"\n\n[Відео: {img_path.name}]"
+
+    text = transcript.result() if transcript is not None else ""
+    if text:
+        suffix += f"\n[Транскрипт відео: {text}]"
+    return suffix, stored_paths
+
+
+def _enrich_attachments(
+    *,
+    llm: LLMClient,
+    group_id: str,
+    text: str,
+    attachments: list[Path],
+    max_concurrency: int,
+) -> tuple[str, list[str]]:
+    """Upload attachments and describe them. Returns (content_text, stored_image_paths).
+
+    All attachments are processed concurrently; results are appended in the
+    original attachment order.
+    """
+    content_text = text or ""
+    stored_image_paths: list[str] = []
+    if not attachments:
+        return content_text, stored_image_paths
+
+    slots = _get_media_slots(max_concurrency)
+    # Threads here mostly wait on slots / sub-steps; the slots bound real work.
+    # Each attachment may have up to two sub-steps in flight besides itself.
+    with ThreadPoolExecutor(max_workers=3 * len(attachments), thread_name_prefix="media") as ex:
+        futures = [
+            ex.submit(_process_attachment, ex, slots, llm, group_id, text or "", img_path)
+            for img_path in attachments
+        ]
+        for img_path, fut in zip(attachments, futures):
+            try:
+                suffix, paths = fut.result()
+            except Exception:
+                log.exception("Attachment processing failed (path=%s).", img_path)
+                continue
+            content_text += suffix
+            stored_image_paths += [p for p in paths if p]
+    return content_text, stored_image_paths
+
+
 def ingest_message(
     *,
     settings: Settings,
@@ -302,110 +351,18 @@ def ingest_message(
     reply_to_id: str | None = None,
     on_message_stored: "Callable[[str], None] | None" = None,
 ) -> None:
-    content_text = text or ""
-    context_text = text or ""
-    stored_image_paths: list[str] = []
-
-    for p in image_paths:
-        img_path = Path(p)
-        if not img_path.is_absolute():
-            img_path = Path(settings.signal_bot_storage) / img_path
-        try:
-            img_path = img_path.resolve()
-        except Exception:
-            img_path = img_path.absolute()
-        if not img_path.exists():
-            parent = img_path.parent
-            stem = img_path.stem
-            candidates = list(parent.glob(f"{stem}.*")) if parent.exists() else []
-            if candidates:
-                img_path = candidates[0]
-                log.info("Resolved attachment via glob: %s", img_path)
-            else:
-                log.warning("Attachment missing on disk: %s (also tried glob %s.*)", img_path, stem)
-                continue
-        file_bytes = img_path.read_bytes()
+    """Store an inbound group message and schedule its processing.
 
-        ct = _guess_mime(str(img_path))
-
-        # For videos, skip uploading the full file to R2 — only the thumbnail
-        # gets uploaded below. For images/other files, upload as before.
-        if not _is_video(ct):
-            stored_path = str(img_path)
-            if _r2.is_enabled():
-                r2_key = f"attachments/{group_id}/{img_path.name}"
-                try:
-                    stored_path = _r2.upload(r2_key, file_bytes, ct)
-                except Exception:
-                    log.error("R2 upload failed for %s — storing local path as fallback", img_path.name)
-            stored_image_paths.append(stored_path)
-
-        if _is_image(ct):
-            try:
-                j = llm.image_to_text_json(image_bytes=file_bytes, context_text=context_text)
-                extracted_text = j.extracted_text or ""
-                observations = ", ".join(j.observations) if j.observations else ""
-                
-                ocr_summary = []
-                if extracted_text:
-                    ocr_summary.append(f"Текст на зображенні: {extracted_text}")
-                if observations:
-                    ocr_summary.append(f"Елементи на зображенні: {observations}")
-                    
-                if ocr_summary:
-                    content_text = content_text + "\n\n[Зображення: " + " | ".join(ocr_summary) + "]"
-            except Exception:
-                log.exception("Image extraction failed (path=%s).", img_path)
-                content_text = content_text + "\n\n[Зображення]"
-        elif _is_video(ct):
-            log.info("Processing video attachment: %s (%s)", img_path, ct)
-            thumb_bytes = _extract_video_thumbnail(img_path)
-            if thumb_bytes:
-                log.info("Extracted thumbnail (%d bytes) from %s", len(thumb_bytes), img_path)
-                thumb_name = img_path.stem + "_thumb.jpg"
-                thumb_stored = None
-                if _r2.is_enabled():
-                    thumb_key = f"attachments/{group_id}/{thumb_name}"
-                    try:
-                        thumb_stored = _r2.upload(thumb_key, thumb_bytes, "image/jpeg")
-                    except Exception:
-                        log.error("R2 upload failed for video thumbnail %s", thumb_name)
-                if thumb_stored:
-                    stored_image_paths.append(thumb_stored)
-
-                # Full video description via Gemini (falls back to keyframes for large files)
-                video_desc = _describe_video(img_path, context=context_text)
-                if video_desc:
-                    content_text = content_text + f"\n\n[Відео: {img_path.name} — {video_desc}]"
-                else:
-                    # Fallback to thumbnail OCR if video description fails
-                    try:
-                        j = llm.image_to_text_json(image_bytes=thumb_bytes, context_text=f"Video thumbnail from: {img_path.name}\n{context_text}")
-                        extracted_text = j.extracted_text or ""
-                        observations = ", ".join(j.observations) if j.observations else ""
-                        summary_parts = []
-                        if extracted_text:
-                            summary_parts.append(f"Текст: {extracted_text}")
-                        if observations:
-                            summary_parts.append(f"Елементи: {observations}")
-                        desc = " | ".join(summary_parts) if summary_parts else ""
-                        content_text = content_text + f"\n\n[Відео: {img_path.name}" + (f" — {desc}" if desc else "") + "]"
-                    except Exception:
-                        log.debug("Video thumbnail OCR failed for %s", img_path)
-                        content_text = content_text + f"\n\n[Відео: {img_path.name}]"
-            else:
-                log.warning("Failed to extract thumbnail from %s", img_path)
-                content_text = content_text + f"\n\n[Відео: {img_path.name}]"
-
-            audio_result = _extract_video_audio(img_path)
-            if audio_result:
-                audio_bytes, audio_mime = audio_result
-                transcript = _transcribe_audio(audio_bytes, mime_type=audio_mime, context=context_text)
-                if transcript:
-                    content_text = content_text + f"\n[Транскрипт відео: {transcript}]"
-        else:
-            fname = img_path.name
-            content_text = content_text + f"\n\n[attachment: {fname} ({ct})]"
+    Messages with attachments are stored right away with placeholder text; a
+    MEDIA_ENRICH job (app.jobs.media_enrich) uploads the media, fills in OCR /
+    video descriptions / transcripts and only then triggers the respond and
+    buffer-update steps. The listener therefore never waits on R2, vision
+    calls or ffmpeg.
+    """
+    attachments = [a for a in (_resolve_attachment(settings, p) for p in image_paths) if a is not None]
+    content_text = _placeholder_content(text, attachments)
+    # Local paths until MEDIA_ENRICH swaps in the uploaded (R2) locations
+    stored_image_paths = [str(a) for a in attachments if not _is_video(_guess_mime(str(a)))]
 
     inserted = insert_raw_message(
         db,
@@ -432,11 +389,54 @@ def ingest_message(
         "ts": ts,
         "text": text or "",
     }
+    if attachments:
+        enqueue_job(db, MEDIA_ENRICH, {
+            **job_payload,
+            "attachments": [str(a) for a in attachments],
+            "debounced": on_message_stored is not None,
+        })
+        wake_media_enricher()
+        return
+    _schedule_message_jobs(db, job_payload, on_message_stored)
+
+
+def _schedule_message_jobs(
+    db,
+    job_payload: dict,
+    on_message_stored: "Callable[[str], None] | None",
+) -> None:
     # Notify debouncer that a new message arrived (replaces MAYBE_RESPOND job)
     if on_message_stored is not None:
-        on_message_stored(group_id)
+        on_message_stored(job_payload["group_id"])
     else:
         # Fallback: enqueue old-style MAYBE_RESPOND job
         enqueue_job(db, MAYBE_RESPOND, job_payload)
     enqueue_job(db, BUFFER_UPDATE, job_payload)
 
+
+def enrich_message_media(
+    *,
+    settings: Settings,
+    db,
+    llm: LLMClient,
+    payload: dict,
+    on_message_stored: "Callable[[str], None] | None" = None,
+) -> None:
+    """MEDIA_ENRICH handler: describe attachments, update the stored message, then
+    run the respond / buffer-update steps ingest_message deferred."""
+    group_id = payload["group_id"]
+    message_id = payload["message_id"]
+    attachments = [Path(a) for a in payload.get("attachments") or [] if Path(a).exists()]
+
+    content_text, stored_image_paths = _enrich_attachments(
+        llm=llm, group_id=group_id, text=payload.get("text") or "", attachments=attachments,
+        max_concurrency=settings.media_step_concurrency,
+    )
+    if not update_raw_message_media(
+        db, message_id=message_id, content_text=content_text, image_paths=stored_image_paths,
+    ):
+        log.info("MEDIA_ENRICH: message %s no longer exists, skipping", message_id)
+        return
+
+    job_payload = {k: payload[k] for k in ("group_id", "message_id", "sender", "ts", "text")}
+    _schedule_message_jobs(db, job_payload, on_message_stored if payload.get("debounced") else None)
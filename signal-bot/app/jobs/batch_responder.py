@@ -3,7 +3,7 @@
 Instead of per-message MAYBE_RESPOND jobs, this module:
 1. Takes all unprocessed messages for a group
 2. Calls the batch gate to extract questions that need answers
-3. For each question, calls the synthesizer with full context
+3. Synthesizes all questions concurrently, each with full context
 4. Returns all responses (or sends them in production mode)
 
 The batch gate sees ALL unprocessed messages at once, so it naturally
@@ -13,12 +13,20 @@ and avoids redundancy by design.
 from __future__ import annotations
 
 import logging
-import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from typing import Any, Dict, List
 
 log = logging.getLogger(__name__)
 
+# Upper bound on questions synthesized at once within one batch. Each question
+# runs UltimateAgent (3 sub-agents + synthesizer); actual API pressure is capped
+# separately by the global LLM concurrency limit in LLMClient.
+MAX_PARALLEL_QUESTIONS = 4
+
+# How often the collector re-checks cancel_check while questions are in flight.
+_CANCEL_POLL_SECONDS = 0.5
+
 
 @dataclass
 class BatchResponse:
@@ -73,6 +81,7 @@ def process_batch(
     from app.db import get_last_messages_text, get_raw_message
     from app.db.queries_mysql import get_last_messages_meta
     from app.jobs.worker import _load_images, _is_image_path
+    from app.agent.retrieval_context import RetrievalContext
 
     # Load unprocessed messages (last_n, oldest-first)
     unprocessed_msgs = get_last_messages_meta(db, group_id, n=last_n, bot_sender_hash=bot_sender_hash)
@@ -148,14 +157,14 @@ def process_batch(
         gate_raw={"questions": [q.model_dump() for q in questions]},
     )
 
-    # Process each question through the synthesizer
-    for qi, q in enumerate(questions):
-        if cancel_check and cancel_check():
-            log.info("BatchResponder: cancelled during synthesis (question %d/%d)", qi + 1, len(questions))
-            break
+    # Group-scoped lookups (union ids, B3, recommendation cases, docs URLs) are
+    # identical for every question in this batch — load them once, share them.
+    retrieval_ctx = RetrievalContext(db=db, group_id=group_id)
 
-        if qi > 0:
-            time.sleep(0.1)  # rate-limit API calls
+    def _synthesize_question(qi: int, q: Any) -> tuple[str, Any] | None:
+        """Run the synthesizer for one question. Returns None if cancelled before start."""
+        if cancel_check and cancel_check():
+            return None
 
         # Build context for this question: pre-window + all unprocessed up to this question's messages
         # This way the synthesizer sees the full conversation flow
@@ -208,30 +217,64 @@ def process_batch(
                 context=question_context,
                 images=question_images,
                 gate_tag="batch_question",
+                retrieval_ctx=retrieval_ctx,
+                keywords=q.keywords,
             )
             resp_text = raw_answer.text if hasattr(raw_answer, 'text') else str(raw_answer)
 
             if resp_text and resp_text.strip() and resp_text != "SKIP":
-                result.responses.append(BatchResponse(
+                return "response", BatchResponse(
                     question=q.question,
                     message_ids=q.message_ids,
                     reply_to_message_id=q.reply_to_message_id,
                     response_text=resp_text,
                     attachment_urls=raw_answer.attachment_urls if hasattr(raw_answer, 'attachment_urls') else [],
-                ))
-            else:
-                result.skipped_questions.append({
-                    "question": q.question,
-                    "message_ids": q.message_ids,
-                    "reason": "synthesizer_skip",
-                })
+                )
+            return "skipped", {
+                "question": q.question,
+                "message_ids": q.message_ids,
+                "reason": "synthesizer_skip",
+            }
         except Exception as exc:
             log.warning("BatchResponder: synthesizer failed for question %d: %s", qi, exc)
-            result.skipped_questions.append({
+            return "skipped", {
                 "question": q.question,
                 "message_ids": q.message_ids,
                 "reason": f"error: {exc}",
-            })
+            }
+
+    # Synthesize all questions concurrently. The global LLM concurrency limit
+    # (LLM_MAX_CONCURRENCY, enforced inside LLMClient) keeps the total number of
+    # in-flight API calls bounded; results are collected by question index so
+    # replies keep the order the gate produced them in.
+    outcomes: list[tuple[str, Any] | None] = [None] * len(questions)
+    if questions:
+        pool = ThreadPoolExecutor(max_workers=min(len(questions), MAX_PARALLEL_QUESTIONS))
+        try:
+            future_to_idx = {
+                pool.submit(_synthesize_question, qi, q): qi
+                for qi, q in enumerate(questions)
+            }
+            pending = set(future_to_idx)
+            while pending:
+                done, pending = wait(pending, timeout=_CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcomes[future_to_idx[future]] = future.result()
+                if pending and cancel_check and cancel_check():
+                    log.info("BatchResponder: cancelled during synthesis (%d/%d questions done)",
+                             len(questions) - len(pending), len(questions))
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    for outcome in outcomes:
+        if outcome is None:
+            continue  # cancelled before this question finished
+        kind, value = outcome
+        if kind == "response":
+            result.responses.append(value)
+        else:
+            result.skipped_questions.append(value)
 
     log.info("BatchResponder: group=%s responses=%d skipped=%d",
              group_id[:20], len(result.responses), len(result.skipped_questions))
@@ -7,7 +7,7 @@ When a message arrives:
 When the timer fires (no new messages for DEBOUNCE_SECONDS):
 3. Collect all unprocessed messages
 4. Run batch gate → extract questions
-5. For each question, run synthesizer (checking cancel between each)
+5. Synthesize all questions in parallel (cancel is polled while they run)
 6. If interrupted at any point → drop all results, timer resets
 7. If all succeed → send responses
 """
@@ -0,0 +1,84 @@
+"""MEDIA_ENRICH — attachment processing off the Signal listener.
+
+ingest_message stores a message with attachments immediately (placeholder
+text, local paths) and enqueues MEDIA_ENRICH. A fixed pool of
+MEDIA_ENRICH_WORKERS threads claims those jobs and, per message, uploads the
+media to R2, runs image OCR / video description / audio transcription,
+rewrites the stored content, then notifies the responder and enqueues
+BUFFER_UPDATE (see app.ingestion.enrich_message_media).
+
+One slow video therefore occupies one enrichment thread instead of stalling
+intake of every later message. The jobs live in the jobs table, so messages
+still waiting for enrichment survive a restart.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable
+
+from app.db import claim_next_job, complete_job, fail_job, requeue_in_progress_jobs
+from app.jobs.types import MEDIA_ENRICH
+
+if TYPE_CHECKING:
+    from app.jobs.worker import WorkerDeps
+
+log = logging.getLogger(__name__)
+
+_IDLE_POLL_SECONDS = 2.0
+
+_wakeup = threading.Event()
+
+
+def wake_media_enricher() -> None:
+    """Nudge idle enrichment threads after enqueueing."""
+    _wakeup.set()
+
+
+def _enrich_loop(deps: "WorkerDeps", on_message_stored: "Callable[[str], None] | None") -> None:
+    from app.ingestion import enrich_message_media
+
+    while True:
+        try:
+            job = claim_next_job(deps.db, allowed_types=[MEDIA_ENRICH])
+        except Exception:
+            log.exception("MEDIA_ENRICH: failed to claim job")
+            job = None
+        if job is None:
+            _wakeup.wait(timeout=_IDLE_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+
+        try:
+            enrich_message_media(
+                settings=deps.settings, db=deps.db, llm=deps.llm, payload=job.payload,
+                on_message_stored=on_message_stored,
+            )
+        except Exception:
+            log.exception("MEDIA_ENRICH failed: job=%s message=%s", job.job_id, job.payload.get("message_id"))
+            fail_job(deps.db, job_id=job.job_id, attempts=job.attempts)
+            continue
+        complete_job(deps.db, job_id=job.job_id)
+
+
+def start_media_enrichers(
+    deps: "WorkerDeps",
+    *,
+    on_message_stored: "Callable[[str], None] | None" = None,
+) -> None:
+    """Start MEDIA_ENRICH_WORKERS daemon threads.
+
+    on_message_stored is the debouncer hook ingest_message would have called;
+    it fires once the message content is final.
+    """
+    if not deps.settings.worker_enabled:
+        log.warning("Media enrichment disabled (WORKER_ENABLED=0).")
+        return
+    n = requeue_in_progress_jobs(deps.db, job_type=MEDIA_ENRICH)
+    if n:
+        log.warning("MEDIA_ENRICH: requeued %d jobs interrupted by a restart", n)
+    for i in range(deps.settings.media_enrich_workers):
+        threading.Thread(
+            target=_enrich_loop, args=(deps, on_message_stored), name=f"media-enrich-{i}", daemon=True,
+        ).start()
+    log.info("Media enrichment started (%d workers)", deps.settings.media_enrich_workers)
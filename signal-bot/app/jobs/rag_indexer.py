@@ -0,0 +1,95 @@
+"""Background RAG indexer — drains rag_outbox into SCRAG/RCRAG.
+
+Case writes queue their case_id in rag_outbox inside the same MySQL
+transaction (see insert_case / merge_case / update_case_to_solved /
+update_case_solution / enqueue_rag_index / admit_recommendations_to_rag),
+so BUFFER_UPDATE never waits on embedding or Chroma.
+
+Each pass claims a batch of due rows, loads the cases' *current* state and:
+- solved, or recommendation already in_rag,
+  with a solution                          → embed in one batch and upsert
+- archived or deleted                       → remove from both collections
+Because the outcome depends only on current MySQL state, retries and
+duplicate rows are idempotent. Failed batches back off exponentially and are
+parked as status='failed' after max attempts; SYNC_RAG still reconciles
+anything that slips through.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+from app.db import (
+    claim_rag_outbox,
+    complete_rag_outbox,
+    fail_rag_outbox,
+    get_cases_for_indexing,
+    mark_cases_in_rag,
+)
+from app.rag.indexing import index_cases
+
+if TYPE_CHECKING:
+    from app.jobs.worker import WorkerDeps
+
+log = logging.getLogger(__name__)
+
+_BATCH_SIZE = 100
+_IDLE_POLL_SECONDS = 2.0
+
+_wakeup = threading.Event()
+
+
+def wake_rag_indexer() -> None:
+    """Nudge the indexer after enqueueing so it doesn't wait for the next poll."""
+    _wakeup.set()
+
+
+def drain_rag_outbox_once(deps: "WorkerDeps") -> int:
+    """Process one batch from the outbox. Returns number of rows handled."""
+    rows = claim_rag_outbox(deps.db, limit=_BATCH_SIZE)
+    if not rows:
+        return 0
+    row_ids = [r[0] for r in rows]
+    case_ids = list(dict.fromkeys(r[1] for r in rows))
+
+    try:
+        cases = get_cases_for_indexing(deps.db, case_ids)
+        # Recommendations enter RCRAG only once admitted (in_rag) after
+        # aging out of the buffer; earlier outbox rows for them are no-ops.
+        to_index = [
+            c for c in cases.values()
+            if c["solution_summary"].strip()
+            and (c["status"] == "solved" or (c["status"] == "recommendation" and c["in_rag"]))
+        ]
+        to_delete = [cid for cid in case_ids if cid not in cases or cases[cid]["status"] == "archived"]
+
+        indexed = index_cases(deps.rag, deps.llm, to_index)
+        mark_cases_in_rag(deps.db, indexed)
+        if to_delete:
+            deps.rag.delete_cases(to_delete)
+    except Exception as e:
+        log.exception("RAG indexer: batch of %d cases failed, will retry", len(case_ids))
+        fail_rag_outbox(deps.db, row_ids, error=f"{type(e).__name__}: {e}")
+        return len(rows)
+
+    complete_rag_outbox(deps.db, row_ids)
+    log.info("RAG indexer: indexed=%d removed=%d (outbox rows=%d)", len(indexed), len(to_delete), len(rows))
+    return len(rows)
+
+
+def rag_indexer_loop_forever(deps: "WorkerDeps") -> None:
+    log.info("RAG indexer started")
+    if not deps.settings.worker_enabled:
+        log.warning("RAG indexer disabled (WORKER_ENABLED=0).")
+        return
+    while True:
+        try:
+            handled = drain_rag_outbox_once(deps)
+        except Exception:
+            log.exception("RAG indexer: failed to claim outbox rows")
+            handled = 0
+        if handled >= _BATCH_SIZE:
+            continue  # backlog — keep draining
+        _wakeup.wait(timeout=_IDLE_POLL_SECONDS)
+        _wakeup.clear()
@@ -0,0 +1,78 @@
+"""Retention — keeps jobs, raw_messages and reactions from growing forever.
+
+Every RETENTION_INTERVAL_MINUTES:
+- done/failed/cancelled jobs older than RETENTION_JOBS_DAYS are deleted;
+- raw messages older than RETENTION_MESSAGES_DAYS (by Signal timestamp and by
+  storage time) that are not case evidence, in groups that are not mid-ingest,
+  move to raw_messages_archive (InnoDB compressed rows), with their reactions;
+- reactions older than RETENTION_REACTIONS_DAYS are deleted.
+
+Work is done in chunks of RETENTION_BATCH_SIZE rows, each its own short
+transaction, with a short pause between chunks so live writers (ingest, the
+job queue) never wait long on locks. A *_DAYS value of 0 disables that step;
+message archiving and reaction purging are off by default.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Dict
+
+from app.db import archive_cold_messages, delete_finished_jobs, delete_old_reactions
+
+if TYPE_CHECKING:
+    from app.jobs.worker import WorkerDeps
+
+log = logging.getLogger(__name__)
+
+_CHUNK_PAUSE_SECONDS = 0.2
+_STARTUP_DELAY_SECONDS = 300
+
+
+def _drain(step: Callable[[int], int], batch: int) -> int:
+    total = 0
+    while True:
+        n = step(batch)
+        total += n
+        if n < batch:
+            return total
+        time.sleep(_CHUNK_PAUSE_SECONDS)
+
+
+def run_retention_once(deps: "WorkerDeps") -> Dict[str, int]:
+    """Run every enabled retention step to completion. Returns rows per step."""
+    s = deps.settings
+    db = deps.db
+    batch = s.retention_batch_size
+    out: Dict[str, int] = {}
+    if s.retention_jobs_days:
+        out["jobs_deleted"] = _drain(
+            lambda n: delete_finished_jobs(db, older_than_days=s.retention_jobs_days, limit=n), batch
+        )
+    if s.retention_messages_days:
+        out["messages_archived"] = _drain(
+            lambda n: archive_cold_messages(db, older_than_days=s.retention_messages_days, limit=n), batch
+        )
+    if s.retention_reactions_days:
+        out["reactions_deleted"] = _drain(
+            lambda n: delete_old_reactions(db, older_than_days=s.retention_reactions_days, limit=n), batch
+        )
+    return out
+
+
+def retention_loop_forever(deps: "WorkerDeps") -> None:
+    log.info("Retention started")
+    if not deps.settings.worker_enabled:
+        log.warning("Retention disabled (WORKER_ENABLED=0).")
+        return
+    # Let startup traffic (backfills, reconnects) settle before the first pass
+    time.sleep(_STARTUP_DELAY_SECONDS)
+    while True:
+        t0 = time.monotonic()
+        try:
+            stats = run_retention_once(deps)
+            if any(stats.values()):
+                log.info("Retention: %s in %.1fs", stats, time.monotonic() - t0)
+        except Exception:
+            log.exception("Retention pass failed")
+        time.sleep(deps.settings.retention_interval_minutes * 60)
@@ -1,5 +1,9 @@
 BUFFER_UPDATE = "BUFFER_UPDATE"
 MAYBE_RESPOND = "MAYBE_RESPOND"
+
+# Attachment processing (R2 upload, OCR, video description/transcript) for a
+# stored message; consumed by app.jobs.media_enrich, not the main worker loop
+MEDIA_ENRICH = "MEDIA_ENRICH"
 SYNC_GROUP_DOCS = "SYNC_GROUP_DOCS"
 
 # Periodic reconciliation: remove stale ChromaDB entries that have no MySQL case
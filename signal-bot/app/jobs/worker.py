@@ -7,7 +7,7 @@ import re
 import threading
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, TYPE_CHECKING
+from typing import Any, Dict, List, Tuple, TYPE_CHECKING
 
 from app.config import Settings
 from app.db import (
@@ -24,12 +24,22 @@ from app.db import (
     get_last_messages_text,
     get_positive_reactions_for_message,
     get_message_by_ts,
-    mark_case_in_rag,
+    mark_cases_in_rag,
     get_all_active_case_ids,
+    get_in_rag_case_ids,
+    get_case_changes_since,
+    get_latest_case_changes,
+    get_case_sync_states,
+    prune_case_changes,
+    admit_recommendations_to_rag,
+    get_case,
+    get_case_evidence_ids,
 )
 from app.jobs import types as job_types
 from app.llm.client import LLMClient
-from app.rag.chroma import ChromaRag
+from app.rag.chroma import DualRag
+from app.rag.indexing import case_fields, index_cases
+from app.jobs.rag_indexer import wake_rag_indexer
 from app.signal.adapter import SignalAdapter
 from app.agent.ultimate_agent import UltimateAgent
 
@@ -94,7 +104,7 @@ class WorkerDeps:
     settings: Settings
     db: Any  # Database (MySQL or Oracle)
     llm: LLMClient
-    rag: ChromaRag
+    rag: DualRag
     signal: SignalAdapter
     ultimate_agent: UltimateAgent
     bot_sender_hash: str = ""  # hash of the bot's own phone number — used to skip bot messages in extraction
@@ -367,33 +377,6 @@ def _collect_evidence_image_paths(deps: WorkerDeps, evidence_ids: List[str]) ->
     return paths
 
 
-def _split_case_document(doc: str) -> tuple[str, str, str]:
-    """
-    Split the stored case document into (title, problem_summary, solution_summary).
-
-    Production doc_text format (see worker buffer handler) is:
-      title\nproblem_summary\nsolution_summary\n(tags: ...)
-
-    The solution summary may contain internal newlines; we join them into one line for quoting.
-    """
-    lines = [ln.strip() for ln in (doc or "").splitlines()]
-    lines = [ln for ln in lines if ln]
-    if not lines:
-        return "", "", ""
-
-    tags_idx = len(lines)
-    for i, ln in enumerate(lines):
-        if ln.lower().startswith("tags:"):
-            tags_idx = i
-            break
-
-    title = lines[0] if len(lines) >= 1 else ""
-    problem = lines[1] if len(lines) >= 2 else ""
-    solution_lines = lines[2:tags_idx] if len(lines) >= 3 else []
-    solution = " ".join(solution_lines).strip()
-    return title, problem, solution
-
-
 def _get_solution_message_for_reply(
     db, case: Dict[str, Any]
 ) -> tuple[str | None, int | None, str | None, str | None]:
@@ -432,7 +415,8 @@ def _pick_history_solution_refs(retrieved: List[Dict[str, Any]], *, max_refs: in
         cid = str(item.get("case_id") or "").strip()
         if not cid:
             continue
-        title, _problem, solution = _split_case_document(str(item.get("document") or ""))
+        fields = case_fields(item)
+        title, solution = fields["title"], fields["solution"]
         if not solution.strip():
             continue
         out.append(
@@ -464,38 +448,162 @@ def _append_history_block(text: str, refs: List[Dict[str, str]]) -> str:
     return "\n".join(lines).strip() + "\n"
 
 
-_SYNC_RAG_INTERVAL_SECONDS = 3600  # reconcile Chroma vs MySQL once per hour
+_SYNC_RAG_INTERVAL_SECONDS = 60  # incremental reconcile from the case_changes log
+_SYNC_RAG_FULL_INTERVAL_SECONDS = 6 * 3600  # full Chroma vs MySQL diff (safety net)
+_SYNC_RAG_CHANGES_BATCH = 1000  # change-log rows consumed per incremental pass
+_SYNC_RAG_GAP_GRACE_SECONDS = 300  # how long a case_changes version gap holds the cursor back
+_CASE_CHANGES_RETENTION_DAYS = 7
+_SYNC_RAG_BACKFILL_MAX = 200  # local backend: max missing cases re-indexed per run
 
 
-def _run_sync_rag(deps: WorkerDeps) -> None:
+def _run_sync_rag(deps: WorkerDeps, after_version: int) -> int | None:
     """Remove ChromaDB entries whose case_id no longer exists in MySQL as active.
 
-    This is the authoritative reconciliation that replaces the per-query
-    _case_exists_in_db() check. Running it periodically means Chroma stays
-    clean even if an individual upsert/delete failed mid-flight.
+    Full reconciliation over the whole corpus; runs on a slow schedule as a
+    safety net behind _run_sync_rag_incremental. Running it periodically
+    means Chroma stays clean even if an individual upsert/delete failed
+    mid-flight or a write bypassed the change log.
+
+    With RAG_BACKEND=local it also re-indexes cases flagged in_rag in MySQL
+    that are missing from the local index (fresh volume, backend switch).
+
+    Returns the case_changes version incremental passes resume after (see
+    _full_sync_rag_cursor), or None if MySQL/Chroma could not be read.
     """
     try:
+        # Before the active-case snapshot, so the diff covers every change
+        # up to the returned version.
+        version = _full_sync_rag_cursor(
+            after_version, get_latest_case_changes(deps.db, after_version, limit=_SYNC_RAG_CHANGES_BATCH)
+        )
         active_ids = set(get_all_active_case_ids(deps.db))
     except Exception:
         log.exception("SYNC_RAG: failed to load active case IDs from MySQL")
-        return
+        return None
 
     try:
         chroma_ids = set(deps.rag.list_all_case_ids())
     except Exception:
         log.exception("SYNC_RAG: failed to list ChromaDB case IDs")
-        return
+        return None
 
     stale = chroma_ids - active_ids
     if not stale:
         log.debug("SYNC_RAG: Chroma and MySQL are in sync (%d active cases)", len(active_ids))
+    else:
+        log.info("SYNC_RAG: removing %d stale Chroma entries: %s", len(stale), list(stale)[:10])
+        try:
+            deps.rag.delete_cases(list(stale))
+        except Exception:
+            log.exception("SYNC_RAG: failed to delete stale Chroma entries")
+
+    if deps.settings.rag_backend == "local":
+        _backfill_local_rag(deps, indexed_ids=chroma_ids)
+
+    try:
+        pruned = prune_case_changes(deps.db, max_version=version, older_than_days=_CASE_CHANGES_RETENTION_DAYS)
+        if pruned:
+            log.info("SYNC_RAG: pruned %d old case_changes rows", pruned)
+    except Exception:
+        log.exception("SYNC_RAG: failed to prune case_changes")
+    return version
+
+
+def _sync_rag_cursor(after_version: int, changes: List[Tuple[int, str, str, int]]) -> int:
+    """Highest version the incremental cursor may advance to.
+
+    case_changes.version is AUTO_INCREMENT: assigned at insert, visible at
+    commit. A gap can therefore be a transaction that has not committed yet,
+    and moving past it would skip that change for good. The cursor follows
+    the contiguous prefix and stops at the first gap until the row after it
+    is older than _SYNC_RAG_GAP_GRACE_SECONDS (by then the gap is a rollback
+    or a burned auto-increment value).
+    """
+    cursor = after_version
+    for version, _, _, age in changes:
+        if version != cursor + 1 and age < _SYNC_RAG_GAP_GRACE_SECONDS:
+            break
+        cursor = version
+    return cursor
+
+
+def _full_sync_rag_cursor(after_version: int, latest: List[Tuple[int, str, str, int]]) -> int:
+    """Cursor after a full pass, given the newest change-log rows (oldest first).
+
+    The full diff covers every committed change, so the cursor may move to
+    the newest version, but an uncommitted gap must still hold it back as in
+    _sync_rag_cursor. Gaps older than the first row of a truncated tail have
+    settled, so the walk starts there. If the whole tail is within the grace
+    period, the cursor stays put and incremental passes catch up.
+    """
+    if len(latest) < _SYNC_RAG_CHANGES_BATCH:
+        return _sync_rag_cursor(after_version, latest)
+    if latest[0][3] < _SYNC_RAG_GAP_GRACE_SECONDS:
+        return after_version
+    return _sync_rag_cursor(latest[0][0] - 1, latest)
+
+
+def _run_sync_rag_incremental(deps: WorkerDeps, after_version: int) -> int:
+    """Reconcile only cases changed since after_version. Returns the new version.
+
+    Cases that were archived or deleted are removed from both collections;
+    deletes are idempotent, so replaying a change is harmless. Content
+    changes need nothing here — the writer re-indexes them. Rows past a
+    version gap are applied but stay ahead of the returned cursor, so they
+    are replayed until the gap settles (see _sync_rag_cursor).
+    """
+    try:
+        changes = get_case_changes_since(deps.db, after_version, limit=_SYNC_RAG_CHANGES_BATCH)
+    except Exception:
+        log.exception("SYNC_RAG: failed to read case_changes")
+        return after_version
+    if not changes:
+        return after_version
+
+    case_ids = list(dict.fromkeys(cid for _, cid, _, _ in changes))
+    try:
+        states = get_case_sync_states(deps.db, case_ids)
+    except Exception:
+        log.exception("SYNC_RAG: failed to load states for %d changed cases", len(case_ids))
+        return after_version
+
+    stale = [cid for cid in case_ids if cid not in states or states[cid][0] == "archived"]
+    if stale:
+        try:
+            deps.rag.delete_cases(stale)
+            log.info("SYNC_RAG: removed %d archived/deleted cases from RAG (incremental)", len(stale))
+        except Exception:
+            log.exception("SYNC_RAG: failed to delete %d stale entries", len(stale))
+            return after_version
+    return _sync_rag_cursor(after_version, changes)
+
+
+def _backfill_local_rag(deps: WorkerDeps, *, indexed_ids: set[str]) -> None:
+    """Re-index cases MySQL marks in_rag that the local index does not hold."""
+    try:
+        missing = [cid for cid in get_in_rag_case_ids(deps.db) if cid not in indexed_ids]
+    except Exception:
+        log.exception("SYNC_RAG: failed to load in_rag case IDs from MySQL")
+        return
+    if not missing:
         return
 
-    log.info("SYNC_RAG: removing %d stale Chroma entries: %s", len(stale), list(stale)[:10])
+    log.info("SYNC_RAG: re-indexing %d cases missing from local RAG (max %d per run)",
+             len(missing), _SYNC_RAG_BACKFILL_MAX)
+    batch: List[Dict[str, Any]] = []
+    for case_id in missing[:_SYNC_RAG_BACKFILL_MAX]:
+        try:
+            case = get_case(deps.db, case_id)
+            if not case or case["status"] not in ("solved", "recommendation"):
+                continue
+            case["evidence_ids"] = get_case_evidence_ids(deps.db, case_id)
+            batch.append(case)
+        except Exception:
+            log.exception("SYNC_RAG: failed to load case %s for re-indexing", case_id)
     try:
-        deps.rag.delete_cases(list(stale))
+        _index_cases_in_rag(deps, batch)
     except Exception:
-        log.exception("SYNC_RAG: failed to delete stale Chroma entries")
+        log.exception("SYNC_RAG: failed to re-index %d cases", len(batch))
 
 
 def worker_loop_forever(deps: WorkerDeps) -> None:
@@ -513,6 +621,8 @@ def worker_loop_forever(deps: WorkerDeps) -> None:
         log.exception("Failed to clear stale ingesting flags on startup")
 
     last_sync_rag = 0.0
+    last_full_sync_rag = 0.0
+    sync_rag_version = 0
 
     if not deps.settings.worker_enabled:
         log.warning("Worker disabled (WORKER_ENABLED=0). Sleeping indefinitely.")
@@ -523,9 +633,16 @@ def worker_loop_forever(deps: WorkerDeps) -> None:
     while True:
         now = time.time()
 
-        # Periodic RAG sync: remove Chroma entries with no matching MySQL case
-        if now - last_sync_rag >= _SYNC_RAG_INTERVAL_SECONDS:
-            _run_sync_rag(deps)
+        # Periodic RAG sync: remove Chroma entries with no matching MySQL case.
+        # Full diff on a slow schedule, change-log replay in between.
+        if now - last_full_sync_rag >= _SYNC_RAG_FULL_INTERVAL_SECONDS:
+            version = _run_sync_rag(deps, sync_rag_version)
+            if version is not None:
+                sync_rag_version = version
+                last_full_sync_rag = now
+            last_sync_rag = now
+        elif now - last_sync_rag >= _SYNC_RAG_INTERVAL_SECONDS:
+            sync_rag_version = _run_sync_rag_incremental(deps, sync_rag_version)
             last_sync_rag = now
 
         job = claim_next_job(
@@ -592,44 +709,20 @@ def worker_loop_forever(deps: WorkerDeps) -> None:
             complete_job(deps.db, job_id=job.job_id)
 
 
-def _index_case_in_rag(
-    deps: WorkerDeps,
-    *,
-    case_id: str,
-    group_id: str,
-    problem_title: str,
-    problem_summary: str,
-    solution_summary: str,
-    tags: List[str],
-    evidence_ids: List[str],
-    evidence_image_paths: List[str],
-    status: str = "solved",
-) -> None:
-    """Build the document, embed it, and upsert into ChromaDB immediately."""
-    prefix = "[SOLVED]" if status == "solved" else "[РЕКОМЕНДАЦІЯ]"
-    doc_text = "\n".join([
-        f"{prefix} {problem_title.strip()}",
-        f"Проблема: {problem_summary.strip()}",
-        f"Рішення: {solution_summary.strip()}",
-        "tags: " + ", ".join(tags),
-    ]).strip()
-    rag_emb = deps.llm.embed(text=doc_text)
-
-    rag_meta: dict = {"group_id": group_id, "status": status}
-    if evidence_ids:
-        rag_meta["evidence_ids"] = evidence_ids
-    if evidence_image_paths:
-        rag_meta["evidence_image_paths"] = evidence_image_paths
-
-    deps.rag.upsert_case(
-        case_id=case_id,
-        document=doc_text,
-        embedding=rag_emb,
-        metadata=rag_meta,
-        status=status,
-    )
-    mark_case_in_rag(deps.db, case_id)
-    log.info("Case %s indexed in %s (group=%s)", case_id, "SCRAG" if status == "solved" else "RCRAG", group_id[:20])
+def _index_cases_in_rag(deps: WorkerDeps, cases: List[Dict[str, Any]]) -> None:
+    """Build documents, embed them in one batch, and upsert into SCRAG/RCRAG.
+
+    cases: dicts accepted by app.rag.indexing.index_cases (case_id, group_id,
+    status, problem_title, problem_summary, solution_summary, tags,
+    evidence_ids, evidence_image_paths).
+    """
+    if not cases:
+        return
+    indexed = index_cases(deps.rag, deps.llm, cases)
+    mark_cases_in_rag(deps.db, indexed)
+    for c in cases:
+        log.info("Case %s indexed in %s (group=%s)",
+                 c["case_id"], "SCRAG" if c["status"] == "solved" else "RCRAG", c["group_id"][:20])
 
 
 def _handle_sync_group_docs(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
@@ -647,27 +740,22 @@ def _index_aged_out_recommendations(
     if not reco_cases:
         return
     buffer_id_set = set(buffer_message_ids)
+    aged_out: List[str] = []
     for case in reco_cases:
         evidence_ids = case.get("evidence_ids") or []
         overlap = set(evidence_ids) & buffer_id_set
         if not overlap:
             # All evidence aged out of buffer → index in RCRAG
-            _index_case_in_rag(
-                deps,
-                case_id=case["case_id"],
-                group_id=group_id,
-                problem_title=case["problem_title"],
-                problem_summary=case["problem_summary"],
-                solution_summary=case["solution_summary"],
-                tags=case.get("tags") or [],
-                evidence_ids=evidence_ids,
-                evidence_image_paths=case.get("evidence_image_paths") or [],
-                status="recommendation",
-            )
-            log.info(
-                "Recommendation case %s aged out of buffer, indexed in RCRAG (group=%s)",
-                case["case_id"], group_id[:20],
-            )
+            aged_out.append(case["case_id"])
+    if not aged_out:
+        return
+    admit_recommendations_to_rag(deps.db, aged_out)
+    wake_rag_indexer()
+    for case_id in aged_out:
+        log.info(
+            "Recommendation case %s aged out of buffer, queued for RCRAG (group=%s)",
+            case_id, group_id[:20],
+        )
 
 
 def _build_multimodal_buffer(
@@ -770,6 +858,8 @@ def _handle_buffer_update(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
     )
 
     # ── Process new cases ──
+    # RAG indexing goes through rag_outbox (queued in the same transaction as
+    # each case write) and is done by the background RAG indexer.
     n_blocks = len(extraction_blocks)
     for case in result.new_cases:
         if case.start_idx < 0 or case.end_idx >= n_blocks:
@@ -800,22 +890,11 @@ def _handle_buffer_update(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
             tags=case.tags,
             evidence_ids=evidence_ids,
             evidence_image_paths=evidence_image_paths,
+            index_in_rag=case.status == "solved",
         )
 
         if case.status == "solved":
-            _index_case_in_rag(
-                deps,
-                case_id=case_id,
-                group_id=group_id,
-                problem_title=case.problem_title,
-                problem_summary=case.problem_summary,
-                solution_summary=case.solution_summary,
-                tags=case.tags,
-                evidence_ids=evidence_ids,
-                evidence_image_paths=evidence_image_paths,
-                status="solved",
-            )
-            log.info("New solved case %s (span %d..%d, evidence=%d) indexed in SCRAG (group=%s)",
+            log.info("New solved case %s (span %d..%d, evidence=%d) queued for SCRAG (group=%s)",
                      case_id, case.start_idx, case.end_idx, len(evidence_ids), group_id[:20])
         else:
             log.info("New recommendation case %s (span %d..%d, evidence=%d) saved in MySQL (group=%s)",
@@ -831,22 +910,10 @@ def _handle_buffer_update(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
             continue
         solution = promo.solution_summary or rc.get("solution_summary", "")
         update_case_to_solved(deps.db, promo.case_id, solution)
-        _index_case_in_rag(
-            deps,
-            case_id=promo.case_id,
-            group_id=group_id,
-            problem_title=rc["problem_title"],
-            problem_summary=rc["problem_summary"],
-            solution_summary=solution,
-            tags=rc.get("tags") or [],
-            evidence_ids=rc.get("evidence_ids") or [],
-            evidence_image_paths=rc.get("evidence_image_paths") or [],
-            status="solved",
-        )
         log.info("Promoted recommendation case %s → solved (group=%s)", promo.case_id, group_id[:20])
 
     # ── Process updates to existing cases ──
-    from app.db.queries_mysql import get_case, update_case_solution, get_case_evidence_ids
+    from app.db.queries_mysql import get_case, update_case_solution
     for upd in result.updates:
         existing = get_case(deps.db, upd.case_id)
         if not existing or not upd.solution_summary.strip():
@@ -856,25 +923,19 @@ def _handle_buffer_update(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
         for p in new_evidence_images:
             if p not in all_evidence_images:
                 all_evidence_images.append(p)
-        update_case_solution(deps.db, upd.case_id, upd.solution_summary, new_evidence_ids=upd.additional_evidence_ids or None)
-        all_evidence_ids = get_case_evidence_ids(deps.db, upd.case_id)
         # Re-index in RAG with updated solution
-        if existing.get("status") == "solved" or (existing.get("status") == "recommendation" and existing.get("in_rag")):
-            _index_case_in_rag(
-                deps,
-                case_id=upd.case_id,
-                group_id=group_id,
-                problem_title=existing["problem_title"],
-                problem_summary=existing["problem_summary"],
-                solution_summary=upd.solution_summary,
-                tags=existing.get("tags") or [],
-                evidence_ids=all_evidence_ids,
-                evidence_image_paths=all_evidence_images,
-                status=existing["status"],
-            )
+        reindex = existing.get("status") == "solved" or (existing.get("status") == "recommendation" and existing.get("in_rag"))
+        update_case_solution(
+            deps.db, upd.case_id, upd.solution_summary,
+            new_evidence_ids=upd.additional_evidence_ids or None,
+            evidence_image_paths=all_evidence_images if new_evidence_images else None,
+            index_in_rag=bool(reindex),
+        )
         log.info("Updated case %s solution + %d new evidence msgs (group=%s)",
                  upd.case_id, len(upd.additional_evidence_ids), group_id[:20])
 
+    wake_rag_indexer()
+
     # ── Age-out indexing: recommendation cases whose evidence left the buffer ──
     _index_aged_out_recommendations(deps, group_id, buffer_msg_ids)
 
@@ -981,6 +1042,7 @@ def _handle_maybe_respond(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
                 gate_message_text = f"{msg.content_text}\n{markers}"
 
         gate_tag = ""  # populated below if gate succeeds
+        gate_keywords: list[str] | None = None
         try:
             gate = deps.llm.decide_consider(
                 message=gate_message_text,
@@ -988,6 +1050,7 @@ def _handle_maybe_respond(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
                 images=gate_images,
             )
             gate_tag = gate.tag or ""
+            gate_keywords = gate.keywords
             log.info(
                 "Gate: consider=%s tag=%s force=%s group=%s",
                 gate.consider, gate_tag, force, group_id,
@@ -1001,6 +1064,7 @@ def _handle_maybe_respond(deps: WorkerDeps, payload: Dict[str, Any]) -> None:
         raw_answer = deps.ultimate_agent.answer(
             gate_message_text, group_id=group_id, db=deps.db, lang=group_lang,
             context=context_text, images=gate_images, gate_tag=gate_tag,
+            keywords=gate_keywords,
         )
         answer_text = raw_answer.text
         attachment_urls = raw_answer.attachment_urls
@@ -4,6 +4,8 @@ import base64
 import json
 import logging
 import re
+import threading
+from contextlib import contextmanager
 from typing import Any, Optional, Type, TypeVar
 
 from openai import OpenAI
@@ -32,6 +34,21 @@ KEYWORD_CASCADE = ["gemini-3-flash-preview", "gemini-2.5-flash"]
 
 _IMG_MARKER_RE = re.compile(r"\[\[IMG:(\d+)\]\]")
 
+# Process-wide cap on in-flight LLM requests, shared by every LLMClient
+# instance (main app, UltimateAgent, sub-agents). Batch questions are
+# synthesized in parallel, so without a shared limit a single batch could
+# fan out into dozens of concurrent API calls. Sized on first use.
+_llm_slots: threading.BoundedSemaphore | None = None
+_llm_slots_lock = threading.Lock()
+
+
+def _get_llm_slots(limit: int) -> threading.BoundedSemaphore:
+    global _llm_slots
+    with _llm_slots_lock:
+        if _llm_slots is None:
+            _llm_slots = threading.BoundedSemaphore(max(1, limit))
+        return _llm_slots
+
 
 def _build_interleaved_parts(
     text: str, images: list[tuple[bytes, str]] | None
@@ -123,6 +140,24 @@ class LLMClient:
                 max_retries=0,
             )
 
+        self._slots = _get_llm_slots(settings.llm_max_concurrency)
+
+    @contextmanager
+    def _llm_slot(self, timeout: float | None = None):
+        """Hold one global LLM concurrency slot for the duration of an API call.
+
+        Waiting for a slot counts against the caller's timeout budget; if no
+        slot frees up in time a TimeoutError is raised (cascades treat it like
+        any other model failure).
+        """
+        acquired = self._slots.acquire(timeout=timeout) if timeout is not None else self._slots.acquire()
+        if not acquired:
+            raise TimeoutError("Timed out waiting for an LLM concurrency slot")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
     def _json_call(
         self,
         *,
@@ -179,13 +214,14 @@ class LLMClient:
                     parts = _build_interleaved_parts(user, images)
                     messages.append({"role": "user", "content": parts})
 
-                resp = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    response_format={"type": "json_object"},
-                    temperature=0,
-                    timeout=timeout,
-                )
+                with self._llm_slot(timeout):
+                    resp = self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        response_format={"type": "json_object"},
+                        temperature=0,
+                        timeout=timeout,
+                    )
 
                 raw = resp.choices[0].message.content or "{}"
                 data = json.loads(raw)
@@ -235,12 +271,13 @@ class LLMClient:
                     content = _build_interleaved_parts(prompt, images)
                 else:
                     content = prompt
-                resp = self.client.chat.completions.create(
-                    model=m,
-                    messages=[{"role": "user", "content": content}],
-                    temperature=0,
-                    timeout=remaining,
-                )
+                with self._llm_slot(remaining):
+                    resp = self.client.chat.completions.create(
+                        model=m,
+                        messages=[{"role": "user", "content": content}],
+                        temperature=0,
+                        timeout=remaining,
+                    )
                 return (resp.choices[0].message.content or "").strip()
             except Exception as exc:
                 log.warning("Cascade chat: %s failed (%s), trying next model", m, exc)
@@ -299,20 +336,21 @@ class LLMClient:
                 else:
                     contents = [prompt]
 
-                response = self._genai_client.models.generate_content(
-                    model=m,
-                    contents=contents,
-                    config=_gt.GenerateContentConfig(
-                        tools=[_gt.Tool(google_search=_gt.GoogleSearch())],
-                        system_instruction=(
-                            "Use Google Search to verify facts and enrich your answer with up-to-date information. "
-                            "Search for key technical terms, parameter names, and product specifics mentioned in the prompt. "
-                            "Combine search results with the context already provided to give the best answer."
+                with self._llm_slot(remaining):
+                    response = self._genai_client.models.generate_content(
+                        model=m,
+                        contents=contents,
+                        config=_gt.GenerateContentConfig(
+                            tools=[_gt.Tool(google_search=_gt.GoogleSearch())],
+                            system_instruction=(
+                                "Use Google Search to verify facts and enrich your answer with up-to-date information. "
+                                "Search for key technical terms, parameter names, and product specifics mentioned in the prompt. "
+                                "Combine search results with the context already provided to give the best answer."
+                            ),
+                            temperature=0.15,
+                            http_options=_gt.HttpOptions(timeout=int(remaining * 1000)),
                         ),
-                        temperature=0.15,
-                        http_options=_gt.HttpOptions(timeout=int(remaining * 1000)),
-                    ),
-                )
+                    )
                 # Log Google Search grounding details
                 search_used = False
                 search_queries = []
@@ -380,12 +418,13 @@ class LLMClient:
             else:
                 input_content.append({"role": "user", "content": prompt})
 
-            response = self._openai_client.responses.create(
-                model=model,
-                input=input_content,
-                tools=[{"type": "web_search"}],
-                timeout=timeout,
-            )
+            with self._llm_slot(timeout):
+                response = self._openai_client.responses.create(
+                    model=model,
+                    input=input_content,
+                    tools=[{"type": "web_search"}],
+                    timeout=timeout,
+                )
             text = response.output_text or ""
             log.info("chat_openai_grounded: model=%s len=%d", model, len(text))
             return text.strip()
@@ -405,7 +444,8 @@ class LLMClient:
         )
 
     def embed(self, *, text: str) -> list[float]:
-        resp = self.client.embeddings.create(model=self.settings.embedding_model, input=[text])
+        with self._llm_slot():
+            resp = self.client.embeddings.create(model=self.settings.embedding_model, input=[text])
         return resp.data[0].embedding
 
     def embed_batch(self, *, texts: list[str], batch_size: int = 100) -> list[list[float]]:
@@ -415,7 +455,8 @@ class LLMClient:
         all_embeddings: list[list[float]] = []
         for i in range(0, len(texts), batch_size):
             chunk = texts[i:i + batch_size]
-            resp = self.client.embeddings.create(model=self.settings.embedding_model, input=chunk)
+            with self._llm_slot():
+                resp = self.client.embeddings.create(model=self.settings.embedding_model, input=chunk)
             ordered = sorted(resp.data, key=lambda d: d.index if d.index is not None else 999999)
             all_embeddings.extend([d.embedding for d in ordered])
         return all_embeddings
@@ -78,6 +78,7 @@ P_DECISION_SYSTEM = """Визнач чи варто розглядати пов
 Поверни ТІЛЬКИ JSON з ключами:
 - consider: boolean
 - tag: string (new_question | ongoing_discussion | noise | statement)
+- keywords: масив рядків — пошукові ключові слова з MESSAGE (див. КЛЮЧОВІ СЛОВА нижче)
 
 ВАЖЛИВО: CONTEXT містить ТІЛЬКИ незавершені обговорення (вирішені кейси вже вилучено).
 
@@ -160,6 +161,12 @@ consider=false якщо:
 Якщо є зображення (скріншоти, фото, діаграми), враховуй їхній зміст.
 Повідомлення типу "подивіться" або "що не так на скріні" з зображенням
 часто означають запит на допомогу (new_question).
+
+КЛЮЧОВІ СЛОВА (keywords) — для пошуку в базі повідомлень, заповнюй ЗАВЖДИ коли consider=true:
+- 2-5 найбільш специфічних термінів: назви продуктів, моделі, коди помилок, технічні терміни
+- Оригінальна мова І англійський відповідник де доречно (напр. "херлинк", "Herelink")
+- БЕЗ загальних слів ("проблема", "допомога", "налаштування", "video", "settings")
+- Порожній масив якщо немає технічного змісту для пошуку
 """
 
 P_BATCH_GATE_SYSTEM = """Ти аналізуєш НОВІ (необроблені) повідомлення в чаті технічної підтримки і визначаєш які ПИТАННЯ потребують відповіді бота.
@@ -174,6 +181,7 @@ P_BATCH_GATE_SYSTEM = """Ти аналізуєш НОВІ (необроблен
   - message_ids: масив рядків — message_id повідомлень які формують це питання
   - reply_to_message_id: рядок — message_id повідомлення на яке бот має відповісти (цитувати)
   - has_images: boolean — чи є в цих повідомленнях зображення
+  - keywords: масив рядків — пошукові ключові слова для цього питання (див. КЛЮЧОВІ СЛОВА нижче)
 
 ПРАВИЛА:
 
@@ -205,6 +213,12 @@ P_BATCH_GATE_SYSTEM = """Ти аналізуєш НОВІ (необроблен
 Якщо повідомлення містить "?" і є повним запитом (зрозумілим без CONTEXT) — це ЗАВЖДИ питання, НАВІТЬ якщо навколо є інші обговорення на інші теми. Приклади: "як лікувати?", "в чому проблема?", "чи можна?".
 Таке питання НЕ потребує відповіді тільки якщо САМЕ НА НЬОГО є пряма відповідь в UNPROCESSED або CONTEXT.
 
+КЛЮЧОВІ СЛОВА (keywords) — для пошуку в базі повідомлень:
+- 2-5 найбільш специфічних термінів з питання: назви продуктів, моделі, коди помилок, технічні терміни
+- Оригінальна мова І англійський відповідник де доречно (напр. "херлинк", "Herelink")
+- БЕЗ загальних слів ("проблема", "допомога", "налаштування", "video", "settings")
+- Порожній масив якщо питання не має технічного змісту для пошуку
+
 Якщо немає питань що потребують відповіді — поверни порожній масив: {"questions": []}
 """
 
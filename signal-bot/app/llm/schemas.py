@@ -53,6 +53,8 @@ class CaseResult(BaseModel):
 class DecisionResult(BaseModel):
     consider: bool
     tag: Literal["new_question", "ongoing_discussion", "noise", "statement"] = "new_question"
+    # Search keywords for KeywordAgent. None = gate didn't emit them (agent extracts its own).
+    keywords: List[str] | None = None
 
 
 class RespondResult(BaseModel):
@@ -122,6 +124,8 @@ class BatchQuestion(BaseModel):
     message_ids: List[str] = Field(default_factory=list)
     reply_to_message_id: str = ""
     has_images: bool = False
+    # Search keywords for KeywordAgent. None = gate didn't emit them (agent extracts its own).
+    keywords: List[str] | None = None
 
 
 class BatchGateResult(BaseModel):
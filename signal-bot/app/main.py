@@ -9,8 +9,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, Response, HTMLResponse
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import FileResponse, Response, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
@@ -45,9 +45,13 @@ from app.db import (
 )
 from app.jobs.types import BUFFER_UPDATE, HISTORY_LINK, MAYBE_RESPOND, SYNC_GROUP_DOCS
 from app.jobs.worker import WorkerDeps, worker_loop_forever, get_worker_heartbeat_age
+from app.jobs.rag_indexer import rag_indexer_loop_forever
+from app.jobs.retention import retention_loop_forever
+from app.jobs.media_enrich import start_media_enrichers
 from app.llm.client import LLMClient
 from app.logging_config import configure_logging
-from app.rag.chroma import create_chroma
+from app.rag import create_rag
+from app.rag.indexing import index_cases
 from app.signal.adapter import NoopSignalAdapter, SignalAdapter
 from app import r2 as _r2
 from app.signal.signal_cli import SignalCliAdapter, InboundGroupMessage, InboundDirectMessage, InboundReaction
@@ -73,9 +77,9 @@ log = logging.getLogger(__name__)
 db = create_db(settings)
 ensure_schema(db)
 
-rag = create_chroma(settings)
+rag = create_rag(settings)
 llm = LLMClient(settings)
-ultimate_agent = UltimateAgent()
+ultimate_agent = UltimateAgent(rag=rag)
 
 signal: SignalAdapter
 if getattr(settings, 'use_signal_desktop', False) and SignalDesktopAdapter is not None:
@@ -153,22 +157,31 @@ except Exception as e:
 
 
 @app.get("/r2/{path:path}")
-def r2_proxy(path: str) -> Response:
+def r2_proxy(
+    path: str,
+    range_header: str | None = Header(default=None, alias="Range"),
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+) -> Response:
     """Proxy Cloudflare R2 object by key.
 
     Serves R2-stored attachments without requiring the bucket to be public.
     The bot fetches the object server-side using R2 credentials and streams
-    the bytes to the client with a long-lived cache header.
+    it to the client in chunks with a long-lived cache header. Supports
+    single-range requests and If-None-Match. Objects still in the upload
+    spool, or in the local edge cache, are served from disk.
     """
-    result = _r2.download(path)
-    if result is None:
+    obj = _r2.fetch(path, range_header=range_header, if_none_match=if_none_match)
+    if obj is None:
         raise HTTPException(status_code=404, detail="Attachment not found")
-    data, content_type = result
-    return Response(
-        content=data,
-        media_type=content_type,
-        headers={"Cache-Control": "public, max-age=31536000, immutable"},
-    )
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "Accept-Ranges": "bytes"}
+    if obj.etag:
+        headers["ETag"] = obj.etag
+    if obj.content_range:
+        headers["Content-Range"] = obj.content_range
+    if obj.status in (304, 416):
+        return Response(status_code=obj.status, headers=headers)
+    headers["Content-Length"] = str(obj.length)
+    return StreamingResponse(obj.body, status_code=obj.status, media_type=obj.content_type, headers=headers)
 
 _signal_listener_started = False
 _signal_listener_lock = threading.Lock()
@@ -384,18 +397,18 @@ def _do_prune() -> None:
         
         # Delete from RAG (use group-level delete to catch any stale entries)
         try:
-            from app.rag.chroma import create_chroma
-            _prune_rag = create_chroma(settings)
-            deleted_rag = _prune_rag.delete_cases_by_group(group_id)
+            deleted_rag = rag.delete_cases_by_group(group_id)
             log.info("Deleted %d RAG docs for group %s (group-level delete)", deleted_rag, group_id)
         except Exception:
             log.exception("Failed to delete cases from RAG for group %s", group_id)
 
-        # Delete R2 media (all attachments under attachments/{group_id}/)
+        # Delete R2 media (attachments/{group_id}/, plus history images
+        # stored under history/{group_id}/ before media was content-addressed)
         try:
             from app import r2
             if r2.is_enabled():
                 deleted_r2 = r2.delete_prefix(f"attachments/{group_id}/")
+                deleted_r2 += r2.delete_prefix(f"history/{group_id}/")
                 log.info("Deleted %d R2 objects for group %s", deleted_r2, group_id)
         except Exception:
             log.exception("Failed to delete R2 objects for group %s", group_id)
@@ -967,9 +980,13 @@ def _notify_interrupted_ingestions() -> None:
 @app.on_event("startup")
 def _startup() -> None:
     _r2.init_r2()
+    _r2.start_uploader()
 
     t = threading.Thread(target=worker_loop_forever, args=(deps,), daemon=True)
     t.start()
+    threading.Thread(target=rag_indexer_loop_forever, args=(deps,), daemon=True).start()
+    threading.Thread(target=retention_loop_forever, args=(deps,), daemon=True).start()
+    start_media_enrichers(deps, on_message_stored=_debouncer.on_message)
 
     def _admin_reconcile_loop() -> None:
         while True:
@@ -1429,7 +1446,14 @@ def healthz() -> dict:
             status_code=503,
             detail=f"Worker stalled: no heartbeat for {age:.0f}s",
         )
-    return {"ok": True, "worker_heartbeat_age_s": round(age, 1)}
+    out = {"ok": True, "worker_heartbeat_age_s": round(age, 1)}
+    if hasattr(db, "stats"):
+        out["db_pool"] = db.stats()
+    if _r2.is_enabled():
+        out["r2_uploads"] = _r2.upload_stats()
+    if hasattr(signal, "send_stats"):
+        out["signal_send"] = signal.send_stats()
+    return out
 
 
 class HistoryTokenRequest(BaseModel):
@@ -1845,13 +1869,11 @@ def _save_history_images(
 ) -> list:
     """Decode base64 attachment payloads and store them.
 
-    If R2 is configured, uploads to R2 and returns public URLs.
+    If R2 is configured, queues them for upload to R2 and returns public URLs.
     Otherwise saves to disk under ``<storage_root>/history/<group_id>/``
     and returns absolute paths.
-    Uploads run in parallel when R2 is enabled for speed.
     """
     import base64 as _b64
-    from concurrent.futures import ThreadPoolExecutor, as_completed as _as_completed
 
     if not image_payloads:
         return []
@@ -1884,33 +1906,23 @@ def _save_history_images(
         return []
 
     if _r2.is_enabled():
-        results = [None] * len(items)
-
-        def _upload_one(idx, raw_bytes, content_type, filename):
-            key = f"history/{group_id}/{filename}"
+        # upload() only spools to disk; the background uploader puts to R2
+        results = []
+        for raw_bytes, content_type, filename, _ in items:
             try:
-                url = _r2.upload(key, raw_bytes, content_type)
-                return idx, url, key
+                # Content-addressed: re-ingesting a group re-uses existing objects
+                results.append(_r2.upload_content(group_id, raw_bytes, content_type, ext=Path(filename).suffix))
+                continue
             except Exception:
-                return idx, None, key
-
-        with ThreadPoolExecutor(max_workers=min(len(items), 8)) as pool:
-            futs = [pool.submit(_upload_one, j, rb, ct, fn) for j, (rb, ct, fn, _) in enumerate(items)]
-            for fut in _as_completed(futs):
-                idx, url, key = fut.result()
-                if url:
-                    results[idx] = url
-                else:
-                    log.error("R2 upload failed for %s, falling back to disk", key)
-                    rb, ct, fn, _ = items[idx]
-                    dest_dir = Path(storage_root) / "history" / group_id
-                    try:
-                        dest_dir.mkdir(parents=True, exist_ok=True)
-                        dest_file = dest_dir / fn
-                        dest_file.write_bytes(rb)
-                        results[idx] = str(dest_file)
-                    except Exception as e2:
-                        log.warning("Local save also failed for %s: %s", fn, e2)
+                log.error("R2 upload failed for %s, falling back to disk", filename)
+            dest_dir = Path(storage_root) / "history" / group_id
+            try:
+                dest_dir.mkdir(parents=True, exist_ok=True)
+                dest_file = dest_dir / filename
+                dest_file.write_bytes(raw_bytes)
+                results.append(str(dest_file))
+            except Exception as e2:
+                log.warning("Local save also failed for %s: %s", filename, e2)
 
         return [r for r in results if r is not None]
 
@@ -1961,7 +1973,7 @@ def _process_history_cases_bg(req: HistoryCasesRequest) -> int:
     entries remain intact so the group is never left empty.
     """
     import re
-    from app.db import RawMessage, mark_case_in_rag
+    from app.db import RawMessage, mark_cases_in_rag
     from app.db.queries_mysql import archive_cases_for_group, clear_group_runtime_data, set_group_ingesting
 
     # Collect existing case IDs BEFORE inserting new ones — we'll archive
@@ -2153,71 +2165,34 @@ def _process_history_cases_bg(req: HistoryCasesRequest) -> int:
                 case_id, case.status, len(evidence_ids), action, req.group_id[:20],
             )
 
-            # Index solved cases into SCRAG, recommendation cases into RCRAG
-            if case.status in ("solved", "recommendation") and case.solution_summary.strip():
-                prefix = "[SOLVED]" if case.status == "solved" else "[РЕКОМЕНДАЦІЯ]"
-                doc_text = "\n".join([
-                    f"{prefix} {case.problem_title.strip()}",
-                    f"Проблема: {case.problem_summary.strip()}",
-                    f"Рішення: {case.solution_summary.strip()}",
-                    "tags: " + ", ".join(case.tags),
-                ]).strip()
-                rag_embedding = llm.embed(text=doc_text)
-                metadata: dict = {"group_id": req.group_id, "status": case.status}
-                if evidence_ids:
-                    metadata["evidence_ids"] = evidence_ids
-                if evidence_image_paths:
-                    metadata["evidence_image_paths"] = evidence_image_paths
-                rag.upsert_case(case_id=case_id, document=doc_text, embedding=rag_embedding, metadata=metadata, status=case.status)
-                mark_case_in_rag(db, case_id)
-                collection = "SCRAG" if case.status == "solved" else "RCRAG"
-                log.info("Indexed history case %s in %s action=%s (group=%s)",
-                         case_id, collection, action, req.group_id[:20])
-            else:
-                log.info("Stored history case %s (no solution, not indexed) action=%s (group=%s)", case_id, action, req.group_id[:20])
-
             kept += 1
             final_case_ids.append(case_id)
         except Exception:
             log.exception("Failed to process history case block")
             continue
 
-    # Index the newly extracted cases into RAG.  Old cases are still in RAG
-    # at this point — they'll be wiped after this succeeds (transactional safety).
+    # Index the newly extracted cases into RAG in one batch, using the
+    # post-merge state from MySQL.  Old cases are still in RAG at this
+    # point — they'll be wiped after this succeeds (transactional safety).
     reindexed = 0
     try:
-        from app.db.queries_mysql import get_case
-        for cid in final_case_ids:
+        from app.db.queries_mysql import get_case, get_case_evidence_ids
+        to_index = []
+        for cid in dict.fromkeys(final_case_ids):
             gc = get_case(db, cid)
-            if not gc:
+            if not gc or gc.get("status") not in ("solved", "recommendation"):
                 continue
-            if gc.get("status") == "archived":
+            if not (gc.get("solution_summary") or "").strip():
                 continue
-            case_status = gc.get("status", "solved")
-            sol = (gc.get("solution_summary") or "").strip()
-            if not sol:
-                continue
-            prefix = "[SOLVED]" if case_status == "solved" else "[РЕКОМЕНДАЦІЯ]"
-            doc_text = "\n".join([
-                f"{prefix} {(gc.get('problem_title') or '').strip()}",
-                f"Проблема: {(gc.get('problem_summary') or '').strip()}",
-                f"Рішення: {sol}",
-                "tags: " + ", ".join(gc.get("tags") or []),
-            ]).strip()
-            rag_emb = llm.embed(text=doc_text)
-            rag.upsert_case(
-                case_id=cid,
-                document=doc_text,
-                embedding=rag_emb,
-                metadata={"group_id": req.group_id, "status": case_status},
-                status=case_status,
-            )
-            mark_case_in_rag(db, cid)
-            reindexed += 1
+            gc["evidence_ids"] = get_case_evidence_ids(db, cid)
+            to_index.append(gc)
+        indexed_ids = index_cases(rag, llm, to_index)
+        mark_cases_in_rag(db, indexed_ids)
+        reindexed = len(indexed_ids)
     except Exception:
         log.exception("Failed to index ingest cases for group %s", req.group_id[:20])
     log.info(
-        "History cases done: inserted=%d re-indexed_to_scrag=%d group=%s (case loop %.1fs)",
+        "History cases done: inserted=%d indexed_in_rag=%d group=%s (case loop %.1fs)",
         kept, reindexed, req.group_id[:20], _time.time()-cases_start,
     )
 
@@ -2478,11 +2453,11 @@ class DebugGateRequest(BaseModel):
 
 @app.post("/debug/gate")
 def debug_gate(req: DebugGateRequest) -> dict:
-    """Test the gating LLM directly. Returns consider + tag without any side effects."""
+    """Test the gating LLM directly. Returns consider + tag + keywords without any side effects."""
     if not settings.http_debug_endpoints_enabled:
         raise HTTPException(status_code=404, detail="Not found")
     result = llm.decide_consider(message=req.message, context=req.context)
-    return {"consider": result.consider, "tag": result.tag}
+    return {"consider": result.consider, "tag": result.tag, "keywords": result.keywords}
 
 
 class DebugSimulateRequest(BaseModel):
@@ -2620,7 +2595,7 @@ def debug_reindex_group(req: DebugReindexRequest) -> dict:
         raise HTTPException(status_code=404, detail="Not found")
 
     from app.db.queries_mysql import get_case
-    from app.db import mark_case_in_rag
+    from app.db import mark_cases_in_rag
 
     with db.connection() as conn:
         cur = conn.cursor()
@@ -2644,33 +2619,19 @@ def debug_reindex_group(req: DebugReindexRequest) -> dict:
         rows = cur.fetchall()
 
     case_ids = [r[0] for r in rows]
-    indexed = 0
+    to_index = []
     for cid in case_ids:
         c = get_case(db, cid)
-        if not c:
-            continue
-        sol = (c.get("solution_summary") or "").strip()
-        if not sol:
+        if not c or not (c.get("solution_summary") or "").strip():
             continue
-        doc_text = "\n".join([
-            f"[SOLVED] {(c.get('problem_title') or '').strip()}",
-            f"Проблема: {(c.get('problem_summary') or '').strip()}",
-            f"Рішення: {sol}",
-            "tags: " + ", ".join(c.get("tags") or []),
-        ]).strip()
-        try:
-            emb = llm.embed(text=doc_text)
-            rag.upsert_case(
-                case_id=cid,
-                document=doc_text,
-                embedding=emb,
-                metadata={"group_id": req.group_id, "status": "solved"},
-                status="solved",
-            )
-            mark_case_in_rag(db, cid)
-            indexed += 1
-        except Exception as exc:
-            log.warning("Failed to re-index case %s: %s", cid, exc)
+        to_index.append(c)
+    indexed = 0
+    try:
+        indexed_ids = index_cases(rag, llm, to_index)
+        mark_cases_in_rag(db, indexed_ids)
+        indexed = len(indexed_ids)
+    except Exception as exc:
+        log.warning("Failed to re-index %d cases for group %s: %s", len(to_index), req.group_id[:20], exc)
 
     log.info(
         "debug/reindex-group: group=%s unarchived=%d indexed=%d",
@@ -1,24 +1,72 @@
 """Cloudflare R2 blob storage helpers.
 
 Uses the S3-compatible API via boto3. Falls back to local disk if R2 is not configured.
+
+Uploads are asynchronous: upload() writes the bytes to an on-disk spool and
+returns the object's URL immediately; R2_UPLOAD_WORKERS background threads
+put spooled objects to R2. A failed put is retried with exponential backoff
+(capped at 5 min) up to R2_UPLOAD_MAX_ATTEMPTS times, after which the object
+moves to the dead-letter directory and stays there until an operator acts.
+Until an object lands in R2, download() (and so the /r2 proxy) serves the
+spooled copy, which is why upload() always returns a proxy URL even when
+CLOUDFLARE_R2_PUBLIC_URL is set: a public bucket URL would 404 until the put
+completes (or for good, if it is dead-lettered). The spool survives restarts.
+
+Media is content-addressed (upload_content): the key is the sha256 of the
+bytes under the group's prefix, so a forwarded or re-ingested file maps to an
+object that already exists. Known keys are remembered in a bounded in-process
+cache and, on a miss, checked with HEAD by the uploader before putting.
+
+fetch() backs the /r2 proxy: it streams objects in chunks, honours Range and
+If-None-Match, and keeps fetched objects in a size-bounded local disk cache
+(R2_CACHE_DIR, R2_CACHE_MAX_MB, least recently served evicted first).
 """
 from __future__ import annotations
 
+import hashlib
+import heapq
+import json
 import logging
+import mimetypes
 import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
 
 log = logging.getLogger(__name__)
 
 _r2_client = None
 _r2_bucket: str = ""
 _r2_public_url: str = ""
+_r2_proxy_url: str = ""  # the bot's own /r2 endpoint
 _r2_enabled: bool = False
 
+_SPOOL_DIR = Path(os.getenv("R2_SPOOL_DIR", "/var/lib/signal/bot/r2_spool"))
+_PENDING = _SPOOL_DIR / "pending"
+_DEAD = _SPOOL_DIR / "dead"
+_UPLOAD_WORKERS = max(1, int(os.getenv("R2_UPLOAD_WORKERS", "4")))
+_UPLOAD_MAX_ATTEMPTS = max(1, int(os.getenv("R2_UPLOAD_MAX_ATTEMPTS", "8")))
+_UPLOAD_QUEUE_SIZE = 1000
+_RETRY_MAX_DELAY = 300.0
+_RESCAN_SECONDS = 60.0
+_META_SUFFIX = ".r2meta"
+_KNOWN_KEYS_MAX = 100_000
+
+_CACHE_DIR = Path(os.getenv("R2_CACHE_DIR", "/var/lib/signal/bot/r2_cache"))
+_CACHE_MAX_BYTES = max(0, int(os.getenv("R2_CACHE_MAX_MB", "1024"))) * 1024 * 1024
+_CHUNK_SIZE = 64 * 1024
+
 
 def init_r2() -> bool:
     """Initialise the R2 client from environment variables. Returns True if configured."""
-    global _r2_client, _r2_bucket, _r2_public_url, _r2_enabled
+    global _r2_client, _r2_bucket, _r2_public_url, _r2_proxy_url, _r2_enabled
 
     account_id = os.getenv("CLOUDFLARE_ACCOUNT_ID", "").strip()
     access_key = os.getenv("CLOUDFLARE_ACCESS_KEY_ID", "").strip()
@@ -54,11 +102,12 @@ def init_r2() -> bool:
         # If not set, falls back to the bot's /r2 proxy endpoint which serves
         # R2 objects authenticated server-side (no public bucket required).
         public_url = os.getenv("CLOUDFLARE_R2_PUBLIC_URL", "").strip().rstrip("/")
+        _r2_proxy_url = os.getenv("R2_PROXY_URL", "https://supportbot.info/r2").strip().rstrip("/")
         if public_url:
             _r2_public_url = public_url
             log.info("R2 storage enabled: bucket=%s public_url=%s", bucket, _r2_public_url)
         else:
-            _r2_public_url = "https://supportbot.info/r2"
+            _r2_public_url = _r2_proxy_url
             log.info(
                 "R2 storage enabled: bucket=%s (CLOUDFLARE_R2_PUBLIC_URL not set, "
                 "using internal proxy %s)",
@@ -82,51 +131,336 @@ class R2UploadError(Exception):
     """Raised when an R2 upload fails after all retries."""
 
 
+def _spool_path(root: Path, key: str) -> Path | None:
+    """Map an object key to its spool file, refusing keys that escape root."""
+    p = (root / key).resolve()
+    if not p.is_relative_to(root.resolve()):
+        return None
+    return p
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per write: content addressing makes concurrent writes of one key normal
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _read_meta(path: Path) -> dict:
+    try:
+        return json.loads(Path(str(path) + _META_SUFFIX).read_text())
+    except Exception:
+        return {}
+
+
+def _write_meta(path: Path, meta: dict) -> None:
+    _write_atomic(Path(str(path) + _META_SUFFIX), json.dumps(meta).encode())
+
+
+def _remove_spooled(path: Path) -> None:
+    for p in (path, Path(str(path) + _META_SUFFIX)):
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _KnownKeys:
+    """Bounded LRU of content-addressed keys known to exist in R2."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            return True
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self._maxsize:
+                self._keys.popitem(last=False)
+
+    def discard_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for k in [k for k in self._keys if k.startswith(prefix)]:
+                del self._keys[k]
+
+
+_known = _KnownKeys(_KNOWN_KEYS_MAX)
+
+
+def content_key(group_id: str, data: bytes, ext: str = "") -> str:
+    """Content-addressed key for media: attachments/{group_id}/{sha256}{ext}.
+
+    Scoped per group so that deleting a group's prefix removes all its media.
+    """
+    return f"attachments/{group_id}/{hashlib.sha256(data).hexdigest()}{ext.lower()}"
+
+
+def upload_content(
+    group_id: str,
+    data: bytes,
+    content_type: str = "application/octet-stream",
+    ext: str = "",
+) -> str:
+    """Store media under its content hash and return its URL.
+
+    Skips the spool write when the blob is already known to be in R2 (public
+    URL) or is already waiting in the spool (proxy URL, like upload()).
+    Raises R2UploadError like upload().
+    """
+    key = content_key(group_id, data, ext)
+    if key in _known:
+        return url_for(key)
+    path = _spool_path(_PENDING, key)
+    if _r2_enabled and path is not None and path.exists():
+        _uploader.submit(key)
+        return proxy_url_for(key)
+    return upload(key, data, content_type, immutable=True)
+
+
 def upload(
     key: str,
     data: bytes,
     content_type: str = "application/octet-stream",
+    *,
+    immutable: bool = False,
 ) -> str:
-    """Upload bytes to R2 under `key`. Retries indefinitely until success.
+    """Queue bytes for upload to R2 under `key` and return its /r2 proxy URL.
 
-    Returns the public URL. Never fails — keeps retrying with exponential
-    backoff (capped at 60s) until the upload succeeds.
+    Never blocks on R2: the bytes are spooled to disk and put by the
+    background uploader (see start_uploader). Raises R2UploadError if R2 is
+    not enabled or the spool cannot be written. immutable marks keys whose
+    bytes never change (content-addressed), letting the uploader skip the put
+    when the object already exists.
     """
     if not _r2_enabled or _r2_client is None:
         raise R2UploadError("R2 is not configured/enabled")
-    import time as _time
-
-    attempt = 0
-    delay = 1.0
-    max_delay = 60.0
-    while True:
-        attempt += 1
+    path = _spool_path(_PENDING, key)
+    if path is None:
+        raise R2UploadError(f"Invalid R2 key: {key!r}")
+    try:
+        _write_atomic(path, data)
+        _write_meta(path, {"key": key, "content_type": content_type, "attempts": 0, "immutable": immutable})
+    except OSError as e:
+        raise R2UploadError(f"Could not spool {key}: {e}") from e
+    _uploader.submit(key)
+    return proxy_url_for(key)
+
+
+class _Uploader:
+    """Background R2 uploader draining the on-disk spool."""
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=_UPLOAD_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._queued: set[str] = set()
+        self._retry_heap: list[tuple[float, str]] = []
+        self._started = False
+        self._stats = {"uploaded": 0, "deduplicated": 0, "retried": 0, "dead_lettered": 0}
+
+    def submit(self, key: str) -> None:
+        """Queue key for upload. If the queue is full the key stays spooled for the next rescan."""
+        with self._lock:
+            if key in self._queued:
+                return
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                return
+            self._queued.add(key)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(_UPLOAD_WORKERS):
+            threading.Thread(target=self._work_loop, name=f"r2-upload-{i}", daemon=True).start()
+        threading.Thread(target=self._schedule_loop, name="r2-upload-sched", daemon=True).start()
+        log.info("R2 uploader started (workers=%d, spool=%s)", _UPLOAD_WORKERS, _SPOOL_DIR)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "queued": len(self._queued),
+                "retry_waiting": len(self._retry_heap),
+            }
+
+    def _rescan(self) -> None:
+        """Queue every spooled object not already queued or waiting for a retry."""
+        if not _PENDING.exists():
+            return
+        with self._lock:
+            waiting = {k for _, k in self._retry_heap}
+        for meta_path in _PENDING.rglob("*" + _META_SUFFIX):
+            key = str(meta_path.relative_to(_PENDING))[: -len(_META_SUFFIX)]
+            if key not in waiting:
+                self.submit(key)
+
+    def _schedule_loop(self) -> None:
+        # Picks up objects spooled before a restart, or skipped while the queue was full
+        next_scan = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= next_scan:
+                try:
+                    self._rescan()
+                except Exception:
+                    log.exception("R2 spool rescan failed")
+                next_scan = now + _RESCAN_SECONDS
+            due: list[str] = []
+            with self._lock:
+                while self._retry_heap and self._retry_heap[0][0] <= now:
+                    due.append(heapq.heappop(self._retry_heap)[1])
+            for key in due:
+                self.submit(key)
+            time.sleep(1.0)
+
+    def _work_loop(self) -> None:
+        while True:
+            key = self._queue.get()
+            try:
+                self._upload_one(key)
+            except Exception:
+                log.exception("R2 uploader crashed on key=%s", key)
+            finally:
+                with self._lock:
+                    self._queued.discard(key)
+
+    def _upload_one(self, key: str) -> None:
+        path = _spool_path(_PENDING, key)
+        if path is None or not path.exists():
+            return
+        meta = _read_meta(path)
+        content_type = meta.get("content_type") or "application/octet-stream"
+        immutable = bool(meta.get("immutable"))
         try:
-            _r2_client.put_object(
-                Bucket=_r2_bucket,
-                Key=key,
-                Body=data,
-                ContentType=content_type,
-            )
-            url = f"{_r2_public_url}/{key}"
-            if attempt > 1:
-                log.info("Uploaded to R2 on attempt %d: %s → %s", attempt, key, url)
-            else:
-                log.info("Uploaded to R2: %s → %s", key, url)
-            return url
+            mtime = path.stat().st_mtime_ns
+            if immutable and (key in _known or _exists(key)):
+                _remove_spooled(path)
+                _known.add(key)
+                with self._lock:
+                    self._stats["deduplicated"] += 1
+                log.debug("R2 object already present, skipped upload: %s", key)
+                return
+            _r2_client.put_object(Bucket=_r2_bucket, Key=key, Body=path.read_bytes(), ContentType=content_type)
         except Exception as e:
-            log.warning(
-                "R2 upload attempt %d failed for key=%s: %s — retrying in %.1fs",
-                attempt, key, e, delay,
-            )
-            _time.sleep(delay)
-            delay = min(delay * 2, max_delay)
+            attempts = int(meta.get("attempts", 0)) + 1
+            meta.update(key=key, content_type=content_type, attempts=attempts, last_error=str(e)[:500])
+            if attempts >= _UPLOAD_MAX_ATTEMPTS:
+                self._dead_letter(key, path, meta)
+                return
+            delay = min(2.0 ** attempts, _RETRY_MAX_DELAY)
+            log.warning("R2 upload attempt %d failed for key=%s: %s — retrying in %.0fs", attempts, key, e, delay)
+            _write_meta(path, meta)
+            with self._lock:
+                self._stats["retried"] += 1
+                heapq.heappush(self._retry_heap, (time.monotonic() + delay, key))
+            return
+        # The key was re-spooled with new bytes while we were uploading: go again
+        if path.exists() and path.stat().st_mtime_ns != mtime:
+            with self._lock:
+                heapq.heappush(self._retry_heap, (time.monotonic(), key))
+            return
+        _remove_spooled(path)
+        if immutable:
+            _known.add(key)
+        with self._lock:
+            self._stats["uploaded"] += 1
+        log.info("Uploaded to R2: %s → %s", key, url_for(key))
+
+    def _dead_letter(self, key: str, path: Path, meta: dict) -> None:
+        dead = _spool_path(_DEAD, key)
+        dead.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, dead)
+        _write_meta(dead, meta)
+        _remove_spooled(path)
+        with self._lock:
+            self._stats["dead_lettered"] += 1
+        log.error(
+            "R2 upload for key=%s failed %d times — moved to %s (last error: %s)",
+            key, meta["attempts"], dead, meta.get("last_error"),
+        )
+
+
+_uploader = _Uploader()
+
+
+def _exists(key: str) -> bool:
+    """HEAD the object. Raises on errors other than "not found" so the caller retries."""
+    try:
+        _r2_client.head_object(Bucket=_r2_bucket, Key=key)
+        return True
+    except Exception as e:
+        code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+        if code in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def start_uploader() -> None:
+    """Start the background uploader threads (no-op if R2 is disabled)."""
+    if _r2_enabled:
+        _uploader.start()
+
+
+def upload_stats() -> dict:
+    return _uploader.stats()
+
+
+def _spooled_file(key: str) -> Path | None:
+    """Local file of a not-yet-uploaded (pending or dead-lettered) object."""
+    for root in (_PENDING, _DEAD):
+        path = _spool_path(root, key)
+        if path is None or path.name.endswith(_META_SUFFIX):
+            return None
+        if path.is_file():
+            return path
+    return None
+
+
+def _read_spooled(key: str) -> tuple[bytes, str] | None:
+    path = _spooled_file(key)
+    if path is None:
+        return None
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    content_type = _read_meta(path).get("content_type") or (
+        mimetypes.guess_type(key)[0] or "application/octet-stream"
+    )
+    return data, content_type
 
 
 def download(key: str) -> tuple[bytes, str] | None:
-    """Download an object from R2. Returns (bytes, content_type) or None on failure."""
+    """Download an object from R2. Returns (bytes, content_type) or None on failure.
+
+    Objects still waiting in the upload spool are served from local disk.
+    """
     if not _r2_enabled or _r2_client is None:
         return None
+    spooled = _read_spooled(key)
+    if spooled is not None:
+        return spooled
     try:
         resp = _r2_client.get_object(Bucket=_r2_bucket, Key=key)
         data = resp["Body"].read()
@@ -137,51 +471,362 @@ def download(key: str) -> tuple[bytes, str] | None:
         return None
 
 
+class _EdgeCache:
+    """Size-bounded on-disk cache of R2 objects served by the /r2 proxy.
+
+    Each object is a file named by sha256(key) with a JSON sidecar holding
+    key, content type and ETag. File mtime is the LRU clock.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self._root = root
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self._root / hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[Path, dict] | None:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            meta = json.loads(Path(str(path) + _META_SUFFIX).read_text())
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return path, meta
+
+    def _scan_total(self) -> int:
+        if not self._root.exists():
+            return 0
+        return sum(p.stat().st_size for p in self._root.iterdir() if not p.name.endswith((_META_SUFFIX, ".tmp")))
+
+    def writer(self, key: str, meta: dict, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Pass chunks through while writing them to the cache; commit only on completion."""
+        path = self._path(key)
+        self._root.mkdir(parents=True, exist_ok=True)
+        # Unique per fill: concurrent fills of one key may share a pool thread
+        fd, tmp_name = tempfile.mkstemp(dir=self._root, prefix=path.name + ".", suffix=".tmp")
+        tmp = Path(tmp_name)
+        complete = False
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp, path)
+                _write_atomic(Path(str(path) + _META_SUFFIX), json.dumps({**meta, "key": key}).encode())
+                self._account(size)
+            else:
+                try:
+                    tmp.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_total()
+            else:
+                self._total += added
+            if self._total <= self._max_bytes:
+                return
+            # Evict least recently served down to 90% of the budget
+            files = sorted(
+                (p for p in self._root.iterdir() if not p.name.endswith((_META_SUFFIX, ".tmp"))),
+                key=lambda p: p.stat().st_mtime,
+            )
+            target = int(self._max_bytes * 0.9)
+            for p in files:
+                if self._total <= target:
+                    break
+                try:
+                    size = p.stat().st_size
+                    _remove_spooled(p)
+                except FileNotFoundError:
+                    continue
+                self._total -= size
+
+    def discard_prefix(self, prefix: str) -> None:
+        if not self._root.exists():
+            return
+        with self._lock:
+            for meta_path in self._root.glob("*" + _META_SUFFIX):
+                try:
+                    key = json.loads(meta_path.read_text()).get("key", "")
+                except (FileNotFoundError, ValueError):
+                    continue
+                if key.startswith(prefix):
+                    _remove_spooled(Path(str(meta_path)[: -len(_META_SUFFIX)]))
+            self._total = None
+
+
+_cache = _EdgeCache(_CACHE_DIR, _CACHE_MAX_BYTES)
+
+
+@dataclass
+class R2Object:
+    """A (possibly partial) object body ready to stream. status is 200, 206, 304 or 416."""
+
+    status: int
+    content_type: str
+    etag: str
+    length: int
+    content_range: str | None
+    body: Iterator[bytes]
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match or not etag:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _parse_range(header: str | None, total: int) -> tuple[int, int] | None | bool:
+    """Parse a single-range "bytes=a-b" header. None: no/ignored range; False: unsatisfiable."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            n = int(last)
+            if n <= 0:
+                return False
+            start, end = max(total - n, 0), total - 1
+        else:
+            start = int(first)
+            end = min(int(last), total - 1) if last else total - 1
+    except ValueError:
+        return None
+    if start >= total or start > end:
+        return False
+    return start, end
+
+
+def _iter_file(f: BinaryIO, start: int, length: int) -> Iterator[bytes]:
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(_CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _local_object(
+    path: Path, content_type: str, etag: str | None, range_header: str | None, if_none_match: str | None,
+) -> R2Object | None:
+    """Serve a spooled or cached file; None if it was removed since lookup.
+
+    The file is opened up front: eviction or a finished upload may unlink it
+    at any time, and an open handle keeps reading the data. etag=None derives
+    one from size and mtime.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    st = os.fstat(f.fileno())
+    total = st.st_size
+    if etag is None:
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    if _etag_matches(if_none_match, etag):
+        f.close()
+        return R2Object(304, content_type, etag, 0, None, iter(()))
+    rng = _parse_range(range_header, total)
+    if rng is False:
+        f.close()
+        return R2Object(416, content_type, etag, 0, f"bytes */{total}", iter(()))
+    if rng is None:
+        return R2Object(200, content_type, etag, total, None, _iter_file(f, 0, total))
+    start, end = rng
+    return R2Object(
+        206, content_type, etag, end - start + 1, f"bytes {start}-{end}/{total}",
+        _iter_file(f, start, end - start + 1),
+    )
+
+
+def _error_code(e: Exception) -> str:
+    return str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+
+
+def fetch(key: str, range_header: str | None = None, if_none_match: str | None = None) -> R2Object | None:
+    """Open an object for streaming. Returns None if it does not exist.
+
+    Served from the upload spool or the edge cache when possible; otherwise
+    streamed from R2 in chunks, and (full 200 responses only) written through
+    to the edge cache as it streams.
+    """
+    if not _r2_enabled or _r2_client is None:
+        return None
+
+    # Local hits can vanish between lookup and open (upload landed, eviction);
+    # _local_object then returns None and we fall through to R2
+    spooled = _spooled_file(key)
+    if spooled is not None:
+        content_type = _read_meta(spooled).get("content_type") or (
+            mimetypes.guess_type(key)[0] or "application/octet-stream"
+        )
+        obj = _local_object(spooled, content_type, None, range_header, if_none_match)
+        if obj is not None:
+            return obj
+
+    cached = _cache.get(key)
+    if cached is not None:
+        path, meta = cached
+        obj = _local_object(path, meta.get("content_type") or "application/octet-stream",
+                            meta.get("etag") or "", range_header, if_none_match)
+        if obj is not None:
+            return obj
+
+    kwargs: dict = {"Bucket": _r2_bucket, "Key": key}
+    if range_header:
+        kwargs["Range"] = range_header
+    if if_none_match:
+        kwargs["IfNoneMatch"] = if_none_match
+    try:
+        resp = _r2_client.get_object(**kwargs)
+    except Exception as e:
+        code = _error_code(e)
+        if code in ("304", "NotModified"):
+            return R2Object(304, "", if_none_match or "", 0, None, iter(()))
+        if code in ("416", "InvalidRange"):
+            return R2Object(416, "", "", 0, None, iter(()))
+        if code not in ("404", "NoSuchKey"):
+            log.warning("R2 fetch failed for key=%s: %s", key, e)
+        return None
+
+    body = resp["Body"]
+    content_type = resp.get("ContentType", "application/octet-stream")
+    etag = resp.get("ETag", "")
+    length = int(resp.get("ContentLength") or 0)
+    content_range = resp.get("ContentRange")
+
+    def _chunks() -> Iterator[bytes]:
+        try:
+            yield from body.iter_chunks(_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    chunks: Iterator[bytes] = _chunks()
+    if content_range:
+        return R2Object(206, content_type, etag, length, content_range, chunks)
+    # Cache full bodies that fit comfortably in the budget
+    if _cache.enabled and length <= _CACHE_MAX_BYTES // 8:
+        chunks = _cache.writer(key, {"content_type": content_type, "etag": etag}, chunks)
+    return R2Object(200, content_type, etag, length, None, chunks)
+
+
 def url_for(key: str) -> str:
     """Return the public URL for a given R2 key."""
     return f"{_r2_public_url}/{key}"
 
 
+def proxy_url_for(key: str) -> str:
+    """Return the bot's /r2 proxy URL for a key; valid before the object reaches R2."""
+    return f"{_r2_proxy_url}/{key}"
+
+
 def is_r2_url(path: str) -> bool:
     """Return True if the path is already an R2/https URL (not a local path)."""
     return path.startswith("https://") or path.startswith("http://")
 
 
 def key_from_url(url: str) -> str | None:
-    """Extract the R2 object key from a public URL. Returns None if not an R2 URL."""
-    if not _r2_public_url or not url.startswith(_r2_public_url):
-        return None
-    return url[len(_r2_public_url):].lstrip("/")
+    """Extract the R2 object key from a public or proxy URL. Returns None if not an R2 URL."""
+    for base in (_r2_public_url, _r2_proxy_url):
+        if base and url.startswith(base + "/"):
+            return url[len(base):].lstrip("/")
+    return None
+
+
+_DELETE_BATCH = 1000  # DeleteObjects limit
+_DELETE_PAGES_IN_FLIGHT = 4
 
 
-def delete_prefix(prefix: str) -> int:
-    """Delete all objects under a given key prefix. Returns count of deleted objects."""
+def _delete_batch(keys: list[str]) -> int:
+    """Delete up to 1000 keys with one DeleteObjects call. Returns count deleted."""
+    resp = _r2_client.delete_objects(
+        Bucket=_r2_bucket,
+        Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+    )
+    errors = resp.get("Errors") or []
+    for err in errors[:5]:
+        log.warning("Failed to delete R2 object %s: %s", err.get("Key"), err.get("Message") or err.get("Code"))
+    if len(errors) > 5:
+        log.warning("... and %d more R2 delete errors", len(errors) - 5)
+    return len(keys) - len(errors)
+
+
+def delete_prefix(prefix: str, on_progress: Callable[[int], None] | None = None) -> int:
+    """Delete all objects under a given key prefix. Returns count of deleted objects.
+
+    Keys are listed a page (1000) at a time and each page is removed with one
+    DeleteObjects request; up to _DELETE_PAGES_IN_FLIGHT pages are deleted
+    concurrently while listing continues. on_progress, if given, is called
+    with the running total after each page completes.
+    """
     if not _r2_enabled or _r2_client is None:
         return 0
 
+    _known.discard_prefix(prefix)
+    _cache.discard_prefix(prefix)
+    # Drop queued uploads too, or they would re-create the objects later
+    for root in (_PENDING, _DEAD):
+        spooled = _spool_path(root, prefix)
+        if spooled is not None and spooled != root.resolve() and spooled.is_dir():
+            shutil.rmtree(spooled, ignore_errors=True)
+
     deleted = 0
     continuation_token = None
-
-    try:
-        while True:
-            kwargs: dict = {"Bucket": _r2_bucket, "Prefix": prefix, "MaxKeys": 1000}
-            if continuation_token:
-                kwargs["ContinuationToken"] = continuation_token
-
-            resp = _r2_client.list_objects_v2(**kwargs)
-
-            for obj in resp.get("Contents", []):
-                key = obj["Key"]
-                try:
-                    _r2_client.delete_object(Bucket=_r2_bucket, Key=key)
-                    deleted += 1
-                except Exception as e:
-                    log.warning("Failed to delete R2 object %s: %s", key, e)
-
-            if not resp.get("IsTruncated"):
-                break
-            continuation_token = resp.get("NextContinuationToken")
-    except Exception as e:
-        log.error("R2 delete_prefix failed for prefix=%s after %d deletions: %s", prefix, deleted, e)
+    in_flight: set[Future] = set()
+
+    def _collect(done: set[Future]) -> None:
+        nonlocal deleted
+        for fut in done:
+            try:
+                deleted += fut.result()
+            except Exception as e:
+                log.warning("R2 DeleteObjects failed under prefix=%s: %s", prefix, e)
+                continue
+            log.info("R2 delete_prefix %s: %d objects deleted so far", prefix, deleted)
+            if on_progress is not None:
+                on_progress(deleted)
+
+    with ThreadPoolExecutor(max_workers=_DELETE_PAGES_IN_FLIGHT, thread_name_prefix="r2-delete") as pool:
+        try:
+            while True:
+                kwargs: dict = {"Bucket": _r2_bucket, "Prefix": prefix, "MaxKeys": _DELETE_BATCH}
+                if continuation_token:
+                    kwargs["ContinuationToken"] = continuation_token
+
+                resp = _r2_client.list_objects_v2(**kwargs)
+
+                keys = [obj["Key"] for obj in resp.get("Contents", [])]
+                if keys:
+                    if len(in_flight) >= _DELETE_PAGES_IN_FLIGHT:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        _collect(done)
+                    in_flight.add(pool.submit(_delete_batch, keys))
+
+                if not resp.get("IsTruncated"):
+                    break
+                continuation_token = resp.get("NextContinuationToken")
+        except Exception as e:
+            log.error("R2 delete_prefix listing failed for prefix=%s: %s", prefix, e)
+        _collect(set(in_flight))
 
     return deleted
@@ -1,2 +1,25 @@
-"""RAG via Chroma."""
+"""RAG backends: Chroma (HTTP server, default) or an in-process local index."""
 
+from __future__ import annotations
+
+import logging
+
+from app.config import Settings
+
+log = logging.getLogger(__name__)
+
+
+def create_rag(settings: Settings):
+    """Build the DualRag for the configured backend (RAG_BACKEND=chroma|local)."""
+    from app.rag.chroma import DualRag, create_chroma
+
+    if settings.rag_backend == "local":
+        from app.rag.local import create_local_collection
+
+        base = settings.chroma_collection
+        scrag = create_local_collection(f"{base}_scrag", settings.rag_local_dir)
+        rcrag = create_local_collection(f"{base}_rcrag", settings.rag_local_dir)
+        log.info("Local dual-RAG configured: dir=%s scrag=%s rcrag=%s",
+                 settings.rag_local_dir, f"{base}_scrag", f"{base}_rcrag")
+        return DualRag(scrag=scrag, rcrag=rcrag)
+    return create_chroma(settings)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Protocol
+
+
+class RagBackend(Protocol):
+    """Protocol for a single case collection (one of SCRAG / RCRAG).
+
+    Implemented by ChromaRag (HTTP Chroma server) and LocalRag (in-process
+    index). DualRag composes two of these. Results are dicts with keys
+    case_id, document, metadata, distance (squared L2, lower = closer).
+    """
+
+    collection_name: str
+
+    def upsert_case(self, *, case_id: str, document: str, embedding: list[float], metadata: Dict[str, Any]) -> None: ...
+
+    def upsert_cases(
+        self,
+        *,
+        case_ids: List[str],
+        documents: List[str],
+        embeddings: List[list[float]],
+        metadatas: List[Dict[str, Any]],
+    ) -> None: ...
+
+    def retrieve_cases(
+        self,
+        *,
+        group_id: str,
+        group_ids: list[str] | None = None,
+        embedding: list[float],
+        k: int,
+        status: str | None = "solved",
+        include_documents: bool = True,
+    ) -> List[Dict[str, Any]]: ...
+
+    def get_documents(self, case_ids: List[str]) -> Dict[str, str]: ...
+
+    def search_all_cases(self, *, embedding: list[float], k: int) -> List[Dict[str, Any]]: ...
+
+    def delete_cases(self, case_ids: List[str]) -> int: ...
+
+    def delete_cases_by_group(self, group_id: str) -> int: ...
+
+    def list_all_case_ids(self) -> List[str]: ...
+
+    def wipe_all_cases(self) -> int: ...
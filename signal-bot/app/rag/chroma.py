@@ -1,28 +1,95 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
-from typing import Any, Dict, List
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
 from urllib.parse import urlparse
 
 import chromadb
 
 from app.config import Settings
+from app.rag.backend import RagBackend
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Max records per Chroma upsert request (server limit is several thousand;
+# this keeps request bodies to a few MB with 768-dim embeddings).
+UPSERT_CHUNK_SIZE = 256
+
+
+def _is_collection_missing(exc: Exception) -> bool:
+    """True if Chroma reports the (cached) collection no longer exists.
+
+    chromadb raises NotFoundError (>=0.6) or InvalidCollectionException /
+    ValueError (older servers) when a collection was deleted or recreated
+    behind a cached handle.
+    """
+    if type(exc).__name__ in ("NotFoundError", "InvalidCollectionException"):
+        return True
+    msg = str(exc).lower()
+    return "collection" in msg and ("does not exist" in msg or "not found" in msg)
+
 
 @dataclass(frozen=True)
 class ChromaRag:
     collection_name: str
     client: Any
+    # Resolved collection handle, cached so each operation is one HTTP call
+    # instead of get_or_create_collection + the operation itself.
+    _handle: Dict[str, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _handle_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
 
     def _collection(self):
-        return self.client.get_or_create_collection(name=self.collection_name)
+        col = self._handle.get("col")
+        if col is not None:
+            return col
+        with self._handle_lock:
+            col = self._handle.get("col")
+            if col is None:
+                col = self.client.get_or_create_collection(name=self.collection_name)
+                self._handle["col"] = col
+            return col
 
-    def upsert_case(self, *, case_id: str, document: str, embedding: list[float], metadata: Dict[str, Any]) -> None:
+    def _invalidate(self, stale: Any) -> None:
+        with self._handle_lock:
+            if self._handle.get("col") is stale:
+                self._handle.pop("col", None)
+
+    def _with_collection(self, op: Callable[[Any], T]) -> T:
+        """Run op against the cached handle; re-resolve once if it went stale."""
         col = self._collection()
-        col.upsert(ids=[case_id], documents=[document], embeddings=[embedding], metadatas=[metadata])
+        try:
+            return op(col)
+        except Exception as e:
+            if not _is_collection_missing(e):
+                raise
+            log.warning("Chroma collection %s handle is stale (%s); re-resolving", self.collection_name, e)
+            self._invalidate(col)
+            return op(self._collection())
+
+    def upsert_case(self, *, case_id: str, document: str, embedding: list[float], metadata: Dict[str, Any]) -> None:
+        self._with_collection(
+            lambda col: col.upsert(ids=[case_id], documents=[document], embeddings=[embedding], metadatas=[metadata])
+        )
+
+    def upsert_cases(
+        self,
+        *,
+        case_ids: List[str],
+        documents: List[str],
+        embeddings: List[list[float]],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Bulk upsert, UPSERT_CHUNK_SIZE records per HTTP request."""
+        for i in range(0, len(case_ids), UPSERT_CHUNK_SIZE):
+            j = i + UPSERT_CHUNK_SIZE
+            self._with_collection(lambda col: col.upsert(
+                ids=case_ids[i:j], documents=documents[i:j],
+                embeddings=embeddings[i:j], metadatas=metadatas[i:j],
+            ))
 
     def retrieve_cases(
         self,
@@ -32,6 +99,7 @@ class ChromaRag:
         embedding: list[float],
         k: int,
         status: str | None = "solved",
+        include_documents: bool = True,
     ) -> List[Dict[str, Any]]:
         """Semantic search in the collection.
 
@@ -40,8 +108,9 @@ class ChromaRag:
             group_ids: If provided, search across multiple groups (union).
             status: Filter by case status. Pass None to return all statuses.
                     Defaults to "solved" so that only SCRAG-indexed cases are returned.
+            include_documents: Set False when the structured metadata fields
+                    (title/problem/solution) are enough; shrinks the response.
         """
-        col = self._collection()
         ids_to_search = group_ids if group_ids else [group_id]
         if len(ids_to_search) == 1:
             group_filter: Dict[str, Any] = {"group_id": ids_to_search[0]}
@@ -51,21 +120,30 @@ class ChromaRag:
             where_filter: Dict[str, Any] = {"$and": [group_filter, {"status": status}]}
         else:
             where_filter = group_filter
-        out = col.query(
+        include = ["documents", "metadatas", "distances"] if include_documents else ["metadatas", "distances"]
+        out = self._with_collection(lambda col: col.query(
             query_embeddings=[embedding],
             n_results=k,
             where=where_filter,
-            include=["documents", "metadatas", "distances"],
-        )
+            include=include,
+        ))
         return self._format_results(out)
 
+    def get_documents(self, case_ids: List[str]) -> Dict[str, str]:
+        """Fetch stored documents by id (fallback for entries without structured metadata)."""
+        if not case_ids:
+            return {}
+        out = self._with_collection(lambda col: col.get(ids=case_ids, include=["documents"]))
+        ids = out.get("ids") or []
+        docs = out.get("documents") or []
+        return {cid: (docs[i] if i < len(docs) else "") or "" for i, cid in enumerate(ids)}
+
     def search_all_cases(self, *, embedding: list[float], k: int) -> List[Dict[str, Any]]:
-        col = self._collection()
-        out = col.query(
+        out = self._with_collection(lambda col: col.query(
             query_embeddings=[embedding],
             n_results=k,
             include=["documents", "metadatas", "distances"],
-        )
+        ))
         return self._format_results(out)
 
     def _format_results(self, out: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -90,8 +168,7 @@ class ChromaRag:
         """Delete cases from RAG by their IDs. Returns number deleted."""
         if not case_ids:
             return 0
-        col = self._collection()
-        col.delete(ids=case_ids)
+        self._with_collection(lambda col: col.delete(ids=case_ids))
         return len(case_ids)
 
     def delete_cases_by_group(self, group_id: str) -> int:
@@ -103,11 +180,10 @@ class ChromaRag:
         Returns number of documents deleted.
         """
         try:
-            col = self._collection()
-            result = col.get(where={"group_id": group_id}, include=[])
+            result = self._with_collection(lambda col: col.get(where={"group_id": group_id}, include=[]))
             ids = result.get("ids") or []
             if ids:
-                col.delete(ids=ids)
+                self._with_collection(lambda col: col.delete(ids=ids))
                 log.info("delete_cases_by_group: removed %d docs for group %s", len(ids), group_id[:20])
             return len(ids)
         except Exception as e:
@@ -120,8 +196,7 @@ class ChromaRag:
         Used by the SYNC_RAG worker to identify stale entries.
         """
         try:
-            col = self._collection()
-            result = col.get(include=[])
+            result = self._with_collection(lambda col: col.get(include=[]))
             return result.get("ids") or []
         except Exception as e:
             log.warning("list_all_case_ids failed: %s", e)
@@ -130,10 +205,9 @@ class ChromaRag:
     def wipe_all_cases(self) -> int:
         """Delete the entire RAG collection (all cases). Returns count deleted."""
         try:
-            col = self._collection()
-            all_ids = col.get(include=[])["ids"]
+            all_ids = self._with_collection(lambda col: col.get(include=[]))["ids"]
             if all_ids:
-                col.delete(ids=all_ids)
+                self._with_collection(lambda col: col.delete(ids=all_ids))
             log.info("RAG wipe: deleted %d documents", len(all_ids))
             return len(all_ids)
         except Exception as e:
@@ -145,10 +219,11 @@ class ChromaRag:
 class DualRag:
     """Two-collection RAG: SCRAG (solved) + RCRAG (recommendation).
 
-    Each is an independent ChromaDB collection with separate indices.
+    Each is an independent collection with separate indices, backed by either
+    ChromaDB (ChromaRag) or the in-process index (LocalRag).
     """
-    scrag: ChromaRag
-    rcrag: ChromaRag
+    scrag: RagBackend
+    rcrag: RagBackend
 
     def upsert_case(self, *, case_id: str, document: str, embedding: list[float], metadata: Dict[str, Any], status: str = "solved") -> None:
         """Upsert into the correct collection based on status."""
@@ -161,6 +236,38 @@ class DualRag:
             except Exception:
                 pass  # May not exist in RCRAG
 
+    def upsert_cases(self, batch: List[Dict[str, Any]]) -> int:
+        """Bulk variant of upsert_case.
+
+        batch items: case_id, document, embedding, metadata, status. Items are
+        grouped by target collection and sent in chunks; if a case_id appears
+        more than once the last item wins. Returns number of cases upserted.
+        """
+        latest: Dict[str, Dict[str, Any]] = {}
+        for item in batch:
+            latest.pop(item["case_id"], None)
+            latest[item["case_id"]] = item
+        by_target: Dict[bool, List[Dict[str, Any]]] = {True: [], False: []}
+        for item in latest.values():
+            by_target[item.get("status", "solved") == "solved"].append(item)
+        for solved, items in by_target.items():
+            if not items:
+                continue
+            target = self.scrag if solved else self.rcrag
+            target.upsert_cases(
+                case_ids=[it["case_id"] for it in items],
+                documents=[it["document"] for it in items],
+                embeddings=[it["embedding"] for it in items],
+                metadatas=[it["metadata"] for it in items],
+            )
+        # Promoted recommendation→solved cases must leave RCRAG
+        if by_target[True]:
+            try:
+                self.rcrag.delete_cases([it["case_id"] for it in by_target[True]])
+            except Exception:
+                pass  # May not exist in RCRAG
+        return len(latest)
+
     def delete_cases(self, case_ids: List[str]) -> int:
         """Delete from both collections."""
         n = self.scrag.delete_cases(case_ids)
@@ -177,12 +284,27 @@ class DualRag:
         return self.scrag.wipe_all_cases() + self.rcrag.wipe_all_cases()
 
 
+# One HttpClient per Chroma server, shared process-wide. The client keeps a
+# keep-alive connection pool, so recreating it would drop warm connections.
+_clients: Dict[Tuple[str, int], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(host: str, port: int) -> Any:
+    with _clients_lock:
+        client = _clients.get((host, port))
+        if client is None:
+            client = chromadb.HttpClient(host=host, port=port)
+            _clients[(host, port)] = client
+        return client
+
+
 def create_chroma(settings: Settings) -> DualRag:
     u = urlparse(settings.chroma_url)
     host = u.hostname or "rag"
     port = u.port or (443 if u.scheme == "https" else 80)
 
-    client = chromadb.HttpClient(host=host, port=port)
+    client = _get_client(host, port)
     base = settings.chroma_collection
     scrag = ChromaRag(collection_name=f"{base}_scrag", client=client)
     rcrag = ChromaRag(collection_name=f"{base}_rcrag", client=client)
@@ -0,0 +1,157 @@
+"""Build RAG documents for cases and index them in bulk.
+
+Every indexing path (live worker, history ingest, debug reindex, SYNC_RAG
+backfill) goes through index_cases(): documents are embedded with one
+embed_batch call per 100 texts and upserted per collection in chunks, instead
+of one embedding request plus one upsert per case.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List
+
+log = logging.getLogger(__name__)
+
+
+def case_document(
+    *,
+    status: str,
+    problem_title: str,
+    problem_summary: str,
+    solution_summary: str,
+    tags: List[str],
+) -> str:
+    prefix = "[SOLVED]" if status == "solved" else "[РЕКОМЕНДАЦІЯ]"
+    return "\n".join([
+        f"{prefix} {(problem_title or '').strip()}",
+        f"Проблема: {(problem_summary or '').strip()}",
+        f"Рішення: {(solution_summary or '').strip()}",
+        "tags: " + ", ".join(tags or []),
+    ]).strip()
+
+
+def case_metadata(
+    *,
+    group_id: str,
+    status: str,
+    problem_title: str = "",
+    problem_summary: str = "",
+    solution_summary: str = "",
+    tags: List[str] | None = None,
+    evidence_ids: List[str] | None = None,
+    evidence_image_paths: List[str] | None = None,
+) -> Dict[str, Any]:
+    """Metadata stored next to each case document.
+
+    title/problem/solution/tags are stored pre-split so retrieval can use them
+    directly (see case_fields) instead of parsing the document per query.
+    """
+    meta: Dict[str, Any] = {
+        "group_id": group_id,
+        "status": status,
+        "title": (problem_title or "").strip(),
+        "problem": (problem_summary or "").strip(),
+        "solution": (solution_summary or "").strip(),
+        "tags": ", ".join(tags or []),
+    }
+    if evidence_ids:
+        meta["evidence_ids"] = list(evidence_ids)
+    if evidence_image_paths:
+        meta["evidence_image_paths"] = list(evidence_image_paths)
+    return meta
+
+
+def _parse_document(doc: str) -> Dict[str, str]:
+    """Split a case document into title/problem/solution.
+
+    Only for entries indexed before structured metadata existed; they are
+    replaced on the next re-index of the case.
+    """
+    lines = [ln.strip() for ln in (doc or "").splitlines() if ln.strip()]
+    title, problem, solution = "", "", ""
+    if lines:
+        title = lines[0]
+        for prefix in ("[SOLVED]", "[РЕКОМЕНДАЦІЯ]"):
+            if title.startswith(prefix):
+                title = title[len(prefix):].strip()
+    current = ""
+    for ln in lines[1:]:
+        if ln.startswith("Проблема:"):
+            current, problem = "problem", ln[len("Проблема:"):].strip()
+        elif ln.startswith("Рішення:"):
+            current, solution = "solution", ln[len("Рішення:"):].strip()
+        elif ln.lower().startswith("tags:"):
+            current = ""
+        elif current == "problem":
+            problem = f"{problem} {ln}".strip()
+        elif current == "solution":
+            solution = f"{solution} {ln}".strip()
+    if not problem:
+        problem = lines[1] if len(lines) > 1 else (doc or "")[:100]
+    if not solution and len(lines) > 2 and not lines[2].lower().startswith("tags:"):
+        solution = lines[2]
+    return {"title": title, "problem": problem, "solution": solution}
+
+
+def has_case_fields(result: Dict[str, Any]) -> bool:
+    """True if a retrieval result carries structured fields in its metadata."""
+    return "solution" in (result.get("metadata") or {})
+
+
+def case_fields(result: Dict[str, Any]) -> Dict[str, str]:
+    """title/problem/solution of a retrieval result.
+
+    Read from metadata; falls back to parsing result["document"] for legacy
+    entries (callers must fetch the document for those, see has_case_fields).
+    """
+    meta = result.get("metadata") or {}
+    if has_case_fields(result):
+        return {
+            "title": str(meta.get("title") or ""),
+            "problem": str(meta.get("problem") or ""),
+            "solution": str(meta.get("solution") or ""),
+        }
+    return _parse_document(str(result.get("document") or ""))
+
+
+def index_cases(rag: Any, llm: Any, cases: List[Dict[str, Any]]) -> List[str]:
+    """Embed and upsert cases into SCRAG/RCRAG. Returns the indexed case_ids.
+
+    cases: dicts with case_id, group_id, status, problem_title,
+    problem_summary, solution_summary, tags and optional evidence_ids /
+    evidence_image_paths. Callers are responsible for mark_cases_in_rag().
+    """
+    if not cases:
+        return []
+    docs = [
+        case_document(
+            status=c["status"],
+            problem_title=c.get("problem_title") or "",
+            problem_summary=c.get("problem_summary") or "",
+            solution_summary=c.get("solution_summary") or "",
+            tags=c.get("tags") or [],
+        )
+        for c in cases
+    ]
+    embeddings = llm.embed_batch(texts=docs)
+    batch = [
+        {
+            "case_id": c["case_id"],
+            "document": doc,
+            "embedding": emb,
+            "metadata": case_metadata(
+                group_id=c["group_id"],
+                status=c["status"],
+                problem_title=c.get("problem_title") or "",
+                problem_summary=c.get("problem_summary") or "",
+                solution_summary=c.get("solution_summary") or "",
+                tags=c.get("tags") or [],
+                evidence_ids=c.get("evidence_ids"),
+                evidence_image_paths=c.get("evidence_image_paths"),
+            ),
+            "status": c["status"],
+        }
+        for c, doc, emb in zip(cases, docs, embeddings)
+    ]
+    rag.upsert_cases(batch)
+    return list(dict.fromkeys(c["case_id"] for c in cases))
@@ -0,0 +1,185 @@
+"""Lexical (BM25) index over RAG case documents.
+
+Complements the vector index: embeddings blur similar-sounding product names
+(Starlink vs Herelink), while exact term overlap does not. CaseSearchAgent
+fuses both rankings with reciprocal-rank fusion (RRF).
+
+Indexed fields are the ones that make up the RAG document: title, problem,
+solution and tags. Only cases that are in SCRAG/RCRAG (in_rag = 1) are
+indexed, so both rankings cover the same corpus.
+
+Indexes are built lazily per group set (a group or a union) from MySQL and
+kept in a process-wide LRU of _MAX_INDEXES entries. An index is rebuilt when
+the latest case_changes version of its own groups moves (see
+get_case_change_version_for_groups), so activity in other groups does not
+invalidate it and a query normally costs one cheap MAX(version) lookup plus
+an in-memory scan.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+log = logging.getLogger(__name__)
+
+# Okapi BM25 parameters (standard defaults)
+_K1 = 1.5
+_B = 0.75
+# Tokens are truncated to this many chars — a crude stemmer that folds
+# Ukrainian inflections (підключення/підключенні) without a morphology library.
+_STEM_LEN = 6
+
+_TOKEN_RE = re.compile(r"[a-zа-яіїєґ0-9]{2,}")
+
+_STOP = {
+    "будь", "ласка", "якщо", "хтось", "використовує", "разом", "досвідом",
+    "поділіться", "підкажіть", "скажіть", "можливо", "проблема", "питання",
+    "рішення", "tags", "solved",
+    "the", "and", "with", "for", "how", "can", "does", "what", "any", "is", "to", "in", "on",
+    "при", "для", "або", "які", "яка", "який", "також", "може", "через",
+    "тому", "після", "перед", "між", "іншого", "інше", "інших", "інші",
+    "як", "що", "це", "не", "на", "та", "чи", "по", "до", "від", "за", "так",
+}
+
+# Multi-char Ukrainian→Latin mappings for cross-script entity matching
+_UK_DIGRAPHS = [
+    ("щ", "shch"), ("ш", "sh"), ("ч", "ch"), ("ц", "ts"),
+    ("ю", "yu"), ("я", "ya"), ("є", "ye"), ("ї", "yi"),
+    ("ж", "zh"), ("х", "kh"),
+]
+_UK_SINGLE = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g",
+    "д": "d", "е": "e", "з": "z", "и": "y", "і": "i",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "ь": "",
+}
+_CYRILLIC_RE = re.compile(r"[а-яіїєґ]")
+
+
+def _translit_uk_to_lat(text: str) -> str:
+    """Rough Ukrainian→Latin transliteration for entity matching."""
+    result = text
+    for uk, lat in _UK_DIGRAPHS:
+        result = result.replace(uk, lat)
+    return "".join(_UK_SINGLE.get(ch, ch) for ch in result)
+
+
+def _translit_variants(token: str) -> list[str]:
+    """Latin forms of a Ukrainian token (х → kh or h: Herelink, not Kherelink)."""
+    base = _translit_uk_to_lat(token)
+    variants = [base]
+    if "kh" in base:
+        variants.append(base.replace("kh", "h"))
+    return variants
+
+
+def _word_forms(text: str) -> List[List[str]]:
+    """Per word: its stem plus stems of its Latin forms (Cyrillic words only)."""
+    words: List[List[str]] = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok in _STOP:
+            continue
+        forms = [tok[:_STEM_LEN]]
+        if _CYRILLIC_RE.search(tok):
+            for v in _translit_variants(tok):
+                if len(v) >= 4 and v[:_STEM_LEN] not in forms:
+                    forms.append(v[:_STEM_LEN])
+        words.append(forms)
+    return words
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, drop stop words, stem by truncation, add Latin forms of Cyrillic words."""
+    return [f for forms in _word_forms(text) for f in forms]
+
+
+@dataclass
+class BM25Index:
+    """Okapi BM25 over a fixed set of case documents."""
+    case_ids: List[str] = field(default_factory=list)
+    cases: List[Dict[str, Any]] = field(default_factory=list)
+    _tfs: List[Counter] = field(default_factory=list)
+    _lens: List[int] = field(default_factory=list)
+    _df: Counter = field(default_factory=Counter)
+    _avgdl: float = 0.0
+
+    @classmethod
+    def build(cls, cases: List[Dict[str, Any]]) -> "BM25Index":
+        idx = cls()
+        for c in cases:
+            text = " ".join([
+                c.get("problem_title") or "",
+                c.get("problem_summary") or "",
+                c.get("solution_summary") or "",
+                " ".join(c.get("tags") or []),
+            ])
+            tf = Counter(tokenize(text))
+            idx.case_ids.append(c["case_id"])
+            idx.cases.append(c)
+            idx._tfs.append(tf)
+            idx._lens.append(sum(tf.values()))
+            idx._df.update(tf.keys())
+        idx._avgdl = (sum(idx._lens) / len(idx._lens)) if idx._lens else 0.0
+        return idx
+
+    def search(self, query: str, k: int) -> List[Tuple[Dict[str, Any], float, float]]:
+        """Return up to k (case, bm25_score, term_coverage) with score > 0, best first.
+
+        term_coverage is the fraction of distinct query words the case contains
+        in any form (a Cyrillic word matching via its transliteration counts).
+        """
+        q_words = list({tuple(forms): None for forms in _word_forms(query)})
+        q_terms = list(dict.fromkeys(f for forms in q_words for f in forms))
+        if not q_terms or not self.case_ids:
+            return []
+        n = len(self.case_ids)
+        idf = {t: math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5)) for t in q_terms if self._df[t]}
+        if not idf:
+            return []
+        scored: List[Tuple[Dict[str, Any], float, float]] = []
+        for i, tf in enumerate(self._tfs):
+            score = 0.0
+            norm = _K1 * (1 - _B + _B * self._lens[i] / (self._avgdl or 1.0))
+            for t, w in idf.items():
+                f = tf.get(t)
+                if f:
+                    score += w * f * (_K1 + 1) / (f + norm)
+            if score > 0:
+                hit = sum(1 for forms in q_words if any(tf.get(f) for f in forms))
+                scored.append((self.cases[i], score, hit / len(q_words)))
+        scored.sort(key=lambda x: -x[1])
+        return scored[:k]
+
+
+# One entry per distinct group set queried (groups and unions)
+_MAX_INDEXES = 256
+
+_indexes: "OrderedDict[Tuple[str, ...], Tuple[int, BM25Index]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(db: Any, group_ids: List[str], version: int) -> BM25Index:
+    """Cached BM25 index for a group set, rebuilt when the set's case-change version moves."""
+    key = tuple(sorted(set(group_ids)))
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is not None:
+            _indexes.move_to_end(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    from app.db import get_indexed_cases_for_groups
+    idx = BM25Index.build(get_indexed_cases_for_groups(db, list(key)))
+    with _indexes_lock:
+        _indexes[key] = (version, idx)
+        _indexes.move_to_end(key)
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+    log.info("Lexical index built: groups=%d cases=%d version=%d", len(key), len(idx.case_ids), version)
+    return idx
@@ -0,0 +1,337 @@
+"""In-process vector index — drop-in alternative to the Chroma HTTP backend.
+
+Per-group case counts are small (hundreds to low thousands), so an exact
+NumPy scan over one group's vectors is faster than an HTTP round-trip to
+Chroma. Each collection keeps one partition per group_id in memory and
+persists it to its own file under RAG_LOCAL_DIR, so a query for a group (or
+a union of groups) only touches those partitions.
+
+Distances match Chroma's default space (squared L2), so existing thresholds
+such as SCRAG_DISTANCE_THRESHOLD keep their meaning. MySQL stays the source
+of truth: SYNC_RAG removes stale ids and re-indexes cases flagged in_rag that
+are missing here (e.g. after the backend is switched or the volume is lost).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+_FILE_SUFFIX = ".npz"
+
+
+@dataclass
+class _Partition:
+    """All vectors of one collection for one group_id."""
+    group_id: str
+    ids: List[str] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    vectors: np.ndarray | None = None  # shape (n, dim), float32
+
+    def index_of(self, case_id: str) -> int:
+        try:
+            return self.ids.index(case_id)
+        except ValueError:
+            return -1
+
+    def remove_where(self, keep: np.ndarray) -> None:
+        """Drop every row whose keep mask is False, in one pass."""
+        self.ids = [x for x, k in zip(self.ids, keep) if k]
+        self.documents = [x for x, k in zip(self.documents, keep) if k]
+        self.metadatas = [x for x, k in zip(self.metadatas, keep) if k]
+        if self.vectors is not None:
+            self.vectors = self.vectors[keep] if self.ids else None
+
+
+class LocalRag:
+    """One collection (SCRAG or RCRAG) stored in-process and on local disk.
+
+    Thread-safe. Use create_local_collection() rather than constructing this
+    directly so every component in the process shares the same instance.
+    """
+
+    def __init__(self, collection_name: str, root_dir: str):
+        self.collection_name = collection_name
+        self._dir = os.path.join(root_dir, collection_name)
+        self._lock = threading.RLock()
+        self._partitions: Dict[str, _Partition] = {}
+        self._case_group: Dict[str, str] = {}  # case_id -> group_id
+        os.makedirs(self._dir, exist_ok=True)
+        self._load()
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+
+    def _path_for(self, group_id: str) -> str:
+        name = hashlib.sha256(group_id.encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self._dir, name + _FILE_SUFFIX)
+
+    def _load(self) -> None:
+        loaded = 0
+        for fname in sorted(os.listdir(self._dir)):
+            if not fname.endswith(_FILE_SUFFIX):
+                continue
+            path = os.path.join(self._dir, fname)
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    meta = json.loads(bytes(data["meta"]).decode("utf-8"))
+                    vectors = np.asarray(data["vectors"], dtype=np.float32)
+            except Exception:
+                log.exception("LocalRag %s: failed to load partition %s (skipping)", self.collection_name, fname)
+                continue
+            part = _Partition(
+                group_id=meta["group_id"],
+                ids=list(meta["ids"]),
+                documents=list(meta["documents"]),
+                metadatas=list(meta["metadatas"]),
+                vectors=vectors if len(meta["ids"]) else None,
+            )
+            self._partitions[part.group_id] = part
+            for cid in part.ids:
+                self._case_group[cid] = part.group_id
+            loaded += len(part.ids)
+        log.info("LocalRag %s: loaded %d cases in %d groups from %s",
+                 self.collection_name, loaded, len(self._partitions), self._dir)
+
+    def _persist(self, part: _Partition) -> None:
+        path = self._path_for(part.group_id)
+        if not part.ids:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return
+        meta = json.dumps(
+            {
+                "group_id": part.group_id,
+                "ids": part.ids,
+                "documents": part.documents,
+                "metadatas": part.metadatas,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, vectors=part.vectors, meta=np.frombuffer(meta, dtype=np.uint8))
+        os.replace(tmp, path)
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _remove_cases(self, case_ids: Iterable[str]) -> Dict[str, _Partition]:
+        """Remove cases from memory, one mask per partition. Returns touched partitions."""
+        by_group: Dict[str, set[str]] = {}
+        for cid in case_ids:
+            gid = self._case_group.pop(cid, None)
+            if gid is not None:
+                by_group.setdefault(gid, set()).add(cid)
+        touched: Dict[str, _Partition] = {}
+        for gid, cids in by_group.items():
+            part = self._partitions.get(gid)
+            if part is None:
+                continue
+            part.remove_where(np.array([cid not in cids for cid in part.ids], dtype=bool))
+            if not part.ids:
+                del self._partitions[gid]
+            touched[gid] = part
+        return touched
+
+    def _query(
+        self,
+        parts: List[_Partition],
+        embedding: list[float],
+        k: int,
+        status: str | None,
+        include_documents: bool = True,
+    ) -> List[Dict[str, Any]]:
+        q = np.asarray(embedding, dtype=np.float32)
+        candidates: List[tuple[float, _Partition, int]] = []
+        for part in parts:
+            if part.vectors is None or not part.ids:
+                continue
+            if part.vectors.shape[1] != q.shape[0]:
+                log.warning("LocalRag %s: dimension mismatch for group %s (%d != %d), skipping",
+                            self.collection_name, part.group_id[:20], part.vectors.shape[1], q.shape[0])
+                continue
+            diff = part.vectors - q
+            dists = np.einsum("ij,ij->i", diff, diff)
+            for i, d in enumerate(dists):
+                if status is not None and part.metadatas[i].get("status") != status:
+                    continue
+                candidates.append((float(d), part, i))
+        candidates.sort(key=lambda c: c[0])
+        return [
+            {
+                "case_id": part.ids[i],
+                "document": part.documents[i] if include_documents else "",
+                "metadata": dict(part.metadatas[i]),
+                "distance": d,
+            }
+            for d, part, i in candidates[:k]
+        ]
+
+    def _add(
+        self,
+        case_ids: List[str],
+        documents: List[str],
+        embeddings: List[list[float]],
+        metadatas: List[Dict[str, Any]],
+    ) -> Dict[str, _Partition]:
+        """Insert/replace cases in memory. Returns partitions that changed, by group_id.
+
+        Vectors are stacked once per partition, so re-indexing a whole group
+        costs one copy of its matrix rather than one per case.
+        """
+        latest: Dict[str, tuple[str, np.ndarray, Dict[str, Any]]] = {}
+        for cid, doc, emb, meta in zip(case_ids, documents, embeddings, metadatas):
+            latest.pop(cid, None)  # last write wins
+            latest[cid] = (doc, np.asarray(emb, dtype=np.float32).reshape(-1), meta)
+
+        new_rows: Dict[str, List[str]] = {}
+        for cid, (_doc, _vec, meta) in latest.items():
+            new_rows.setdefault(str(meta.get("group_id") or ""), []).append(cid)
+        for gid, cids in new_rows.items():
+            part = self._partitions.get(gid)
+            dims = {latest[cid][1].shape[0] for cid in cids}
+            if part is not None and part.vectors is not None:
+                dims.add(part.vectors.shape[1])
+            if len(dims) > 1:
+                raise ValueError(
+                    f"Embedding dimensions {sorted(dims)} do not match in collection "
+                    f"{self.collection_name} (group {gid[:20]})"
+                )
+
+        touched = self._remove_cases(latest)
+        for gid, cids in new_rows.items():
+            part = self._partitions.get(gid)
+            if part is None:
+                part = _Partition(group_id=gid)
+                self._partitions[gid] = part
+            vecs = [latest[cid][1] for cid in cids]
+            if part.vectors is not None:
+                vecs.insert(0, part.vectors)
+            part.vectors = np.vstack(vecs)
+            for cid in cids:
+                doc, _vec, meta = latest[cid]
+                part.ids.append(cid)
+                part.documents.append(doc)
+                part.metadatas.append(dict(meta))
+                self._case_group[cid] = gid
+            touched[gid] = part
+        return touched
+
+    # ── RagBackend API ───────────────────────────────────────────────────────
+
+    def upsert_case(self, *, case_id: str, document: str, embedding: list[float], metadata: Dict[str, Any]) -> None:
+        with self._lock:
+            for part in self._add([case_id], [document], [embedding], [metadata]).values():
+                self._persist(part)
+
+    def upsert_cases(
+        self,
+        *,
+        case_ids: List[str],
+        documents: List[str],
+        embeddings: List[list[float]],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Bulk upsert; each touched partition is written to disk once."""
+        with self._lock:
+            for part in self._add(case_ids, documents, embeddings, metadatas).values():
+                self._persist(part)
+
+    def retrieve_cases(
+        self,
+        *,
+        group_id: str,
+        group_ids: list[str] | None = None,
+        embedding: list[float],
+        k: int,
+        status: str | None = "solved",
+        include_documents: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Exact nearest-neighbour search within the given group(s).
+
+        Same semantics as ChromaRag.retrieve_cases: group_ids (union) overrides
+        group_id; status=None returns all statuses.
+        """
+        ids_to_search = group_ids if group_ids else [group_id]
+        with self._lock:
+            parts = [self._partitions[g] for g in ids_to_search if g in self._partitions]
+            return self._query(parts, embedding, k, status, include_documents)
+
+    def get_documents(self, case_ids: List[str]) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        with self._lock:
+            for cid in case_ids:
+                part = self._partitions.get(self._case_group.get(cid, ""))
+                if part is None:
+                    continue
+                i = part.index_of(cid)
+                if i >= 0:
+                    out[cid] = part.documents[i]
+        return out
+
+    def search_all_cases(self, *, embedding: list[float], k: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._query(list(self._partitions.values()), embedding, k, None)
+
+    def delete_cases(self, case_ids: List[str]) -> int:
+        """Delete cases by ID. Returns number requested (mirrors ChromaRag)."""
+        if not case_ids:
+            return 0
+        with self._lock:
+            for part in self._remove_cases(case_ids).values():
+                self._persist(part)
+        return len(case_ids)
+
+    def delete_cases_by_group(self, group_id: str) -> int:
+        with self._lock:
+            part = self._partitions.pop(group_id, None)
+            if part is None:
+                return 0
+            for cid in part.ids:
+                self._case_group.pop(cid, None)
+            n = len(part.ids)
+            part.ids.clear()
+            self._persist(part)
+        log.info("delete_cases_by_group: removed %d docs for group %s", n, group_id[:20])
+        return n
+
+    def list_all_case_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._case_group)
+
+    def wipe_all_cases(self) -> int:
+        with self._lock:
+            n = len(self._case_group)
+            for part in list(self._partitions.values()):
+                part.ids.clear()
+                self._persist(part)
+            self._partitions.clear()
+            self._case_group.clear()
+        log.info("RAG wipe: deleted %d documents", n)
+        return n
+
+
+# One LocalRag per collection directory, shared process-wide: the main app,
+# worker and UltimateAgent must all see the same in-memory index.
+_instances: Dict[str, LocalRag] = {}
+_instances_lock = threading.Lock()
+
+
+def create_local_collection(collection_name: str, root_dir: str) -> LocalRag:
+    key = os.path.abspath(os.path.join(root_dir, collection_name))
+    with _instances_lock:
+        inst = _instances.get(key)
+        if inst is None:
+            inst = LocalRag(collection_name=collection_name, root_dir=root_dir)
+            _instances[key] = inst
+        return inst
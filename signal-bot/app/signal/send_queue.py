@@ -0,0 +1,146 @@
+"""Outbound send queue shared by the Signal adapters.
+
+Each send is a job on a per-recipient lane (group id or user id). Lanes run in
+parallel on a fixed pool of SIGNAL_SEND_WORKERS threads, but jobs within one
+lane run strictly in submission order, so a slow attachment to one chat never
+delays messages to another while a chat's own messages never reorder.
+
+Jobs that fail with TransientSendError (the message certainly did not go out:
+connection refused, rate limit, transport down) are retried in place with
+exponential backoff up to SIGNAL_SEND_MAX_ATTEMPTS; any other error is
+returned to the caller untouched. Callers block on their own job only.
+"""
+from __future__ import annotations
+
+import collections
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_LATENCY_WINDOW = 512
+_RETRY_BASE_DELAY = 1.0
+_RETRY_MAX_DELAY = 30.0
+
+
+class TransientSendError(RuntimeError):
+    """The send did not reach Signal and is safe to retry."""
+
+
+class _Job:
+    __slots__ = ("fn", "future", "retry", "enqueued_at")
+
+    def __init__(self, fn: Callable[[], object], retry: bool) -> None:
+        self.fn = fn
+        self.future: Future = Future()
+        self.retry = retry
+        self.enqueued_at = time.monotonic()
+
+
+def _pct(samples: "collections.deque[float]", p: float) -> float | None:
+    if not samples:
+        return None
+    s = sorted(samples)
+    return round(s[min(len(s) - 1, int(len(s) * p))] * 1000, 1)
+
+
+class SendQueue:
+    def __init__(self, name: str, *, workers: int, max_attempts: int) -> None:
+        self._name = name
+        self._max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._lanes: Dict[str, Deque[_Job]] = {}
+        self._ready: "queue.Queue[str]" = queue.Queue()
+        self._in_flight = 0
+        self._counters = {"sent": 0, "failed": 0, "retried": 0}
+        self._latency: Deque[float] = collections.deque(maxlen=_LATENCY_WINDOW)
+        self._wait: Deque[float] = collections.deque(maxlen=_LATENCY_WINDOW)
+        for i in range(max(1, workers)):
+            threading.Thread(target=self._work_loop, name=f"{name}-send-{i}", daemon=True).start()
+
+    def submit(self, recipient: str, fn: Callable[[], T], *, retry: bool = True) -> "Future[T]":
+        job = _Job(fn, retry)
+        with self._lock:
+            lane = self._lanes.get(recipient)
+            if lane is None:
+                # New lane: nobody is working on this recipient, make it runnable
+                self._lanes[recipient] = collections.deque([job])
+                self._ready.put(recipient)
+            else:
+                lane.append(job)
+        return job.future
+
+    def call(self, recipient: str, fn: Callable[[], T], *, retry: bool = True) -> T:
+        """Submit and wait for the result (re-raises the job's exception)."""
+        return self.submit(recipient, fn, retry=retry).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            depth = sum(len(lane) for lane in self._lanes.values()) - self._in_flight
+            return {
+                **self._counters,
+                "queue_depth": depth,
+                "in_flight": self._in_flight,
+                "active_recipients": len(self._lanes),
+                "send_p50_ms": _pct(self._latency, 0.5),
+                "send_p95_ms": _pct(self._latency, 0.95),
+                "wait_p95_ms": _pct(self._wait, 0.95),
+            }
+
+    def _work_loop(self) -> None:
+        while True:
+            recipient = self._ready.get()
+            with self._lock:
+                job = self._lanes[recipient][0]
+                self._in_flight += 1
+            self._wait.append(time.monotonic() - job.enqueued_at)
+            self._run(recipient, job)
+            with self._lock:
+                self._in_flight -= 1
+                lane = self._lanes[recipient]
+                lane.popleft()
+                if lane:
+                    self._ready.put(recipient)
+                else:
+                    del self._lanes[recipient]
+
+    def _run(self, recipient: str, job: _Job) -> None:
+        attempt = 0
+        while True:
+            attempt += 1
+            t0 = time.monotonic()
+            try:
+                result = job.fn()
+            except TransientSendError as e:
+                if job.retry and attempt < self._max_attempts:
+                    delay = min(_RETRY_BASE_DELAY * 2 ** (attempt - 1), _RETRY_MAX_DELAY)
+                    log.warning(
+                        "%s send to %s failed (attempt %d/%d): %s — retrying in %.0fs",
+                        self._name, recipient[:20], attempt, self._max_attempts, e, delay,
+                    )
+                    with self._lock:
+                        self._counters["retried"] += 1
+                    time.sleep(delay)
+                    continue
+                self._finish(job, t0, exc=e)
+                return
+            except BaseException as e:
+                self._finish(job, t0, exc=e)
+                return
+            self._finish(job, t0, result=result)
+            return
+
+    def _finish(self, job: _Job, t0: float, *, result: object = None, exc: BaseException | None = None) -> None:
+        self._latency.append(time.monotonic() - t0)
+        with self._lock:
+            self._counters["failed" if exc is not None else "sent"] += 1
+        if exc is not None:
+            job.future.set_exception(exc)
+        else:
+            job.future.set_result(result)
@@ -14,6 +14,8 @@ from typing import Callable, Optional
 from pydantic import BaseModel, Field
 
 from app.config import Settings
+from app.signal.send_queue import SendQueue, TransientSendError
+from app.signal.signal_cli_rpc import SignalCliRpc, SignalRpcError
 
 log = logging.getLogger(__name__)
 
@@ -204,8 +206,33 @@ class GroupInfo(BaseModel):
 
 @dataclass(frozen=True)
 class SignalCliAdapter:
+    """signal-cli adapter.
+
+    SIGNAL_CLI_MODE=subprocess runs one signal-cli JVM per command (serialized
+    by _lock). SIGNAL_CLI_MODE=daemon keeps a single `jsonRpc` process and
+    multiplexes sends over it while receives stream in as events.
+
+    All sends go through a per-recipient SendQueue; with the daemon, sends to
+    different recipients actually run in parallel.
+    """
     settings: Settings
     _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+    _rpc: SignalCliRpc | None = field(default=None, init=False, repr=False)
+    _sendq: SendQueue = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.settings.signal_cli_mode == "daemon":
+            cmd = [self._bin(), "--config", self._config(), "-a", self._user(), "jsonRpc"]
+            # Without a listener nothing drains events(); keep messages on the server
+            object.__setattr__(self, "_rpc", SignalCliRpc(cmd, receive=self.settings.signal_listener_enabled))
+        object.__setattr__(self, "_sendq", SendQueue(
+            "signal-cli",
+            workers=self.settings.signal_send_workers,
+            max_attempts=self.settings.signal_send_max_attempts,
+        ))
+
+    def send_stats(self) -> dict:
+        return self._sendq.stats()
 
     def _bin(self) -> str:
         return self.settings.signal_cli
@@ -224,6 +251,26 @@ class SignalCliAdapter:
         if shutil.which(self._bin()) is None:
             raise RuntimeError(f"signal-cli binary not found: {self._bin()}")
 
+    def _rpc_send(self, params: dict) -> list[dict]:
+        """Send via the JSON-RPC process. Returns per-recipient results."""
+        return (self._rpc_call_send(params) or {}).get("results") or []
+
+    def _rpc_call_send(self, params: dict) -> dict | None:
+        try:
+            return self._rpc.call("send", params)
+        except OSError as e:
+            # The request could not be written: it never reached signal-cli
+            raise TransientSendError(f"signal-cli JSON-RPC unavailable: {e}") from e
+
+    @staticmethod
+    def _check_send_rc(proc: subprocess.CompletedProcess[str], what: str) -> None:
+        # signal-cli exit codes: 3 = network/IO failure, 5 = rate limited;
+        # in both cases nothing was sent
+        if proc.returncode in (3, 5):
+            raise TransientSendError(f"signal-cli {what} failed (exit {proc.returncode})")
+        if proc.returncode != 0:
+            raise RuntimeError(f"signal-cli {what} failed (exit {proc.returncode})")
+
     def resolve_phone_to_uuid(self, phone_numbers: list[str]) -> dict[str, str]:
         """Resolve phone numbers to UUIDs via signal-cli getUserStatus.
 
@@ -231,6 +278,13 @@ class SignalCliAdapter:
         """
         if not phone_numbers:
             return {}
+        if self._rpc is not None:
+            try:
+                entries = self._rpc.call("getUserStatus", {"recipient": phone_numbers}) or []
+                return {e["number"]: e["uuid"] for e in entries if e.get("number") and e.get("uuid")}
+            except Exception as exc:
+                log.warning("Failed to resolve phone→UUID: %s", exc)
+                return {}
         cmd = [
             self._bin(), "--output", "json",
             "--config", self._config(),
@@ -270,6 +324,25 @@ class SignalCliAdapter:
     ) -> int | None:
         """Send text message to a group with optional quote/reply and mentions."""
         self.assert_available()
+        return self._sendq.call(group_id, lambda: self._send_group_text_now(
+            group_id=group_id,
+            text=text,
+            quote_timestamp=quote_timestamp,
+            quote_author=quote_author,
+            quote_message=quote_message,
+            mention_recipients=mention_recipients,
+        ))
+
+    def _send_group_text_now(
+        self,
+        *,
+        group_id: str,
+        text: str,
+        quote_timestamp: int | None,
+        quote_author: str | None,
+        quote_message: str | None,
+        mention_recipients: list[str] | None,
+    ) -> int | None:
         
         # Handle mentions manually by appending placeholders and calculating offsets
         # signal-cli format: start:length:recipient
@@ -310,6 +383,21 @@ class SignalCliAdapter:
                     final_text += "@"
                     mentions_arg.append(f"{start}:1:{recipient}")
                 
+        if self._rpc is not None:
+            params: dict = {"groupId": group_id, "message": final_text}
+            if mentions_arg:
+                params["mention"] = mentions_arg
+            if quote_timestamp is not None:
+                params["quoteTimestamp"] = int(quote_timestamp)
+            if quote_author:
+                params["quoteAuthor"] = str(quote_author)
+            if quote_message:
+                params["quoteMessage"] = str(quote_message)
+            log.info("signal-cli rpc send group_id=%s bytes=%s mentions=%s", group_id, len(final_text.encode("utf-8")), len(mentions_arg))
+            result = self._rpc_call_send(params) or {}
+            ts = result.get("timestamp")
+            return int(ts) if ts else None
+
         cmd = [
             self._bin(), "--config", self._config(), "-u", self._user(),
             "send", "-g", group_id, "-m", final_text,
@@ -333,8 +421,7 @@ class SignalCliAdapter:
             log.info("signal-cli stdout: %s", proc.stdout.strip())
         if proc.stderr:
             log.info("signal-cli stderr: %s", proc.stderr.strip())
-        if proc.returncode != 0:
-            raise RuntimeError(f"signal-cli send failed (exit {proc.returncode})")
+        self._check_send_rc(proc, "send")
 
         # signal-cli prints the sent message timestamp to stdout (13-digit ms epoch).
         # We parse it so callers can track bot-reply-to-user-message mappings.
@@ -351,6 +438,23 @@ class SignalCliAdapter:
         Returns True if sent successfully, False if user appears to have blocked/removed us.
         """
         self.assert_available()
+        return self._sendq.call(recipient, lambda: self._send_direct_text_now(recipient=recipient, text=text))
+
+    def _send_direct_text_now(self, *, recipient: str, text: str) -> bool:
+        if self._rpc is not None:
+            log.info("signal-cli rpc send direct recipient=%s bytes=%s", recipient, len(text.encode("utf-8")))
+            try:
+                results = self._rpc_send({"recipient": [recipient], "message": text})
+            except SignalRpcError as e:
+                msg = str(e).lower()
+                if "unregistered" in msg or "not found" in msg or "unknown" in msg:
+                    log.warning("User %s appears to have blocked/removed us", recipient)
+                    return False
+                raise
+            if any("UNREGISTERED" in str(r.get("type", "")) for r in results):
+                log.warning("User %s appears to have blocked/removed us", recipient)
+                return False
+            return True
         cmd = [
             self._bin(), "--config", self._config(), "-u", self._user(),
             "send", "-m", text, recipient,
@@ -366,14 +470,19 @@ class SignalCliAdapter:
             if "unregistered" in stderr_lower or "not found" in stderr_lower or "unknown" in stderr_lower:
                 log.warning("User %s appears to have blocked/removed us", recipient)
                 return False
-        if proc.returncode != 0:
-            raise RuntimeError(f"signal-cli send failed (exit {proc.returncode})")
+        self._check_send_rc(proc, "send")
         return True
 
     def send_direct_image(self, *, recipient: str, image_path: str, caption: str = "", retries: int = 3, retry_delay: float = 5.0) -> None:
         """Send image to a user (1:1 chat) with optional caption. Retries on transient connection failures."""
-        import time
         self.assert_available()
+        # The method retries on its own; the queue only orders and parallelizes it
+        self._sendq.call(recipient, lambda: self._send_direct_image_now(
+            recipient=recipient, image_path=image_path, caption=caption, retries=retries, retry_delay=retry_delay,
+        ), retry=False)
+
+    def _send_direct_image_now(self, *, recipient: str, image_path: str, caption: str, retries: int, retry_delay: float) -> None:
+        import time
         # Note: recipient must come before -a, otherwise -a consumes it as an attachment path
         cmd = [
             self._bin(), "--config", self._config(), "-u", self._user(),
@@ -382,8 +491,21 @@ class SignalCliAdapter:
         if caption:
             cmd.extend(["-m", caption])
         last_err = None
+        rpc_params: dict = {"recipient": [recipient], "attachment": [image_path]}
+        if caption:
+            rpc_params["message"] = caption
         for attempt in range(1, retries + 1):
             log.info("signal-cli send image recipient=%s path=%s (attempt %d/%d)", recipient, image_path, attempt, retries)
+            if self._rpc is not None:
+                try:
+                    self._rpc_send(rpc_params)
+                    return
+                except Exception as e:
+                    last_err = e
+                    if attempt < retries:
+                        log.warning("send_direct_image failed (%s), retrying in %.0fs...", e, retry_delay)
+                        time.sleep(retry_delay)
+                    continue
             proc = self._run(cmd)
             if proc.stdout:
                 log.info("signal-cli stdout: %s", proc.stdout.strip())
@@ -407,8 +529,13 @@ class SignalCliAdapter:
         retry_delay: float = 5.0,
     ) -> None:
         """Send a file attachment to a group chat. Works with any file type."""
-        import time
         self.assert_available()
+        self._sendq.call(group_id, lambda: self._send_group_attachment_now(
+            group_id=group_id, file_path=file_path, caption=caption, retries=retries, retry_delay=retry_delay,
+        ), retry=False)
+
+    def _send_group_attachment_now(self, *, group_id: str, file_path: str, caption: str, retries: int, retry_delay: float) -> None:
+        import time
         cmd = [
             self._bin(), "--config", self._config(), "-u", self._user(),
             "send", "-g", group_id, "-a", file_path,
@@ -416,8 +543,21 @@ class SignalCliAdapter:
         if caption:
             cmd.extend(["-m", caption])
         last_err = None
+        rpc_params: dict = {"groupId": group_id, "attachment": [file_path]}
+        if caption:
+            rpc_params["message"] = caption
         for attempt in range(1, retries + 1):
             log.info("signal-cli send group attachment group=%s path=%s (attempt %d/%d)", group_id[:20], file_path, attempt, retries)
+            if self._rpc is not None:
+                try:
+                    self._rpc_send(rpc_params)
+                    return
+                except Exception as e:
+                    last_err = e
+                    if attempt < retries:
+                        log.warning("send_group_attachment failed (%s), retrying in %.0fs...", e, retry_delay)
+                        time.sleep(retry_delay)
+                    continue
             proc = self._run(cmd)
             if proc.stdout:
                 log.info("signal-cli stdout: %s", proc.stdout.strip())
@@ -565,25 +705,32 @@ class SignalCliAdapter:
         Returns None when the command fails.
         """
         self.assert_available()
-        cmd = [
-            self._bin(), "--output", "json", "--config", self._config(), "-u", self._user(),
-            "listContacts",
-        ]
-        proc = self._run(cmd)
-        if proc.returncode != 0:
-            log.warning("signal-cli listContacts failed: %s", (proc.stderr or "").strip())
-            return None
+        contacts: set[str] = set()
+        if self._rpc is not None:
+            try:
+                data = self._rpc.call("listContacts")
+            except Exception as e:
+                log.warning("signal-cli listContacts failed: %s", e)
+                return None
+        else:
+            cmd = [
+                self._bin(), "--output", "json", "--config", self._config(), "-u", self._user(),
+                "listContacts",
+            ]
+            proc = self._run(cmd)
+            if proc.returncode != 0:
+                log.warning("signal-cli listContacts failed: %s", (proc.stderr or "").strip())
+                return None
 
-        raw = (proc.stdout or "").strip()
-        if not raw:
-            return set()
+            raw = (proc.stdout or "").strip()
+            if not raw:
+                return set()
 
-        contacts: set[str] = set()
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            log.warning("Failed to parse listContacts output as JSON")
-            return None
+            try:
+                data = json.loads(raw)
+            except json.JSONDecodeError:
+                log.warning("Failed to parse listContacts output as JSON")
+                return None
 
         items = data if isinstance(data, list) else data.get("contacts", []) if isinstance(data, dict) else []
         if not isinstance(items, list):
@@ -609,19 +756,28 @@ class SignalCliAdapter:
         distinguish a genuine empty-group state from a transient failure.
         """
         self.assert_available()
-        cmd = [
-            self._bin(), "--output", "json", "--config", self._config(), "-u", self._user(),
-            "listGroups", "-d",
-        ]
-        proc = self._run(cmd)
-        if proc.returncode != 0:
-            raise RuntimeError(
-                f"signal-cli listGroups failed (rc={proc.returncode}): {proc.stderr}"
-            )
+        if self._rpc is not None:
+            try:
+                rpc_data = self._rpc.call("listGroups", {"detailed": True}) or []
+            except Exception as e:
+                raise RuntimeError(f"signal-cli listGroups failed: {e}") from e
+        else:
+            cmd = [
+                self._bin(), "--output", "json", "--config", self._config(), "-u", self._user(),
+                "listGroups", "-d",
+            ]
+            proc = self._run(cmd)
+            if proc.returncode != 0:
+                raise RuntimeError(
+                    f"signal-cli listGroups failed (rc={proc.returncode}): {proc.stderr}"
+                )
 
         groups = []
         try:
-            data = json.loads(proc.stdout) if proc.stdout.strip() else []
+            if self._rpc is not None:
+                data = rpc_data
+            else:
+                data = json.loads(proc.stdout) if proc.stdout.strip() else []
             if isinstance(data, list):
                 for g in data:
                     if not isinstance(g, dict):
@@ -701,6 +857,75 @@ class SignalCliAdapter:
         log.info("Starting Signal receive loop...")
         self.assert_available()
 
+        def dispatch(obj: dict) -> None:
+            # Detect group metadata updates FIRST (before group message)
+            # Description/name changes come as dataMessage with groupInfo type=UPDATE, empty body.
+            # If we parsed them as group messages first, we'd never reach on_group_update.
+            if on_group_update is not None:
+                updated_group_id = _parse_group_update(obj)
+                if updated_group_id is not None:
+                    try:
+                        on_group_update(updated_group_id)
+                    except Exception:
+                        log.exception("on_group_update handler failed")
+                    return
+
+            # Try parsing as group message
+            group_msg = _parse_group_message(obj)
+            if group_msg is not None:
+                try:
+                    on_group_message(group_msg)
+                except Exception:
+                    log.exception("on_group_message handler failed")
+                return
+
+            # Try parsing as direct message
+            direct_msg = _parse_direct_message(obj)
+            if direct_msg is not None:
+                try:
+                    on_direct_message(direct_msg)
+                except Exception:
+                    log.exception("on_direct_message handler failed")
+                return
+
+            # Try parsing as reaction
+            if on_reaction is not None:
+                reaction = _parse_reaction(obj)
+                if reaction is not None:
+                    try:
+                        on_reaction(reaction)
+                    except Exception:
+                        log.exception("on_reaction handler failed")
+                    return
+
+            # Try parsing as remote delete
+            if on_remote_delete is not None:
+                rd = _parse_remote_delete(obj)
+                if rd is not None:
+                    try:
+                        on_remote_delete(rd)
+                    except Exception:
+                        log.exception("on_remote_delete handler failed")
+                    return
+
+            # Try parsing as contact removed/blocked event
+            if on_contact_removed is not None:
+                removed_contact = _parse_contact_removed(obj)
+                if removed_contact is not None:
+                    try:
+                        on_contact_removed(removed_contact)
+                    except Exception:
+                        log.exception("on_contact_removed handler failed")
+                    return
+
+        if self._rpc is not None:
+            # Envelopes arrive as JSON-RPC "receive" notifications as soon as
+            # signal-cli gets them; no polling, no per-receive JVM.
+            log.info("Signal receive loop: streaming from signal-cli JSON-RPC")
+            for obj in self._rpc.events():
+                dispatch(obj)
+            return
+
         timeout_seconds = 1  # Fast polling for instant response
         cmd = [
             self._bin(), "--output", "json", "--config", self._config(), "-u", self._user(),
@@ -732,66 +957,7 @@ class SignalCliAdapter:
                     continue
 
                 buf = ""
-
-                # Detect group metadata updates FIRST (before group message)
-                # Description/name changes come as dataMessage with groupInfo type=UPDATE, empty body.
-                # If we parsed them as group messages first, we'd never reach on_group_update.
-                if on_group_update is not None:
-                    updated_group_id = _parse_group_update(obj)
-                    if updated_group_id is not None:
-                        try:
-                            on_group_update(updated_group_id)
-                        except Exception:
-                            log.exception("on_group_update handler failed")
-                        continue
-
-                # Try parsing as group message
-                group_msg = _parse_group_message(obj)
-                if group_msg is not None:
-                    try:
-                        on_group_message(group_msg)
-                    except Exception:
-                        log.exception("on_group_message handler failed")
-                    continue
-
-                # Try parsing as direct message
-                direct_msg = _parse_direct_message(obj)
-                if direct_msg is not None:
-                    try:
-                        on_direct_message(direct_msg)
-                    except Exception:
-                        log.exception("on_direct_message handler failed")
-                    continue
-
-                # Try parsing as reaction
-                if on_reaction is not None:
-                    reaction = _parse_reaction(obj)
-                    if reaction is not None:
-                        try:
-                            on_reaction(reaction)
-                        except Exception:
-                            log.exception("on_reaction handler failed")
-                        continue
-
-                # Try parsing as remote delete
-                if on_remote_delete is not None:
-                    rd = _parse_remote_delete(obj)
-                    if rd is not None:
-                        try:
-                            on_remote_delete(rd)
-                        except Exception:
-                            log.exception("on_remote_delete handler failed")
-                        continue
-
-                # Try parsing as contact removed/blocked event
-                if on_contact_removed is not None:
-                    removed_contact = _parse_contact_removed(obj)
-                    if removed_contact is not None:
-                        try:
-                            on_contact_removed(removed_contact)
-                        except Exception:
-                            log.exception("on_contact_removed handler failed")
-                        continue
+                dispatch(obj)
 
             # Normal (timeout) exit: loop again.
             # Small pause to avoid starving other signal-cli commands that need the config lock.
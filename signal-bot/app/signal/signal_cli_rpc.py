@@ -0,0 +1,177 @@
+"""Long-lived signal-cli JSON-RPC process.
+
+`signal-cli -a ACCOUNT jsonRpc` keeps one JVM running and speaks JSON-RPC 2.0
+over stdin/stdout: we write one request per line and read one message per
+line. Messages carrying an "id" answer a request; "receive" notifications
+carry inbound envelopes (same shape as `receive --output json` lines).
+
+Requests are multiplexed: any number of threads may call() concurrently and
+each waits only for its own response. Pending requests are tracked per
+process: if a process exits, only the calls waiting on it fail, and the next
+call (or the event reader) restarts it with backoff.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Iterator
+
+log = logging.getLogger(__name__)
+
+_RESTART_BACKOFF_MAX = 30.0
+# Receive notifications waiting for events(); past this they are dropped
+_EVENTS_MAX = 1000
+
+
+class SignalRpcError(RuntimeError):
+    """signal-cli answered a JSON-RPC request with an error."""
+
+    def __init__(self, code: int | None, message: str, data: Any = None):
+        super().__init__(f"signal-cli RPC error {code}: {message}")
+        self.code = code
+        self.data = data
+
+
+class _Process:
+    """One signal-cli jsonRpc process and the requests waiting on it."""
+
+    def __init__(self, popen: subprocess.Popen) -> None:
+        self.popen = popen
+        self.started = time.monotonic()
+        self.pending: dict[int, Future] = {}
+        self.exited = False  # set (under the client's _pending_lock) once pending has been failed
+
+
+class SignalCliRpc:
+    def __init__(self, cmd: list[str], *, receive: bool = True) -> None:
+        """receive=False starts the process with --receive-mode=manual, for
+        send-only use: nothing consumes events() then, and signal-cli leaves
+        incoming messages on the server instead of streaming them to us."""
+        self._cmd = [*cmd, "--receive-mode=on-start" if receive else "--receive-mode=manual"]
+        self._proc: _Process | None = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._events: "queue.Queue[dict]" = queue.Queue(maxsize=_EVENTS_MAX)
+        self._dropped = 0
+        self._backoff = 1.0
+        self._last_start = 0.0
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Process lifecycle
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def _ensure_running(self) -> _Process:
+        with self._start_lock:
+            if self._proc is not None and self._proc.popen.poll() is None:
+                return self._proc
+            # Back off between restarts so a crash loop does not spin the JVM
+            wait = self._last_start + self._backoff - time.monotonic()
+            if self._proc is not None and wait > 0:
+                time.sleep(wait)
+            log.info("Starting signal-cli JSON-RPC process: %s", " ".join(self._cmd))
+            popen = subprocess.Popen(
+                self._cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+            )
+            proc = self._proc = _Process(popen)
+            self._last_start = proc.started
+            threading.Thread(target=self._read_stdout, args=(proc,), name="signal-rpc-out", daemon=True).start()
+            threading.Thread(target=self._read_stderr, args=(popen,), name="signal-rpc-err", daemon=True).start()
+            return proc
+
+    def _put_event(self, params: dict) -> None:
+        try:
+            self._events.put_nowait(params)
+        except queue.Full:
+            # Never block the reader: responses to call() share this stream
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 100 == 0:
+                log.warning("signal-cli RPC: event queue full, dropped %d receive events", self._dropped)
+
+    def _read_stdout(self, proc: _Process) -> None:
+        for line in proc.popen.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError:
+                log.warning("signal-cli RPC: unparseable line: %s", line[:200])
+                continue
+            if "id" in msg and ("result" in msg or "error" in msg):
+                with self._pending_lock:
+                    fut = proc.pending.pop(msg["id"], None)
+                if fut is None:
+                    continue
+                err = msg.get("error")
+                if err:
+                    fut.set_exception(SignalRpcError(err.get("code"), err.get("message", ""), err.get("data")))
+                else:
+                    fut.set_result(msg.get("result"))
+            elif msg.get("method") == "receive":
+                params = msg.get("params")
+                if isinstance(params, dict):
+                    self._put_event(params)
+        rc = proc.popen.wait()
+        uptime = time.monotonic() - proc.started
+        # A process that stayed up for a while gets a fresh backoff
+        self._backoff = 1.0 if uptime > 60 else min(self._backoff * 2, _RESTART_BACKOFF_MAX)
+        log.warning("signal-cli JSON-RPC process exited (rc=%s, uptime=%.0fs)", rc, uptime)
+        # Fail only this process's requests; a replacement may already be serving others
+        with self._pending_lock:
+            pending, proc.pending = proc.pending, {}
+            proc.exited = True
+        for fut in pending.values():
+            fut.set_exception(RuntimeError(f"signal-cli JSON-RPC process exited (rc={rc})"))
+        # Wake the event consumer so it restarts the process
+        self._put_event({})
+
+    def _read_stderr(self, popen: subprocess.Popen) -> None:
+        for line in popen.stderr:
+            if line.strip():
+                log.info("signal-cli stderr: %s", line.strip())
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # API
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def call(self, method: str, params: dict | None = None, timeout: float = 120.0) -> Any:
+        """Send one request and wait for its result. Raises SignalRpcError on an RPC error."""
+        proc = self._ensure_running()
+        req_id = next(self._ids)
+        fut: Future = Future()
+        with self._pending_lock:
+            if proc.exited:
+                # Nothing was written: an OSError, so senders treat it as retryable
+                raise BrokenPipeError("signal-cli JSON-RPC process exited")
+            proc.pending[req_id] = fut
+        line = json.dumps({"jsonrpc": "2.0", "method": method, "params": params or {}, "id": req_id})
+        try:
+            with self._write_lock:
+                proc.popen.stdin.write(line + "\n")
+                proc.popen.stdin.flush()
+            return fut.result(timeout=timeout)
+        finally:
+            with self._pending_lock:
+                proc.pending.pop(req_id, None)
+
+    def events(self) -> Iterator[dict]:
+        """Yield inbound envelopes ({"envelope": ..., "account": ...}) forever."""
+        while True:
+            self._ensure_running()
+            params = self._events.get()
+            if params:
+                yield params
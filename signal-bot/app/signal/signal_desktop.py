@@ -11,7 +11,6 @@ from __future__ import annotations
 import asyncio
 import hashlib
 import logging
-import threading
 import time
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -20,6 +19,7 @@ from typing import Callable, List, Optional
 import httpx
 
 from app.config import Settings
+from app.signal.send_queue import SendQueue, TransientSendError
 from app.signal.signal_cli import (
     InboundGroupMessage,
     InboundDirectMessage,
@@ -58,6 +58,14 @@ _MIME_TO_EXT: dict = {
 }
 
 
+def _raise_if_transient(e: Exception) -> None:
+    """Re-raise failures where the request never reached Signal as TransientSendError."""
+    if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+        raise TransientSendError(f"Signal Desktop unreachable: {e}") from e
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 503:
+        raise TransientSendError("Signal Desktop DevTools not connected") from e
+
+
 def _ext_for_mime(content_type: str) -> str:
     """Return a file extension for a MIME type, defaulting to .jpg."""
     if content_type:
@@ -75,20 +83,25 @@ class SignalDesktopAdapter:
     This adapter communicates with the signal-desktop service which runs
     Signal Desktop headlessly and provides HTTP endpoints for:
     - Sending messages (via DevTools)
-    - Receiving messages (via SQLite polling)
+    - Receiving messages (long-polling the SQLite DB over one kept-alive connection)
     - Listing groups and conversations
     """
     settings: Settings
     desktop_url: str = ""
     _poll_interval: float = 1.0
     _last_poll_ts: int = 0
-    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+    _sendq: SendQueue = field(default=None, init=False, repr=False)
     
     def __post_init__(self):
         # Use the signal desktop URL from settings or default
         if not self.desktop_url:
             self.desktop_url = getattr(self.settings, 'signal_desktop_url', 'http://signal-desktop-arm64:8001')
         self.desktop_url = self.desktop_url.rstrip('/')
+        self._sendq = SendQueue(
+            "signal-desktop",
+            workers=self.settings.signal_send_workers,
+            max_attempts=self.settings.signal_send_max_attempts,
+        )
     
     def _client(self) -> httpx.Client:
         """Create an HTTP client for the signal-desktop service."""
@@ -143,6 +156,9 @@ class SignalDesktopAdapter:
     # Send methods
     # ─────────────────────────────────────────────────────────────────────────
     
+    def send_stats(self) -> dict:
+        return self._sendq.stats()
+
     def send_group_text(
         self,
         *,
@@ -154,36 +170,43 @@ class SignalDesktopAdapter:
         mention_recipients: List[str] | None = None,
     ) -> int | None:
         """Send text message to a group. Returns sent message timestamp if the API provides it."""
-        with self._lock:
+        payload = {
+            "group_id": group_id,
+            "text": text,
+            "expire_timer": 0,
+        }
+        if quote_timestamp and quote_author:
+            payload["quote_timestamp"] = quote_timestamp
+            payload["quote_author_aci"] = quote_author
+            payload["quote_text"] = quote_message or ""
+
+        def _send() -> int | None:
             try:
                 with self._client() as client:
-                    payload = {
-                        "group_id": group_id,
-                        "text": text,
-                        "expire_timer": 0,
-                    }
-                    if quote_timestamp and quote_author:
-                        payload["quote_timestamp"] = quote_timestamp
-                        payload["quote_author_aci"] = quote_author
-                        payload["quote_text"] = quote_message or ""
                     resp = client.post("/send/group", json=payload)
                     resp.raise_for_status()
                     result = resp.json()
-                    if not result.get("success"):
-                        raise RuntimeError(f"Failed to send group message: {result}")
-                    log.info("Sent message to group %s via Signal Desktop", group_id)
-                    ts = result.get("timestamp") or result.get("ts")
-                    return int(ts) if ts is not None else None
             except Exception as e:
-                log.exception("Failed to send group message via Signal Desktop")
-                raise RuntimeError(f"Signal Desktop send failed: {e}")
-    
+                _raise_if_transient(e)
+                raise
+            if not result.get("success"):
+                raise RuntimeError(f"Failed to send group message: {result}")
+            log.info("Sent message to group %s via Signal Desktop", group_id)
+            ts = result.get("timestamp") or result.get("ts")
+            return int(ts) if ts is not None else None
+
+        try:
+            return self._sendq.call(group_id, _send)
+        except Exception as e:
+            log.exception("Failed to send group message via Signal Desktop")
+            raise RuntimeError(f"Signal Desktop send failed: {e}")
+
     def send_direct_text(self, *, recipient: str, text: str) -> bool:
         """Send text message to a user (1:1 chat).
         
         Returns True if sent successfully, False if user appears to have blocked/removed us.
         """
-        with self._lock:
+        def _send() -> bool:
             try:
                 with self._client() as client:
                     resp = client.post("/send", json={
@@ -193,15 +216,20 @@ class SignalDesktopAdapter:
                     })
                     resp.raise_for_status()
                     result = resp.json()
-                    if result.get("success"):
-                        log.info("Sent direct message to %s via Signal Desktop", recipient)
-                        return True
-                    else:
-                        log.warning("Failed to send direct message: %s", result)
-                        return False
             except Exception as e:
-                log.exception("Failed to send direct message via Signal Desktop")
-                return False
+                _raise_if_transient(e)
+                raise
+            if result.get("success"):
+                log.info("Sent direct message to %s via Signal Desktop", recipient)
+                return True
+            log.warning("Failed to send direct message: %s", result)
+            return False
+
+        try:
+            return self._sendq.call(recipient, _send)
+        except Exception:
+            log.exception("Failed to send direct message via Signal Desktop")
+            return False
     
     def send_direct_image(self, *, recipient: str, image_path: str, caption: str = "", **kwargs) -> None:
         """Send image to a user (1:1 chat) with optional caption.
@@ -225,7 +253,7 @@ class SignalDesktopAdapter:
                 self.send_direct_text(recipient=recipient, text=caption)
             return
 
-        with self._lock:
+        def _send() -> None:
             try:
                 with self._client() as client:
                     resp = client.post("/send/image", json={
@@ -234,10 +262,16 @@ class SignalDesktopAdapter:
                         "caption": caption,
                     })
                     resp.raise_for_status()
-                    log.info("Sent image to %s via Signal Desktop", recipient)
             except Exception as e:
-                log.exception("Failed to send image via Signal Desktop")
-                raise RuntimeError(f"Signal Desktop send image failed: {e}")
+                _raise_if_transient(e)
+                raise
+            log.info("Sent image to %s via Signal Desktop", recipient)
+
+        try:
+            self._sendq.call(recipient, _send)
+        except Exception as e:
+            log.exception("Failed to send image via Signal Desktop")
+            raise RuntimeError(f"Signal Desktop send image failed: {e}")
     
     # ─────────────────────────────────────────────────────────────────────────
     # Admin onboarding messages (with language support)
@@ -459,7 +493,7 @@ class SignalDesktopAdapter:
         return local_paths
 
     # ─────────────────────────────────────────────────────────────────────────
-    # Listen loop (polls Signal Desktop for new messages)
+    # Listen loop (long-polls Signal Desktop for new messages)
     # ─────────────────────────────────────────────────────────────────────────
 
     def listen_forever(
@@ -472,92 +506,110 @@ class SignalDesktopAdapter:
         on_group_update: Callable[[str], None] | None = None,
     ) -> None:
         """
-        Signal receive loop. Polls Signal Desktop for new messages and dispatches:
+        Signal receive loop. Long-polls Signal Desktop for new messages and dispatches:
         - Group messages -> on_group_message
         - Direct (1:1) messages -> on_direct_message
+
+        Each GET /messages?wait=N is held by signal-desktop until a message is
+        saved (or N seconds pass), on one kept-alive connection, so messages
+        arrive with sub-second latency and an idle bot makes no requests in
+        between. Against a signal-desktop without long-poll support, or with
+        SIGNAL_DESKTOP_LONG_POLL_SECONDS=0, it falls back to polling every
+        _poll_interval.
         """
         log.info("Starting Signal Desktop receive loop...")
         
-        # Ensure DevTools is connected
+        # Ensure DevTools is connected (installs the message hook that wakes long-polls)
         if not self.is_devtools_connected():
             log.info("Connecting DevTools...")
             self.connect_devtools()
         
+        wait = self.settings.signal_desktop_long_poll_seconds
+        client: httpx.Client | None = None
         while True:
             try:
-                with self._client() as client:
-                    resp = client.get("/messages", params={
-                        "since_ts": self._last_poll_ts,
-                        "limit": 100,
-                    })
-                    resp.raise_for_status()
-                    data = resp.json()
-                    
-                    messages = data.get("messages", [])
-                    if messages:
-                        log.debug("Received %d messages from Signal Desktop", len(messages))
-                    
-                    for msg in messages:
-                        try:
-                            # Update last poll timestamp
-                            ts = msg.get("timestamp", 0)
-                            if ts > self._last_poll_ts:
-                                self._last_poll_ts = ts
-                            
-                            # Parse message
-                            group_id = msg.get("group_id")
-                            msg_type = msg.get("type", "")
-                            
-                            # Skip outgoing messages
-                            if msg_type == "outgoing":
-                                continue
-                            
-                            image_paths = self._fetch_message_attachments(
-                                client=client,
-                                attachments=msg.get("attachments") or [],
-                                msg_id=str(msg.get("id", "")),
-                            )
+                if client is None:
+                    client = httpx.Client(
+                        base_url=self.desktop_url,
+                        timeout=httpx.Timeout(60, read=wait + 30),
+                    )
+                resp = client.get("/messages", params={
+                    "since_ts": self._last_poll_ts,
+                    "limit": 100,
+                    "wait": wait,
+                })
+                resp.raise_for_status()
+                data = resp.json()
+                
+                messages = data.get("messages", [])
+                if messages:
+                    log.debug("Received %d messages from Signal Desktop", len(messages))
+                
+                for msg in messages:
+                    try:
+                        # Update last poll timestamp
+                        ts = msg.get("timestamp", 0)
+                        if ts > self._last_poll_ts:
+                            self._last_poll_ts = ts
+                        
+                        # Parse message
+                        group_id = msg.get("group_id")
+                        msg_type = msg.get("type", "")
+                        
+                        # Skip outgoing messages
+                        if msg_type == "outgoing":
+                            continue
+                        
+                        image_paths = self._fetch_message_attachments(
+                            client=client,
+                            attachments=msg.get("attachments") or [],
+                            msg_id=str(msg.get("id", "")),
+                        )
 
-                            if group_id:
-                                # Group message
-                                group_msg = InboundGroupMessage(
-                                    message_id=str(msg.get("id", "")),
-                                    group_id=str(group_id),
-                                    sender=str(msg.get("sender", "")),
-                                    ts=int(ts),
-                                    text=str(msg.get("body", "")),
-                                    image_paths=image_paths,
-                                    reply_to_id=None,
-                                )
-                                try:
-                                    on_group_message(group_msg)
-                                except Exception:
-                                    log.exception("on_group_message handler failed")
-                            else:
-                                # Direct message
-                                direct_msg = InboundDirectMessage(
-                                    message_id=str(msg.get("id", "")),
-                                    sender=str(msg.get("sender", "")),
-                                    ts=int(ts),
-                                    text=str(msg.get("body", "")),
-                                    image_paths=image_paths,
-                                )
-                                try:
-                                    on_direct_message(direct_msg)
-                                except Exception:
-                                    log.exception("on_direct_message handler failed")
-                                    
-                        except Exception as e:
-                            log.exception("Failed to process message: %s", msg)
+                        if group_id:
+                            # Group message
+                            group_msg = InboundGroupMessage(
+                                message_id=str(msg.get("id", "")),
+                                group_id=str(group_id),
+                                sender=str(msg.get("sender", "")),
+                                ts=int(ts),
+                                text=str(msg.get("body", "")),
+                                image_paths=image_paths,
+                                reply_to_id=None,
+                            )
+                            try:
+                                on_group_message(group_msg)
+                            except Exception:
+                                log.exception("on_group_message handler failed")
+                        else:
+                            # Direct message
+                            direct_msg = InboundDirectMessage(
+                                message_id=str(msg.get("id", "")),
+                                sender=str(msg.get("sender", "")),
+                                ts=int(ts),
+                                text=str(msg.get("body", "")),
+                                image_paths=image_paths,
+                            )
+                            try:
+                                on_direct_message(direct_msg)
+                            except Exception:
+                                log.exception("on_direct_message handler failed")
+                                
+                    except Exception as e:
+                        log.exception("Failed to process message: %s", msg)
+                
+                # Update last_ts from response
+                if data.get("last_ts"):
+                    self._last_poll_ts = max(self._last_poll_ts, data["last_ts"])
                     
-                    # Update last_ts from response
-                    if data.get("last_ts"):
-                        self._last_poll_ts = max(self._last_poll_ts, data["last_ts"])
-                        
             except Exception as e:
                 log.warning("Signal Desktop poll failed: %s; retrying in 5s", e)
+                if client is not None:
+                    client.close()
+                    client = None
                 time.sleep(5)
                 continue
             
-            # Poll interval
-            time.sleep(self._poll_interval)
+            # A long-poll already waited server-side; plain polls need the interval
+            if not data.get("long_poll"):
+                time.sleep(self._poll_interval)
@@ -0,0 +1,266 @@
+"""
+Query-plan regression tests for the hot queries in app/db/queries_mysql.py.
+
+Each test runs a real query helper against a scratch database seeded with
+enough rows for the optimizer to prefer indexes, captures EXPLAIN for every
+SELECT the helper issues, and fails if any of them does a full table scan
+(type = ALL).
+
+Needs a MySQL 8 server and an account that may create the scratch database
+(the compose root account works):
+    docker compose exec -e EXPLAIN_MYSQL_USER=root -e EXPLAIN_MYSQL_PASSWORD=$MYSQL_ROOT_PASSWORD \
+        signal-bot python -m pytest /app/tests/test_query_plans.py -v
+
+Skipped when mysql.connector is missing or the server is unreachable, unless
+EXPLAIN_REQUIRED=1 is set: then either is a failure, so a CI job or a
+pre-merge check cannot pass without actually running the plans:
+    EXPLAIN_REQUIRED=1 python -m pytest tests/test_query_plans.py
+"""
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+
+import pytest
+
+EXPLAIN_REQUIRED = os.getenv("EXPLAIN_REQUIRED", "") == "1"
+
+if EXPLAIN_REQUIRED:
+    import mysql.connector as mysql_connector
+else:
+    mysql_connector = pytest.importorskip("mysql.connector")
+
+from app.db import queries_mysql as q  # noqa: E402
+from app.db.schema_mysql import ensure_schema  # noqa: E402
+
+MYSQL_HOST = os.getenv("MYSQL_HOST", "127.0.0.1")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
+EXPLAIN_USER = os.getenv("EXPLAIN_MYSQL_USER", "root")
+EXPLAIN_PASSWORD = os.getenv("EXPLAIN_MYSQL_PASSWORD", os.getenv("MYSQL_ROOT_PASSWORD", "rootpassword"))
+EXPLAIN_DB = os.getenv("EXPLAIN_MYSQL_DATABASE", "supportbot_explain")
+
+N_GROUPS = 100
+MESSAGES_PER_GROUP = 40
+CASES_PER_GROUP = 12
+JOBS_PER_GROUP = 30
+
+GROUP = "group-7"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# EXPLAIN-capturing db wrapper
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _ExplainCursor:
+    def __init__(self, conn, plans):
+        self._conn = conn
+        self._cur = conn.cursor()
+        self._plans = plans
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().upper().startswith("SELECT"):
+            ex = self._conn.cursor(dictionary=True)
+            ex.execute("EXPLAIN " + sql, params)
+            self._plans.append((" ".join(sql.split()), ex.fetchall()))
+            ex.close()
+        return self._cur.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _ExplainConn:
+    def __init__(self, conn, plans):
+        self._conn = conn
+        self._plans = plans
+
+    def cursor(self, *args, **kwargs):
+        return _ExplainCursor(self._conn, self._plans)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _ExplainDB:
+    """Stands in for app.db.mysql.MySQL; records EXPLAIN of every SELECT."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.plans = []
+
+    @contextmanager
+    def connection(self):
+        try:
+            yield _ExplainConn(self._conn, self.plans)
+        finally:
+            self._conn.rollback()
+
+    read_connection = connection
+
+
+class _PlainDB:
+    def __init__(self, conn):
+        self._conn = conn
+
+    @contextmanager
+    def connection(self):
+        yield self._conn
+
+    read_connection = connection
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fixtures
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _connect(database=None):
+    return mysql_connector.connect(
+        host=MYSQL_HOST,
+        port=MYSQL_PORT,
+        user=EXPLAIN_USER,
+        password=EXPLAIN_PASSWORD,
+        database=database,
+        charset="utf8mb4",
+        collation="utf8mb4_unicode_ci",
+        autocommit=False,
+        buffered=True,
+    )
+
+
+def _seed(conn) -> None:
+    cur = conn.cursor()
+    msgs, reactions, cases, evidence, jobs, outbox = [], [], [], [], [], []
+    for g in range(N_GROUPS):
+        gid = f"group-{g}"
+        for m in range(MESSAGES_PER_GROUP):
+            ts = 1_700_000_000_000 + g * 1_000_000 + m * 1000
+            msgs.append((f"{gid}-m{m}", gid, ts, f"s{m % 5}", f"message {m}", "[]"))
+            if m % 4 == 0:
+                reactions.append((gid, ts, "author", f"s{m % 5}", "👍"))
+        for c in range(CASES_PER_GROUP):
+            cid = f"g{g}c{c}"
+            status = ("solved", "recommendation", "archived")[c % 3]
+            cases.append((cid, gid, status, f"title {c}", "problem", "solution", "[]"))
+            evidence.append((cid, f"{gid}-m{c}"))
+            evidence.append((cid, f"{gid}-m{c + 1}"))
+            outbox.append((cid, "pending" if c == 0 else "failed"))
+        for j in range(JOBS_PER_GROUP):
+            status = "pending" if j == 0 else "done"
+            payload = {"group_id": gid, "message_id": f"{gid}-m{j}", "ts": 1_700_000_000_000 + j}
+            jobs.append(("MAYBE_RESPOND" if j % 2 else "BUFFER_UPDATE", json.dumps(payload), status))
+
+    cur.executemany(
+        "INSERT INTO raw_messages(message_id, group_id, ts, sender_hash, content_text, image_paths_json) "
+        "VALUES(%s, %s, %s, %s, %s, %s)",
+        msgs,
+    )
+    cur.executemany(
+        "INSERT INTO reactions(group_id, target_ts, target_author, sender_hash, emoji) VALUES(%s, %s, %s, %s, %s)",
+        reactions,
+    )
+    cur.executemany(
+        "INSERT INTO cases(case_id, group_id, status, problem_title, problem_summary, solution_summary, tags_json) "
+        "VALUES(%s, %s, %s, %s, %s, %s, %s)",
+        cases,
+    )
+    cur.executemany("INSERT INTO case_evidence(case_id, message_id) VALUES(%s, %s)", evidence)
+    cur.executemany("INSERT INTO jobs(type, payload_json, status) VALUES(%s, %s, %s)", jobs)
+    cur.executemany("INSERT INTO rag_outbox(case_id, status) VALUES(%s, %s)", outbox)
+    conn.commit()
+    for table in ("raw_messages", "reactions", "cases", "case_evidence", "jobs", "rag_outbox"):
+        cur.execute(f"ANALYZE TABLE {table}")
+        cur.fetchall()
+
+
+@pytest.fixture(scope="module")
+def conn():
+    try:
+        admin = _connect()
+    except mysql_connector.Error as e:
+        if EXPLAIN_REQUIRED:
+            pytest.fail(f"MySQL not reachable at {MYSQL_HOST}:{MYSQL_PORT} (EXPLAIN_REQUIRED=1): {e}")
+        pytest.skip(f"MySQL not reachable at {MYSQL_HOST}:{MYSQL_PORT}: {e}")
+    cur = admin.cursor()
+    cur.execute(f"DROP DATABASE IF EXISTS `{EXPLAIN_DB}`")
+    cur.execute(f"CREATE DATABASE `{EXPLAIN_DB}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    admin.close()
+
+    c = _connect(EXPLAIN_DB)
+    ensure_schema(_PlainDB(c))
+    _seed(c)
+    yield c
+    c.close()
+    admin = _connect()
+    admin.cursor().execute(f"DROP DATABASE IF EXISTS `{EXPLAIN_DB}`")
+    admin.close()
+
+
+@pytest.fixture
+def db(conn):
+    return _ExplainDB(conn)
+
+
+def _assert_no_full_scans(db: _ExplainDB) -> None:
+    assert db.plans, "helper issued no SELECT"
+    scans = [
+        (sql, row["table"])
+        for sql, rows in db.plans
+        for row in rows
+        if row.get("type") == "ALL"
+    ]
+    assert not scans, "full table scan(s):\n" + "\n".join(f"  {t}: {sql}" for sql, t in scans)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Hot queries
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_has_newer_respond_job(db):
+    q.has_newer_respond_job(db, GROUP, 1_700_000_000_000)
+    _assert_no_full_scans(db)
+
+
+def test_claim_next_job(db):
+    q.claim_next_job(db, allowed_types=["MAYBE_RESPOND", "BUFFER_UPDATE"])
+    _assert_no_full_scans(db)
+
+
+def test_claim_rag_outbox(db):
+    q.claim_rag_outbox(db, limit=10)
+    _assert_no_full_scans(db)
+
+
+def test_get_message_by_ts(db):
+    q.get_message_by_ts(db, group_id=GROUP, ts=1_700_000_000_000 + 7 * 1_000_000)
+    _assert_no_full_scans(db)
+
+
+def test_get_last_messages_meta(db):
+    q.get_last_messages_meta(db, GROUP, 40)
+    _assert_no_full_scans(db)
+
+
+def test_get_positive_reactions_for_message(db):
+    q.get_positive_reactions_for_message(db, group_id=GROUP, target_ts=1_700_000_000_000 + 7 * 1_000_000)
+    _assert_no_full_scans(db)
+
+
+def test_get_recent_solved_cases(db):
+    q.get_recent_solved_cases(db, GROUP, 1_700_000_000_000)
+    _assert_no_full_scans(db)
+
+
+def test_get_recommendation_cases_for_group(db):
+    q.get_recommendation_cases_for_group(db, GROUP)
+    _assert_no_full_scans(db)
+
+
+def test_get_cases_for_group(db):
+    q.get_cases_for_group(db, GROUP)
+    _assert_no_full_scans(db)
+
+
+def test_get_case_evidence(db):
+    q.get_case_evidence(db, "g7c1")
+    _assert_no_full_scans(db)
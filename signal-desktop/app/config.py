@@ -31,6 +31,12 @@ class Settings:
     max_messages_per_poll: int
     # Port for the HTTP API
     http_port: int
+    # Longest a GET /messages?wait=N long-poll may hold the request (seconds)
+    long_poll_max_seconds: int
+    # How often the DB watcher stats the SQLCipher files for changes (ms)
+    db_watch_interval_ms: int
+    # Minimum spacing between DB re-queries of one waiting long-poll (ms)
+    long_poll_requery_ms: int
 
 
 def load_settings() -> Settings:
@@ -40,4 +46,7 @@ def load_settings() -> Settings:
         poll_interval_seconds=_env_int("POLL_INTERVAL_SECONDS", 5),
         max_messages_per_poll=_env_int("MAX_MESSAGES_PER_POLL", 100),
         http_port=_env_int("HTTP_PORT", 8001),
+        long_poll_max_seconds=_env_int("LONG_POLL_MAX_SECONDS", 60),
+        db_watch_interval_ms=_env_int("DB_WATCH_INTERVAL_MS", 250),
+        long_poll_requery_ms=_env_int("LONG_POLL_REQUERY_MS", 500),
     )
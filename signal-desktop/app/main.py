@@ -4,7 +4,7 @@ Signal Desktop headless service.
 This service runs Signal Desktop with Xvfb and provides an HTTP API to:
 1. Check if Signal Desktop is linked/ready
 2. Get the QR code for linking (via screenshot)
-3. Poll for new messages from the SQLite database
+3. Poll (or long-poll) for new messages from the SQLite database
 4. Get messages for specific groups (for history ingestion)
 5. Send messages to individuals and groups via Chrome DevTools Protocol
 """
@@ -79,11 +79,59 @@ def _resolve_attachment_path(data_dir: str, rel_path: str) -> Optional[Path]:
 _last_message_ts: int = 0
 _last_message_ts_lock = asyncio.Lock()
 
+# Long-poll wakeup. The event is swapped out on every notification, so a
+# waiter that grabbed it before querying the DB cannot miss a later change.
+_db_changed = asyncio.Event()
+_db_watch_task: Optional[asyncio.Task] = None
+
 # DevTools client (initialized on first use)
 _devtools: Optional[DevToolsClient] = None
 _devtools_lock = asyncio.Lock()
 
 
+def _notify_db_changed(*_args) -> None:
+    """Wake every GET /messages long-poll currently waiting."""
+    global _db_changed
+    changed, _db_changed = _db_changed, asyncio.Event()
+    changed.set()
+
+
+def _db_files_signature() -> tuple:
+    """(mtime, size) of the SQLCipher DB and its WAL; any write changes it."""
+    sql_dir = Path(settings.signal_data_dir) / "sql"
+    sig = []
+    for name in ("db.sqlite", "db.sqlite-wal"):
+        try:
+            st = os.stat(sql_dir / name)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+async def _watch_db() -> None:
+    """Wake long-pollers when Signal Desktop writes to its DB.
+
+    Backs up the DevTools message hook (which may not be installed, e.g. before
+    linking or after a Signal Desktop restart). A stat() per tick is all it
+    costs; the DB is only opened when something actually changed.
+    """
+    interval = max(settings.db_watch_interval_ms, 50) / 1000
+    last = _db_files_signature()
+    while True:
+        await asyncio.sleep(interval)
+        sig = _db_files_signature()
+        if sig != last:
+            last = sig
+            _notify_db_changed()
+
+
+@app.on_event("startup")
+async def _startup():
+    global _db_watch_task
+    _db_watch_task = asyncio.create_task(_watch_db())
+
+
 async def get_devtools() -> DevToolsClient:
     """Get or initialize the DevTools client."""
     global _devtools
@@ -92,7 +140,9 @@ async def get_devtools() -> DevToolsClient:
             _devtools = DevToolsClient(debug_port=9222)
             connected = await _devtools.connect()
             if connected:
-                # Install message hook for receiving messages
+                # Install message hook for receiving messages; it wakes
+                # long-polls as soon as Signal saves an incoming message
+                _devtools.on_message(_notify_db_changed)
                 await _devtools.setup_message_hook()
             else:
                 log.warning("Failed to connect to Signal Desktop DevTools")
@@ -243,29 +293,56 @@ async def poll_messages(
     since_ts: Optional[int] = Query(None, description="Get messages after this timestamp (ms)"),
     conversation_id: Optional[str] = Query(None, description="Filter to specific conversation"),
     limit: int = Query(100, description="Maximum messages to return"),
+    wait: int = Query(0, description="Long-poll: hold the request up to this many seconds until a message arrives"),
 ):
     """
     Poll for messages from Signal Desktop DB.
     
-    This is the main endpoint for getting new messages.
+    This is the main endpoint for getting new messages. With wait > 0 the
+    request is held open while there is nothing new and answered as soon as
+    the DevTools message hook or the DB watcher reports a write, so the DB is
+    queried on change instead of on every poll. Signal Desktop writes often
+    (receipts, sessions), so re-queries are spaced at least
+    LONG_POLL_REQUERY_MS apart, and the SQLCipher work runs on a worker
+    thread so it never blocks the event loop (DevTools, /send).
     """
-    if not is_db_available(settings.signal_data_dir):
+    if not await asyncio.to_thread(is_db_available, settings.signal_data_dir):
         raise HTTPException(status_code=503, detail="Signal Desktop not ready")
     
     global _last_message_ts
     
+    wait = min(max(wait, 0), settings.long_poll_max_seconds)
+    deadline = time.monotonic() + wait
+    requery_interval = settings.long_poll_requery_ms / 1000
+    last_query = 0.0
     try:
-        actual_since = since_ts
-        if actual_since is None:
-            async with _last_message_ts_lock:
-                actual_since = _last_message_ts
-        
-        msgs = get_messages(
-            signal_data_dir=settings.signal_data_dir,
-            conversation_id=conversation_id,
-            since_timestamp=actual_since,
-            limit=limit,
-        )
+        while True:
+            # Coalesce bursts of DB writes into one query per interval
+            pause = min(last_query + requery_interval, deadline) - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            # Grab the event before querying so a write during the query still wakes us
+            changed = _db_changed
+            actual_since = since_ts
+            if actual_since is None:
+                async with _last_message_ts_lock:
+                    actual_since = _last_message_ts
+            
+            last_query = time.monotonic()
+            msgs = await asyncio.to_thread(
+                get_messages,
+                signal_data_dir=settings.signal_data_dir,
+                conversation_id=conversation_id,
+                since_timestamp=actual_since,
+                limit=limit,
+            )
+            remaining = deadline - time.monotonic()
+            if msgs or remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass  # re-query once more, then return whatever is there
         
         if msgs:
             async with _last_message_ts_lock:
@@ -291,6 +368,7 @@ async def poll_messages(
             ],
             "count": len(msgs),
             "last_ts": _last_message_ts,
+            "long_poll": wait > 0,
         }
     except Exception as e:
         log.exception("Failed to poll messages")
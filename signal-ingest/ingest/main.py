@@ -18,12 +18,9 @@ import json
 import logging
 import os
 import re
-import subprocess
-import tempfile
 import time
 import urllib.parse
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import httpx
@@ -31,113 +28,12 @@ from openai import OpenAI
 
 from ingest.config import load_settings
 from ingest.db import claim_next_job, complete_job, create_db, fail_job, is_job_cancelled
+from shared.video import process_video
 
 HISTORY_LINK = "HISTORY_LINK"
 HISTORY_SYNC = "HISTORY_SYNC"
 
 
-def _extract_video_thumbnail(video_bytes: bytes) -> bytes | None:
-    """Extract a single thumbnail frame from in-memory video bytes using OpenCV.
-
-    Picks a frame at ~1 second (or the first frame for very short clips).
-    Returns JPEG bytes or None on failure.
-    """
-    try:
-        import cv2
-    except ImportError:
-        return None
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
-            tmp.write(video_bytes)
-            tmp_path = tmp.name
-        cap = cv2.VideoCapture(tmp_path)
-        if not cap.isOpened():
-            return None
-        fps = cap.get(cv2.CAP_PROP_FPS) or 25
-        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
-        target = min(int(fps), max(total - 1, 0))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
-        ret, frame = cap.read()
-        cap.release()
-        if not ret or frame is None:
-            return None
-        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        return buf.tobytes() if ok else None
-    except Exception:
-        return None
-    finally:
-        if tmp_path:
-            try:
-                os.unlink(tmp_path)
-            except Exception:
-                pass
-
-
-def _extract_video_audio_from_bytes(video_bytes: bytes) -> tuple[bytes, str] | None:
-    """Extract audio from in-memory video bytes using ffmpeg.
-
-    Uses stream copy (no re-encoding) for speed. Falls back to mp3 encoding
-    if copy fails. Returns (audio_bytes, mime_type) or None.
-    """
-    tmp_video = None
-    tmp_audio = None
-    try:
-        log.info("Extracting audio from video (%d bytes)", len(video_bytes))
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
-            tmp.write(video_bytes)
-            tmp_video = tmp.name
-        # First try: copy audio stream as-is (near-instant)
-        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as tmp:
-            tmp_audio = tmp.name
-        result = subprocess.run(
-            [
-                "ffmpeg", "-i", tmp_video,
-                "-vn", "-acodec", "copy",
-                "-y", tmp_audio,
-            ],
-            capture_output=True,
-            timeout=30,
-        )
-        mime = "audio/mp4"
-        # Fallback: re-encode to mp3 if copy failed
-        if result.returncode != 0:
-            log.info("ffmpeg audio copy failed (rc=%d): %s", result.returncode, result.stderr[-500:].decode(errors="replace"))
-            os.unlink(tmp_audio)
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-                tmp_audio = tmp.name
-            result = subprocess.run(
-                [
-                    "ffmpeg", "-i", tmp_video,
-                    "-vn", "-acodec", "libmp3lame",
-                    "-ar", "16000", "-ac", "1", "-q:a", "9",
-                    "-y", tmp_audio,
-                ],
-                capture_output=True,
-                timeout=60,
-            )
-            mime = "audio/mp3"
-        if result.returncode != 0:
-            log.warning("ffmpeg audio extraction failed entirely (rc=%d): %s", result.returncode, result.stderr[-500:].decode(errors="replace"))
-            return None
-        audio_bytes = Path(tmp_audio).read_bytes()
-        if len(audio_bytes) < 1000:
-            log.warning("Extracted audio too small (%d bytes), skipping", len(audio_bytes))
-            return None
-        log.info("Audio extracted: %d bytes, mime=%s", len(audio_bytes), mime)
-        return audio_bytes, mime
-    except Exception as e:
-        log.warning("Audio extraction exception: %s", e)
-        return None
-    finally:
-        for p in (tmp_video, tmp_audio):
-            if p:
-                try:
-                    os.unlink(p)
-                except Exception:
-                    pass
-
-
 def _transcribe_audio_bytes(
     audio_bytes: bytes,
     openai_client: "OpenAI" = None,  # kept for API compatibility, unused
@@ -145,7 +41,6 @@ def _transcribe_audio_bytes(
     mime_type: str = "audio/mp4",
 ) -> str:
     """Transcribe audio using the native Gemini SDK."""
-    import os
     import google.generativeai as genai
 
     api_key = os.environ.get("GOOGLE_API_KEY")
@@ -713,15 +608,16 @@ def _enrich_messages_with_attachments(
             body = messages[mi].get("body") or messages[mi].get("text") or ""
             ocr_tasks.append((mi, ai, data, ct, body))
         elif ct.startswith("video/"):
-            thumb = _extract_video_thumbnail(data)
+            # One ffmpeg pass over the bytes yields both thumbnail and audio
+            media = process_video(data)
+            thumb = media.thumbnail if media else None
             if thumb:
                 video_thumbs[(mi, ai)] = thumb
                 body = messages[mi].get("body") or messages[mi].get("text") or ""
                 fname = att.get("fileName") or "video"
                 ocr_tasks.append((mi, ai, thumb, "image/jpeg", f"Video thumbnail from: {fname}\n{body}"))
-            audio_result = _extract_video_audio_from_bytes(data)
-            if audio_result:
-                audio, audio_mime = audio_result
+            if media and media.audio:
+                audio, audio_mime = media.audio, media.audio_mime
                 body = messages[mi].get("body") or messages[mi].get("text") or ""
                 transcript_tasks.append((mi, ai, audio, audio_mime, body))
             else:
@@ -1088,7 +984,6 @@ def _try_genai_grounded_extraction(
 
     Returns None on any failure (caller should fall back to OpenAI-compat).
     """
-    import os
     api_key = os.environ.get("GOOGLE_API_KEY")
     if not api_key:
         return None